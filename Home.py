@@ -1,5 +1,6 @@
 import streamlit as st
 import utils
+import startup
 
 st.set_page_config(
     page_title="Physics Simulations Collection",
@@ -7,6 +8,10 @@ st.set_page_config(
     layout="wide"
 )
 
+# Warm up fonts, colormaps and tables for the simulation pages while the
+# visitor reads this one (once per server process)
+startup.warm_in_background()
+
 st.title("⚛️ Physics Simulations Collection")
 st.subheader("物理模擬合集")
 
@@ -29,6 +34,8 @@ Select a simulation from the **sidebar** to get started.
 #### 2. 🎻 Chladni Resonance Patterns (克拉德尼共振圖形)
 *   **2D Acoustics**: Generate beautiful resonance patterns on square and circular plates.
 *   **2D 聲學**: 在正方形與圓形平板上生成美麗的共振圖案。
+*   **Mode Gallery**: Browse thumbnails of the whole $(n, m)$ mode space and click through to any pattern.
+*   **模態圖庫**: 瀏覽整個 $(n, m)$ 模態空間的縮圖，點擊即可開啟任一圖案。
 
 #### 3. ⭕ Circular Wire Loop Standing Waves (圓形線圈駐波)
 *   **Radial Waves**: Observe radial standing waves on a flexible loop.
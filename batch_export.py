@@ -0,0 +1,319 @@
+"""Headless batch export of the simulations, without a browser.
+
+Every combination of a parameter grid is rendered and written to disk by a
+process pool. Outputs that already exist are skipped, so an interrupted run
+resumes where it stopped when it is started again (``--force`` re-renders).
+
+Grids come from the command line, where a value can be a list (``1,2,5``) or
+an inclusive range (``1:10``, ``0.1:0.5:0.1``)::
+
+    python batch_export.py chladni --shape square,circular --n 1:10 --m 1:10
+    python batch_export.py circular --n 2:8 --amplitude 0.1,0.2 --format webp
+    python batch_export.py standing --harmonic 1:6 --format frames
+
+or from a JSON/YAML file (YAML needs PyYAML) with several jobs::
+
+    {"output": "exports", "workers": 8,
+     "jobs": [{"sim": "chladni", "shape": "square", "n": "1:50", "m": "1:50"},
+              {"sim": "longitudinal", "mode_n": "1:5", "format": "gif"}]}
+
+    python batch_export.py --config grid.json
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import chladni
+
+# Every simulation: default parameters (the grid axes) and the allowed formats
+SIMULATIONS = {
+    'chladni': {
+        'defaults': {'shape': chladni.SQUARE, 'mode': chladni.DIFFERENCE, 'n': 3, 'm': 5,
+                     'dpi': 150, 'renderer': 'fast', 'format': 'png'},
+        'formats': ['png', 'jpeg', 'svg', 'pdf'],
+    },
+    'circular': {
+        'defaults': {'n': 3, 'amplitude': 0.2, 'size': 600, 'frames': 50, 'fps': 20, 'format': 'gif'},
+        'formats': ['gif', 'apng', 'webp', 'mp4', 'frames'],
+    },
+    'standing': {
+        'defaults': {'tension': 10.0, 'density': 0.001, 'length': 1.0, 'harmonic': 3, 'y_lim': 0.3,
+                     'frames': 50, 'fps': 20, 'format': 'frames'},
+        'formats': ['gif', 'apng', 'webp', 'mp4', 'frames'],
+    },
+    'longitudinal': {
+        'defaults': {'particles': 50, 'mode_n': 3, 'amplitude': 0.8, 'frames': 50, 'fps': 20, 'format': 'frames'},
+        'formats': ['gif', 'apng', 'webp', 'mp4', 'frames'],
+    },
+}
+
+PARAMETERS = {key for spec in SIMULATIONS.values() for key in spec['defaults']}
+
+SHAPES = {'square': chladni.SQUARE, 'circular': chladni.CIRCULAR}
+MODES = {'diff': chladni.DIFFERENCE, 'difference': chladni.DIFFERENCE, 'sum': chladni.SUM}
+RENDERERS = ['fast', 'annotated']
+# CLI/config format name -> export module format name
+ANIMATION_FORMATS = {'gif': "GIF", 'apng': "APNG", 'webp': "WebP", 'mp4': "MP4"}
+
+
+def parse_scalar(text):
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text.strip()
+
+
+def parse_values(value):
+    """Grid axis from a config/CLI value: scalar, list, ``a,b,c`` or ``start:stop[:step]``."""
+    if isinstance(value, (list, tuple)):
+        return [v for item in value for v in parse_values(item)]
+    if not isinstance(value, str):
+        return [value]
+    if ',' in value:
+        return [v for part in value.split(',') for v in parse_values(part)]
+    parts = value.split(':')
+    if len(parts) in (2, 3):
+        try:
+            start, stop = parse_scalar(parts[0]), parse_scalar(parts[1])
+            step = parse_scalar(parts[2]) if len(parts) == 3 else 1
+        except ValueError:
+            return [value]
+        if all(isinstance(v, (int, float)) for v in (start, stop, step)) and step > 0:
+            if all(isinstance(v, int) for v in (start, stop, step)):
+                return list(range(start, stop + 1, step))
+            count = int(round((stop - start) / step)) + 1
+            return [round(start + i * step, 10) for i in range(count)]
+    return [parse_scalar(value)]
+
+
+def normalize(sim, params):
+    """Validate a parameter combination and map aliases to the app's names."""
+    params = dict(params)
+    fmt = str(params['format']).lower()
+    if fmt not in SIMULATIONS[sim]['formats']:
+        raise ValueError(f"{sim}: unsupported format {params['format']!r}")
+    params['format'] = fmt
+    if sim == 'chladni':
+        shape = str(params['shape'])
+        params['shape'] = SHAPES.get(shape.lower(), shape)
+        if params['shape'] not in SHAPES.values():
+            raise ValueError(f"chladni: unknown shape {shape!r}")
+        mode = str(params['mode'])
+        params['mode'] = MODES.get(mode.lower(), mode) if params['shape'] == chladni.SQUARE else chladni.DIFFERENCE
+        if params['renderer'] not in RENDERERS:
+            raise ValueError(f"chladni: unknown renderer {params['renderer']!r}")
+        if params['renderer'] == 'fast' and fmt in ('svg', 'pdf'):
+            raise ValueError("chladni: the fast renderer only writes png/jpeg")
+    return params
+
+
+def expand(sim, grid):
+    """All parameter combinations of one job (defaults filled in)."""
+    if sim not in SIMULATIONS:
+        raise ValueError(f"Unknown simulation {sim!r}; choose from {', '.join(SIMULATIONS)}")
+    defaults = SIMULATIONS[sim]['defaults']
+    unknown = set(grid) - set(defaults)
+    if unknown:
+        raise ValueError(f"{sim}: unknown parameters {', '.join(sorted(unknown))}")
+    axes = {key: parse_values(grid.get(key, default)) for key, default in defaults.items()}
+    for combo in itertools.product(*axes.values()):
+        yield normalize(sim, dict(zip(axes, combo)))
+
+
+def _fmt(value):
+    return f"{value:g}" if isinstance(value, float) else str(value)
+
+
+def output_path(sim, params, out_dir):
+    """Deterministic output file (or directory, for frames) of a combination."""
+    if sim == 'chladni':
+        shape_str = params['shape'].replace(" ", "_").lower()
+        mode_str = ('_sum' if params['mode'] == chladni.SUM else '_diff') if params['shape'] == chladni.SQUARE else ''
+        name = f"chladni_{shape_str}{mode_str}_n{params['n']}_m{params['m']}_{params['dpi']}dpi_{params['renderer']}"
+    else:
+        skip = {'format', 'fps'} if params['format'] == 'frames' else {'format'}
+        name = sim + "".join(f"_{key}{_fmt(value)}" for key, value in params.items() if key not in skip)
+    ext = {'jpeg': '.jpg', 'apng': '.png', 'frames': ''}.get(params['format'], f".{params['format']}")
+    return os.path.join(out_dir, sim, name + ext)
+
+
+def frame_job(sim, params):
+    """``(kind, params)`` of ``frame_jobs`` for an animated simulation."""
+    import kernels
+    if sim == 'circular':
+        return 'circular', (params['n'], params['amplitude'], params['size'], f"Mode n={params['n']}")
+    if sim == 'standing':
+        freq = kernels.string_harmonic_frequency(params['harmonic'], params['tension'], params['density'], params['length'])
+        k = kernels.string_wave_numbers(freq, params['tension'], params['density'], params['length'])[0]
+        return 'standing', (float(k), params['length'], (0.0, params['length']), params['y_lim'])
+    return 'longitudinal', (params['particles'], params['mode_n'], params['amplitude'])
+
+
+def render(sim, params):
+    """Encoded output of one combination; a list of PNGs for ``frames``."""
+    if sim == 'chladni':
+        import chladni_render
+        renderer = chladni_render.FAST if params['renderer'] == 'fast' else chladni_render.ANNOTATED
+        fmt = {'png': "PNG", 'jpeg': "JPEG", 'svg': "SVG", 'pdf': "PDF"}[params['format']]
+        return chladni_render.export_image(params['shape'], params['n'], params['m'], params['mode'],
+                                           params['dpi'], fmt, renderer=renderer)
+
+    kind, job_params = frame_job(sim, params)
+    if params['format'] == 'frames':
+        import frame_jobs
+        return [frame_jobs.render_png(kind, job_params, i / params['frames']) for i in range(params['frames'])]
+    import export
+    # Each task already has a process of its own: no render pool inside it
+    return export.export_animation(kind, job_params, params['frames'], params['fps'], ANIMATION_FORMATS[params['format']],
+                                   local=True)
+
+
+def _write(path, data):
+    # Written under a temporary name and renamed, so a partial output from an
+    # interrupted run is never mistaken for a finished one
+    tmp = f"{path}.{os.getpid()}.tmp"
+    if isinstance(data, list):
+        os.makedirs(tmp, exist_ok=True)
+        for i, png in enumerate(data):
+            with open(os.path.join(tmp, f"frame_{i:04d}.png"), 'wb') as f:
+                f.write(png)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+    else:
+        with open(tmp, 'wb') as f:
+            f.write(data)
+    os.replace(tmp, path)
+
+
+def _init_worker():
+    import startup
+    startup.warm()
+
+
+def run_task(task):
+    sim, params, path = task
+    start = time.perf_counter()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _write(path, render(sim, params))
+    except Exception as e:
+        return path, None, f"{type(e).__name__}: {e}"
+    return path, time.perf_counter() - start, None
+
+
+def collect_tasks(jobs, out_dir, force=False):
+    """``(tasks, skipped)`` for a list of ``(sim, grid)`` jobs."""
+    tasks, skipped, seen = [], 0, set()
+    for sim, grid in jobs:
+        for params in expand(sim, grid):
+            path = output_path(sim, params, out_dir)
+            if path in seen:
+                continue
+            seen.add(path)
+            if os.path.exists(path) and not force:
+                skipped += 1
+                continue
+            tasks.append((sim, params, path))
+    return tasks, skipped
+
+
+def run(tasks, workers=None, log=print):
+    """Render ``tasks`` in a process pool; returns the number of failures.
+
+    ``workers`` defaults to the CPU count; 0 or 1 renders in this process.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    failures = 0
+
+    def report(done, result):
+        nonlocal failures
+        path, seconds, error = result
+        if error is None:
+            log(f"[{done}/{len(tasks)}] {path} ({seconds:.2f} s)")
+        else:
+            failures += 1
+            log(f"[{done}/{len(tasks)}] FAILED {path}: {error}")
+
+    if workers <= 1:
+        _init_worker()
+        for done, task in enumerate(tasks, 1):
+            report(done, run_task(task))
+        return failures
+
+    # spawn: workers start clean instead of inheriting this process's state
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker) as executor:
+        futures = [executor.submit(run_task, task) for task in tasks]
+        for done, future in enumerate(as_completed(futures), 1):
+            report(done, future.result())
+    return failures
+
+
+def load_config(path):
+    with open(path, encoding='utf-8') as f:
+        if path.lower().endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise SystemExit("YAML configs need PyYAML (pip install pyyaml); or use JSON")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Render simulation outputs for every combination of a parameter grid.")
+    parser.add_argument('sim', nargs='?', choices=list(SIMULATIONS), help="simulation to export (omit with --config)")
+    parser.add_argument('--config', help="JSON or YAML file with a list of jobs")
+    parser.add_argument('-o', '--output', help="output directory (default: exports)")
+    parser.add_argument('-j', '--workers', type=int, help="worker processes (default: CPU count; 0 or 1 renders in this process)")
+    parser.add_argument('--force', action='store_true', help="re-render outputs that already exist")
+    parser.add_argument('--dry-run', action='store_true', help="list what would be rendered and exit")
+    for name in sorted(PARAMETERS):
+        parser.add_argument(f"--{name.replace('_', '-')}", dest=name, help="value, list (a,b) or range (start:stop[:step])")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config) if args.config else {}
+    jobs = []
+    for job in config.get('jobs', []):
+        job = dict(job)
+        jobs.append((job.pop('sim'), job))
+    if args.sim:
+        # Parameters that do not belong to the simulation are rejected by expand()
+        grid = {key: value for key, value in vars(args).items() if key in PARAMETERS and value is not None}
+        jobs.append((args.sim, grid))
+    if not jobs:
+        parser.error("give a simulation or a --config with jobs")
+
+    out_dir = args.output or config.get('output', 'exports')
+    try:
+        tasks, skipped = collect_tasks(jobs, out_dir, force=args.force or config.get('force', False))
+    except ValueError as e:
+        parser.error(str(e))
+
+    print(f"{len(tasks)} to render, {skipped} already exist")
+    if args.dry_run:
+        for _, _, path in tasks:
+            print(path)
+        return 0
+    if not tasks:
+        return 0
+    failures = run(tasks, args.workers if args.workers is not None else config.get('workers'))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
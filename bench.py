@@ -0,0 +1,233 @@
+"""Micro-benchmarks for the compute and render hot paths.
+
+Runs offline (no browser, no Streamlit) and covers the physics kernels, the
+Chladni fields and rasterizer, and one rendered frame of every animated page,
+each at several sizes. Every case reports its median and best wall time and
+its peak traced memory (``tracemalloc``, which also sees NumPy buffers).
+
+    python bench.py                          # run and print a table
+    python bench.py --save bench_baseline.json
+    python bench.py --compare bench_baseline.json --max-regression 0.25
+    python bench.py -k chladni --repeat 50
+
+With ``--compare`` the run fails (exit code 1) when a case is slower than the
+baseline by more than ``--max-regression`` (a fraction, on the median) or uses
+more than ``--max-memory-regression`` more peak memory. Baselines are
+machine-specific; record them on the box that runs the comparison.
+"""
+import argparse
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+# name -> (setup, fn): setup() builds the inputs once and returns the state
+# passed to fn(state), the timed call
+BENCHMARKS = {}
+
+
+def benchmark(name, setup=lambda: None):
+    def register(fn):
+        BENCHMARKS[name] = (setup, fn)
+        return fn
+    return register
+
+
+def _register_all():
+    import chain
+    import chladni
+    import chladni_render
+    import driven_string
+    import frame_cache
+    import frame_jobs
+    import kernels
+    import nodal
+
+    for res in (250, 500, 1000):
+        for dtype in (np.float32, np.float64):
+            benchmark(f"chladni.square[{res},{np.dtype(dtype).name}]")(
+                lambda _, res=res, dtype=dtype: chladni.calculate_square_pattern(3, 5, res, chladni.DIFFERENCE, dtype=dtype))
+        # Warm: polar basis cached, as on every view after the first
+        benchmark(f"chladni.circular[{res}]", setup=lambda res=res: chladni.polar_basis(res))(
+            lambda _, res=res: chladni.calculate_circular_pattern(2, 3, res))
+        benchmark(f"chladni.rasterize[{res}]",
+                  setup=lambda res=res: chladni.calculate_square_pattern(3, 5, res, chladni.DIFFERENCE, dtype=np.float32)[2])(
+            lambda Z: chladni_render.rasterize(Z))
+    benchmark("chladni.circular_cold[500]", setup=lambda: chladni.basis_cache.clear())(
+        lambda _: (chladni.basis_cache.clear(), chladni.calculate_circular_pattern(2, 3, 500)))
+    for res in (150, 300):
+        benchmark(f"nodal.extract[{res}]",
+                  setup=lambda res=res: chladni.calculate_square_pattern(3, 5, res, chladni.DIFFERENCE))(
+            lambda state: nodal.extract_polylines(*state))
+
+    # Kirchhoff plate patterns served from a solved basis (solved in setup, not saved)
+    import plate_modes
+    for shape in (chladni.SQUARE, chladni.CIRCULAR):
+        label = 'square' if shape == chladni.SQUARE else 'circular'
+        basis_setup = lambda shape=shape: plate_modes.solve_modes(shape, 61)
+        benchmark(f"plate_modes.mode[{label},500]", setup=basis_setup)(
+            lambda basis, shape=shape: plate_modes.resample(shape, basis.mode(7), 500))
+        benchmark(f"plate_modes.driven[{label},500]", setup=basis_setup)(
+            lambda basis, shape=shape: plate_modes.resample(shape, basis.driven(40.0), 500))
+
+    # Physics kernels (one frame of each page)
+    for n_points in (200, 2000):
+        x = np.linspace(0, 1.0, n_points)
+        benchmark(f"kernels.standing_wave[{n_points}]", setup=lambda x=x: kernels.standing_wave_profile(3 * np.pi, x))(
+            lambda profile, x=x: kernels.standing_wave(3 * np.pi, 2 * np.pi, 0.3, x, profile=profile))
+    for n_points in (1000, 10000):
+        theta = np.linspace(0, 2 * np.pi, n_points)
+        benchmark(f"kernels.circular_loop[{n_points}]", setup=lambda theta=theta: kernels.circular_loop_profile(3, 0.2, theta))(
+            lambda profile, theta=theta: kernels.circular_loop(3, 2.0, 0.2, 0.3, theta, profile=profile))
+    for particles in (50, 200, 2000):
+        x0 = np.linspace(0, 10.0, particles)
+        k = 3 * np.pi / 10.0
+        amplitude = kernels.longitudinal_amplitude(particles, 10.0, 0.8)
+        benchmark(f"kernels.longitudinal[{particles}]",
+                  setup=lambda x0=x0, k=k, a=amplitude: kernels.longitudinal_profile(k, a, x0))(
+            lambda profile, x0=x0, k=k, a=amplitude: kernels.longitudinal_wave(k, 2 * np.pi, a, 0.3, x0, profile=profile))
+
+    # Time-stepped mass-spring chain: ten leapfrog steps
+    for masses in (10**4, 10**5, 10**6):
+        benchmark(f"chain.step10[{masses}]", setup=lambda masses=masses: chain.MassSpringChain(masses, damping=0.05))(
+            lambda sim: sim.step(10))
+
+    # Driven string: the steps of one frame at 1/20 slow motion and 30 FPS (n = 1)
+    for n_points in (400, 4000):
+        benchmark(f"driven_string.frame[{n_points}]",
+                  setup=lambda n=n_points: driven_string.DrivenString(1.0, 100.0, 50.0, damping=8.0, n_points=n))(
+            lambda sim: sim.step(round(0.05 / 30 / sim.dt)))
+
+    # One rendered frame per animated page: blitted (steady state) and with a
+    # full canvas.draw() + buffer_rgba() copy (first frame / invalidated)
+    sources = {
+        'standing': {'n3': (float(3 * np.pi), 1.0, (0.0, 1.0), 0.3)},
+        'circular': {'300px': (3, 0.2, 300), '600px': (3, 0.2, 600)},
+        'longitudinal': {'50': (50, 3, 0.8), '200': (200, 3, 0.8), 'gas_10k': (10000, 3, 0.8), 'gas_100k': (100000, 3, 0.8)},
+    }
+    for kind, param_sets in sources.items():
+        for label, params in param_sets.items():
+            benchmark(f"frame.{kind}.blit[{label}]", setup=lambda k=kind, p=params: frame_jobs.FRAME_KINDS[k](*p))(
+                lambda source: source(0.3))
+            benchmark(f"frame.{kind}.full_draw[{label}]", setup=lambda k=kind, p=params: frame_jobs.FRAME_KINDS[k](*p))(
+                lambda source: (source.renderer.invalidate(), source(0.3)))
+    benchmark("frame.encode_png[600]",
+              setup=lambda: frame_jobs.FRAME_KINDS['circular'](3, 0.2, 600)(0.3))(frame_cache.encode_png)
+
+
+def run_case(name, repeat, min_time):
+    setup, fn = BENCHMARKS[name]
+    state = setup()
+    fn(state)  # warm-up (imports, caches, first-draw effects)
+
+    times = []
+    start = time.perf_counter()
+    while len(times) < repeat or (time.perf_counter() - start < min_time and len(times) < 100 * repeat):
+        t0 = time.perf_counter()
+        fn(state)
+        times.append(time.perf_counter() - t0)
+
+    # Peak memory in a separate, traced call (tracing slows everything down)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn(state)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'median_ms': statistics.median(times) * 1000,
+        'min_ms': min(times) * 1000,
+        'runs': len(times),
+        'peak_kb': peak / 1024,
+    }
+
+
+def run(pattern=None, repeat=10, min_time=0.2, log=print):
+    _register_all()
+    names = [name for name in BENCHMARKS if not pattern or pattern in name]
+    results = {}
+    for name in names:
+        results[name] = run_case(name, repeat, min_time)
+        r = results[name]
+        log(f"{name:<44} {r['median_ms']:10.3f} ms  (min {r['min_ms']:.3f})  {r['peak_kb']:10.1f} KB")
+    return results
+
+
+def environment():
+    import matplotlib
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'matplotlib': matplotlib.__version__,
+        'machine': platform.machine(),
+        'platform': platform.platform(),
+        'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def compare(results, baseline, max_regression, max_memory_regression):
+    """Lines describing regressions against ``baseline`` (empty when none)."""
+    failures = []
+    for name, r in results.items():
+        base = baseline.get('results', {}).get(name)
+        if base is None:
+            continue
+        if r['median_ms'] > base['median_ms'] * (1 + max_regression):
+            failures.append(f"{name}: {r['median_ms']:.3f} ms vs baseline {base['median_ms']:.3f} ms "
+                            f"(+{r['median_ms'] / base['median_ms'] - 1:.0%})")
+        # Small allocations are noisy; only flag growth beyond 64 KB
+        if r['peak_kb'] > base['peak_kb'] * (1 + max_memory_regression) and r['peak_kb'] - base['peak_kb'] > 64:
+            failures.append(f"{name}: peak {r['peak_kb']:.0f} KB vs baseline {base['peak_kb']:.0f} KB")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the compute and render hot paths.")
+    parser.add_argument('-k', dest='pattern', help="only run cases whose name contains this")
+    parser.add_argument('--repeat', type=int, default=10, help="minimum timed runs per case")
+    parser.add_argument('--min-time', type=float, default=0.2, help="minimum seconds of timed runs per case")
+    parser.add_argument('--save', metavar='JSON', help="write the results as a baseline")
+    parser.add_argument('--compare', metavar='JSON', help="fail on regressions against this baseline")
+    parser.add_argument('--max-regression', type=float, default=0.25, help="allowed slowdown of the median (fraction)")
+    parser.add_argument('--max-memory-regression', type=float, default=0.25, help="allowed growth of peak memory (fraction)")
+    parser.add_argument('--list', action='store_true', help="list the cases and exit")
+    args = parser.parse_args(argv)
+
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    plt.style.use('dark_background')
+
+    if args.list:
+        _register_all()
+        print("\n".join(name for name in BENCHMARKS if not args.pattern or args.pattern in name))
+        return 0
+
+    results = run(args.pattern, args.repeat, args.min_time)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({'environment': environment(), 'results': results}, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        failures = compare(results, baseline, args.max_regression, args.max_memory_regression)
+        if failures:
+            print(f"\n{len(failures)} regression(s) against {args.compare}:")
+            print("\n".join(f"  {line}" for line in failures))
+            return 1
+        print(f"\nNo regressions against {args.compare}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
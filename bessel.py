@@ -0,0 +1,101 @@
+"""Table of Bessel-function zeros for circular Chladni plates.
+
+``jn_zeros(m, n)`` gets slower as n and m grow, so the first ``MAX_ZEROS``
+zeros of J_0 .. J_MAX_ORDER are stored in ``data/bessel_zeros.npy`` and
+memory-mapped on first use. The table ships with the app; if it is missing or
+too small it is rebuilt on first start.
+
+Regenerate it with ``python bessel.py``.
+"""
+import logging
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Covers the full n, m range of the Chladni page settings (1..50)
+MAX_ORDER = 50
+MAX_ZEROS = 50
+
+TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'bessel_zeros.npy')
+
+_table = None
+
+
+def build_table(max_order=MAX_ORDER, max_zeros=MAX_ZEROS):
+    """Zeros ``j_{m,s}`` with shape (max_order + 1, max_zeros)."""
+    from scipy.special import jn_zeros
+    table = np.empty((max_order + 1, max_zeros), dtype=np.float64)
+    for m in range(max_order + 1):
+        table[m] = jn_zeros(m, max_zeros)
+    return table
+
+
+def save_table(table, path=TABLE_PATH):
+    # Write to a temporary file first so a concurrent reader never sees half a table
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.save(f, table)
+    os.replace(tmp_path, path)
+
+
+def load_table(path=TABLE_PATH):
+    """Memory-mapped zero table, building and saving it if needed."""
+    global _table
+    if _table is not None:
+        return _table
+
+    table = None
+    try:
+        table = np.load(path, mmap_mode='r')
+        if table.shape[0] <= MAX_ORDER or table.shape[1] < MAX_ZEROS:
+            logger.warning("Bessel zero table %s has shape %s, rebuilding", path, table.shape)
+            table = None
+    except (OSError, ValueError) as e:
+        logger.warning("Bessel zero table %s unavailable (%s), rebuilding", path, e)
+
+    if table is None:
+        table = build_table()
+        try:
+            save_table(table, path)
+            table = np.load(path, mmap_mode='r')
+        except OSError as e:
+            # Read-only deployments still work, just without persistence
+            logger.warning("Could not save Bessel zero table to %s (%s)", path, e)
+
+    _table = table
+    return _table
+
+
+def mcmahon_zero(m, n):
+    # McMahon's asymptotic expansion for the n-th zero of J_m (good for n >> m)
+    beta = (n + m / 2 - 0.25) * np.pi
+    mu = 4 * m * m
+    return beta - (mu - 1) / (8 * beta) - 4 * (mu - 1) * (7 * mu - 31) / (3 * (8 * beta) ** 3)
+
+
+def bessel_zero(m, n):
+    """The n-th positive zero (n >= 1) of the Bessel function J_m."""
+    if m < 0 or n < 1:
+        raise ValueError(f"Need m >= 0 and n >= 1, got m={m}, n={n}")
+
+    table = load_table()
+    if m < table.shape[0] and n <= table.shape[1]:
+        return float(table[m, n - 1])
+
+    # Outside the stored range (custom settings): compute it directly
+    logger.info("Bessel zero j_{%d,%d} outside table, computing with jn_zeros", m, n)
+    try:
+        from scipy.special import jn_zeros
+        return float(jn_zeros(m, n)[n - 1])
+    except Exception as e:
+        approx = mcmahon_zero(m, n)
+        logger.warning("jn_zeros(%d, %d) failed (%s); using asymptotic estimate %.6f", m, n, e, approx)
+        return float(approx)
+
+
+if __name__ == "__main__":
+    save_table(build_table())
+    print(f"Wrote {TABLE_PATH}")
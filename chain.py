@@ -0,0 +1,192 @@
+"""Time-domain mass-spring chain for the Longitudinal Wave page.
+
+The analytic page model plays back ``x0 + A cos(k x0) cos(omega t)``. This
+module integrates the chain itself: N masses joined by springs, with the
+speaker as a driven left boundary ``u0(t) = S sin(Omega t)`` and a fixed or
+free right end. Masses and spring stiffnesses may vary along the chain and a
+linear damping force ``-gamma m v`` can be added, so transients, damped
+resonance and non-uniform media can be shown.
+
+The integrator is leapfrog (velocity Verlet with velocities at half steps),
+which is symplectic without damping; damping is treated with the centred
+``(1 - gamma dt / 2) / (1 + gamma dt / 2)`` factor so the scheme stays
+second order. The step is the largest stable one times ``COURANT``. All state
+lives in arrays allocated once, and a step is a handful of in-place NumPy
+operations, so the cost is a few nanoseconds per mass and step.
+
+The time step is bounded by the spacing (CFL), so the number of steps per
+simulated second grows with the number of masses. ``advance_to`` therefore
+takes a step budget; a chain that cannot keep up runs in slow motion rather
+than skipping time.
+"""
+import math
+
+import numpy as np
+
+import kernels
+
+FIXED = "Fixed"
+FREE = "Free"
+RIGHT_ENDS = [FIXED, FREE]
+
+# Fraction of the largest stable leapfrog step
+COURANT = 0.9
+
+
+def mode_frequency(n, length, wave_speed, right_end=FIXED):
+    """Angular frequency of the n-th resonance of the driven chain.
+
+    The speaker end is a displacement node of the normal modes (it is
+    prescribed), so a fixed right end resonates at ``n pi c / L`` and a free
+    one at ``(n - 1/2) pi c / L``.
+    """
+    order = n if right_end == FIXED else n - 0.5
+    return order * np.pi * wave_speed / length
+
+
+def graded_profile(n, ratio):
+    """Factors rising geometrically from 1 to ``ratio`` over ``n`` elements."""
+    return np.geomspace(1.0, ratio, n) if n > 1 else np.ones(n)
+
+
+class MassSpringChain:
+    """N masses between a driven speaker (left) and a fixed or free right end.
+
+    ``mass_profile`` (N) and ``stiffness_profile`` (N + 1 springs, the first
+    attached to the speaker) scale a uniform chain with linear density 1 and
+    wave speed ``wave_speed``.
+    """
+
+    def __init__(self, n_masses, length=10.0, wave_speed=2.0, drive_amplitude=0.05, drive_omega=2.0,
+                 damping=0.0, right_end=FIXED, mass_profile=None, stiffness_profile=None, dtype=np.float64):
+        self.n = n = int(n_masses)
+        self.length = length
+        self.spacing = a = length / (n + 1)
+        self.drive_amplitude = drive_amplitude
+        self.drive_omega = drive_omega
+        self.damping = damping
+        self.right_end = right_end
+        self.x0 = np.arange(1, n + 1) * a
+
+        mass = np.full(n, a, dtype=dtype)
+        if mass_profile is not None:
+            mass *= mass_profile
+        stiffness = np.full(n + 1, wave_speed ** 2 / a, dtype=dtype)
+        if stiffness_profile is not None:
+            stiffness *= stiffness_profile
+        if right_end == FREE:
+            # No spring to the wall
+            stiffness[-1] = 0.0
+        self.mass = mass
+        self.stiffness = stiffness
+
+        # Leapfrog is stable for dt < 2 / omega_max and omega_max^2 <= 4 k_max / m_min
+        self.dt = COURANT * float(np.sqrt(mass.min() / stiffness.max()))
+        self._kick = (self.dt / mass).astype(dtype)
+        half = 0.5 * damping * self.dt
+        self._damp_pre, self._damp_post = 1.0 - half, 1.0 / (1.0 + half)
+
+        # Displacements with both boundaries: [speaker, u_1 .. u_N, wall]
+        self._u = np.zeros(n + 2, dtype=dtype)
+        self.u = self._u[1:-1]
+        self.v = np.zeros(n, dtype=dtype)  # at half steps
+        self._force = np.empty(n + 1, dtype=dtype)
+        self._acc = np.empty(n, dtype=dtype)
+        # Views used by every step, built once
+        self._views = (self._u[1:], self._u[:-1], self._force[1:], self._force[:-1])
+        self.t = 0.0
+        self.steps = 0
+
+    def drive(self, t):
+        """Speaker displacement (starts at rest position)."""
+        return self.drive_amplitude * math.sin(self.drive_omega * t)
+
+    def step(self, steps=1):
+        """Advance ``steps`` time steps in place."""
+        u_ext, u, v = self._u, self.u, self.v
+        force, acc, kick, stiffness = self._force, self._acc, self._kick, self.stiffness
+        u_right, u_left, force_right, force_left = self._views
+        dt = self.dt
+        damped = self.damping > 0
+        for _ in range(steps):
+            u_ext[0] = self.drive(self.t)
+            # Spring tensions k_i (u_{i+1} - u_i), then net force per mass
+            np.subtract(u_right, u_left, out=force)
+            force *= stiffness
+            np.subtract(force_right, force_left, out=acc)
+            acc *= kick
+            if damped:
+                v *= self._damp_pre
+                v += acc
+                v *= self._damp_post
+            else:
+                v += acc
+            np.multiply(v, dt, out=acc)
+            u += acc
+            self.t += dt
+        self.steps += steps
+        u_ext[0] = self.drive(self.t)
+
+    def advance_to(self, t, max_steps=None):
+        """Step up to simulated time ``t``, at most ``max_steps`` steps.
+
+        Returns the number of steps taken; when the budget runs out the chain
+        lags behind ``t`` instead of skipping ahead.
+        """
+        steps = max(int((t - self.t) / self.dt), 0)
+        if max_steps is not None:
+            steps = min(steps, max_steps)
+        self.step(steps)
+        return steps
+
+    def strain(self, out=None):
+        """Relative extension of every spring (N + 1), negative in compression."""
+        out = np.subtract(self._u[1:], self._u[:-1], out=out)
+        out /= self.spacing
+        return out
+
+    def energy(self):
+        """Kinetic plus spring energy (conserved without damping or drive)."""
+        kinetic = 0.5 * np.dot(self.mass, self.v * self.v)
+        extension = np.diff(self._u)
+        return kinetic + 0.5 * np.dot(self.stiffness, extension * extension)
+
+
+class ChainView:
+    """Positions and compression colours of (a subsample of) a chain for drawing.
+
+    At most ``max_drawn`` evenly spread masses are drawn. Colours map the
+    local compression onto 0 (rarefaction) .. 1 (compression), scaled by a
+    slowly decaying peak so growing and decaying amplitudes stay visible.
+    """
+
+    def __init__(self, chain, max_drawn=20000, decay=0.99):
+        self.chain = chain
+        self.index = np.unique(np.linspace(0, chain.n - 1, min(chain.n, max_drawn)).astype(np.intp))
+        self.x0 = chain.x0[self.index]
+        # Many drawn masses are spread over the tube like the dense gas
+        if len(self.index) >= kernels.GAS_PARTICLES:
+            rng = np.random.default_rng(0)
+            self.y0 = rng.uniform(-kernels.GAS_HALF_HEIGHT, kernels.GAS_HALF_HEIGHT, len(self.index))
+        else:
+            self.y0 = np.zeros(len(self.index))
+        self.decay = decay
+        self._peak = 1e-9
+        self._strain = np.empty(chain.n + 1, dtype=chain.u.dtype)
+        self._positions = np.empty(len(self.index), dtype=chain.u.dtype)
+        self._colours = np.empty(len(self.index), dtype=chain.u.dtype)
+
+    def frame(self):
+        """``(positions, colour_values)`` of the drawn masses, in reused buffers."""
+        chain = self.chain
+        np.add(self.x0, chain.u[self.index], out=self._positions)
+
+        # Mean strain of the two springs of each mass, sign flipped: compression > 0
+        strain = chain.strain(out=self._strain)
+        colours = self._colours
+        np.add(strain[self.index], strain[self.index + 1], out=colours)
+        colours *= -0.5
+        self._peak = max(self._peak * self.decay, float(np.abs(colours).max()))
+        colours *= 0.5 / self._peak
+        colours += 0.5
+        return self._positions, colours
@@ -0,0 +1,196 @@
+"""Chladni plate fields for square and circular plates.
+
+The pure functions compute a field for one mode; ``get_pattern`` puts a
+shared, memory-bounded cache in front of them so repeated views of the same
+mode (by any session) cost nothing. SciPy is only imported for circular
+plates.
+"""
+import os
+
+import numpy as np
+
+import bessel
+import cache
+
+SQUARE = "Square Plate"
+CIRCULAR = "Circular Plate"
+SUM = "Sum (A + B)"
+DIFFERENCE = "Difference (A - B)"
+
+# Largest display resolution whose polar basis should stay cached (Settings
+# can raise the slider further; bigger bases are then rebuilt per call)
+MAX_RESOLUTION = int(os.environ.get('CHLADNI_MAX_RES', 2000))
+# cos(m*theta) tables at MAX_RESOLUTION the basis cache has room for
+ANGULAR_TABLES = 4
+
+
+def _basis_budget_mb(res):
+    # Per in-disc pixel: int32 index, float32 r and theta, float32 angular tables
+    pixels = np.pi / 4 * res * res
+    return max(64, pixels * (3 * 4 + ANGULAR_TABLES * 4) / 2**20)
+
+
+pattern_cache = cache.LRUCache(cache.default_budget('CHLADNI_CACHE_MB', 128), name="chladni")
+# Resolution-only data (polar grids, cos(m*theta) tables) reused across modes
+basis_cache = cache.LRUCache(cache.default_budget('CHLADNI_BASIS_MB', _basis_budget_mb(MAX_RESOLUTION)), name="chladni-basis")
+
+
+def plate_axis(res):
+    # Sample positions along either axis of the [-1, 1] x [-1, 1] plate
+    return np.linspace(-1, 1, res)
+
+
+def calculate_square_pattern(n, m, res, mode, dtype=np.float64, out=None, grids=False):
+    """Square-plate field ``cos(n pi x) cos(m pi y) -/+ cos(m pi x) cos(n pi y)``.
+
+    Returns ``(x, y, Z)`` where ``x`` and ``y`` are the 1-D axes (dense
+    meshgrids only when ``grids=True``). ``Z`` has rows along y and is written
+    into ``out`` when given.
+    """
+    x = plate_axis(res)
+
+    # The field is a sum of two outer products of 1-D cosines, so only 2*res
+    # cosines are evaluated and the grid is filled by one rank-2 product:
+    # Z[i, j] = cos_m(y_i) cos_n(x_j) +/- cos_n(y_i) cos_m(x_j)
+    cos_n = np.cos(n * np.pi * x)
+    cos_m = np.cos(m * np.pi * x)
+    sign = 1.0 if mode == SUM else -1.0
+
+    if out is None:
+        out = np.empty((res, res), dtype=dtype)
+
+    if sign < 0 and n == m:
+        # Both terms cancel exactly; keep the field exactly zero
+        out.fill(0)
+    else:
+        left = np.empty((res, 2), dtype=out.dtype)
+        left[:, 0] = cos_m
+        left[:, 1] = cos_n
+        right = np.empty((2, res), dtype=out.dtype)
+        right[0] = cos_n
+        right[1] = sign * cos_m
+        np.matmul(left, right, out=out)
+
+    if grids:
+        X, Y = np.meshgrid(x, x)
+        return X, Y, out
+    return x, x, out
+
+
+class PolarBasis:
+    """Polar coordinates of the in-disc pixels for one resolution.
+
+    Only the pixels with ``r <= 1`` are kept, as compact 1-D arrays, together
+    with their flat indices into the ``res x res`` image. Indices are int32 and
+    coordinates float32 (12 bytes per pixel), which is all the float32
+    patterns need.
+    """
+
+    def __init__(self, res):
+        x = plate_axis(res)
+        X, Y = np.meshgrid(x, x)
+        R = np.sqrt(X**2 + Y**2)
+        inside = R <= 1
+        self.res = res
+        self.index = np.flatnonzero(inside).astype(np.int32)
+        self.r = R[inside].astype(np.float32)
+        self.theta = np.arctan2(Y[inside], X[inside]).astype(np.float32)
+
+    @property
+    def nbytes(self):
+        return self.index.nbytes + self.r.nbytes + self.theta.nbytes
+
+
+def polar_basis(res):
+    return basis_cache.get_or_compute(('polar', int(res)), lambda: PolarBasis(res))
+
+
+def angular_table(res, m):
+    """``cos(m * theta)`` over the in-disc pixels, as float32."""
+    basis = polar_basis(res)
+    return basis_cache.get_or_compute(
+        ('angular', int(res), int(m)),
+        lambda: np.cos(m * basis.theta).astype(np.float32),
+    )
+
+
+def calculate_circular_pattern(n, m, res, dtype=np.float32, out=None):
+    """Circular-plate field ``J_m(k r) cos(m theta)``, NaN outside the disc.
+
+    Returns ``(x, y, Z)`` with 1-D axes, like ``calculate_square_pattern``.
+    """
+    basis = polar_basis(res)
+    angular = angular_table(res, m)
+
+    # n = radial mode (number of nodal circles)
+    # m = angular mode (number of nodal diameters)
+
+    # Find the n-th zero of the m-th order Bessel function (precomputed table)
+    k = bessel.bessel_zero(m, n)
+
+    # Evaluate only the in-disc pixels, reusing one compact buffer
+    from scipy.special import jn
+    values = np.multiply(basis.r, k)
+    jn(m, values, out=values)
+    values *= angular
+
+    if out is None:
+        out = np.empty((res, res), dtype=dtype)
+    out.fill(np.nan)
+    out.reshape(-1)[basis.index] = values
+
+    x = plate_axis(res)
+    return x, x, out
+
+
+def calculate_pattern_rows(shape, n, m, res, mode, start, stop, dtype=np.float32):
+    """Rows ``start:stop`` of the ``res x res`` field, without building the rest.
+
+    Equal to the same rows of the full calculation, so arbitrarily large
+    images can be computed band by band in bounded memory.
+    """
+    x = plate_axis(res)
+    y = x[start:stop]
+
+    if shape == SQUARE:
+        sign = 1.0 if mode == SUM else -1.0
+        if sign < 0 and n == m:
+            return np.zeros((len(y), res), dtype=dtype)
+        left = np.stack([np.cos(m * np.pi * y), np.cos(n * np.pi * y)], axis=1).astype(dtype)
+        right = np.stack([np.cos(n * np.pi * x), sign * np.cos(m * np.pi * x)]).astype(dtype)
+        return left @ right
+
+    X, Y = np.meshgrid(x, y)
+    R = np.sqrt(X**2 + Y**2)
+    inside = R <= 1
+    # Same precision as PolarBasis, so the rows match the full calculation
+    r = R[inside].astype(np.float32)
+    theta = np.arctan2(Y[inside], X[inside]).astype(np.float32)
+    del X, Y, R
+
+    from scipy.special import jn
+    values = np.multiply(r, bessel.bessel_zero(m, n))
+    jn(m, values, out=values)
+    values *= np.cos(m * theta).astype(np.float32)
+
+    out = np.full((len(y), res), np.nan, dtype=dtype)
+    out[inside] = values
+    return out
+
+
+def pattern_key(shape, n, m, res, mode, dtype=np.float64):
+    # Superposition only matters for the square plate
+    if shape != SQUARE:
+        mode = None
+    return (shape, int(n), int(m), int(res), mode, np.dtype(dtype).name)
+
+
+def get_pattern(shape, n, m, res, mode=DIFFERENCE, dtype=np.float64):
+    """Cached ``(x, y, Z)`` for a plate mode; ``x``/``y`` are the 1-D axes.
+
+    Returned arrays are read-only.
+    """
+    key = pattern_key(shape, n, m, res, mode, dtype)
+    if shape == SQUARE:
+        return pattern_cache.get_or_compute(key, lambda: calculate_square_pattern(n, m, res, mode, dtype=dtype))
+    return pattern_cache.get_or_compute(key, lambda: calculate_circular_pattern(n, m, res, dtype=dtype))
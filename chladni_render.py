@@ -0,0 +1,300 @@
+"""Rendering and image export of Chladni patterns.
+
+Two renderers are available. ``rasterize`` maps the field straight to an RGBA
+array with NumPy: |Z| goes through a 256-entry colormap lookup table and the
+nodal lines (Z = 0) are painted on top from the field itself, which is many
+times faster than going through matplotlib. The annotated view (amplitude
+image, nodal-line contour and colorbar) is built on a bare matplotlib
+``Figure`` so it never touches pyplot's global figure list and needs no
+explicit closing. High-resolution exports are rendered only when a download
+is actually requested, and the encoded file is cached per
+``(shape, n, m, mode, resolution, dpi, format)`` for every session.
+"""
+import io
+
+import numpy as np
+from PIL import Image
+
+import cache
+import chladni
+import nodal
+
+FAST = "Fast (raster)"
+ANNOTATED = "Annotated (matplotlib)"
+RENDERERS = [FAST, ANNOTATED]
+
+# Default grid resolution of the displayed and exported field
+RESOLUTION = 500
+# First stage of progressive rendering
+PREVIEW_RESOLUTION = 128
+
+CMAP = 'magma'
+NODE_COLOR = '#00FFFF'
+NODE_ALPHA = 0.8
+# Nodal line width in pixels at RESOLUTION; scaled with the output size
+NODE_WIDTH = 2.0
+
+# Rows of a raster export upsampled and rasterized at a time
+EXPORT_BAND_ROWS = 256
+
+# Export size label -> dpi of the 8 x 8 inch figure
+EXPORT_SIZES = {
+    "Standard (150 dpi)": 150,
+    "High (300 dpi)": 300,
+    "Print (600 dpi)": 600,
+}
+DEFAULT_EXPORT_SIZE = "High (300 dpi)"
+
+# format name -> (file extension / matplotlib format, mime type, Pillow format)
+EXPORT_FORMATS = {
+    "PNG": ('png', 'image/png', 'PNG'),
+    "JPEG": ('jpg', 'image/jpeg', 'JPEG'),
+    "SVG": ('svg', 'image/svg+xml', None),
+    "PDF": ('pdf', 'application/pdf', None),
+}
+
+export_cache = cache.LRUCache(cache.default_budget('CHLADNI_EXPORT_MB', 64), name="chladni-export")
+# Display rasters, keyed like the pattern cache plus the line style
+raster_cache = cache.LRUCache(cache.default_budget('CHLADNI_RASTER_MB', 64), name="chladni-raster")
+_luts = {}
+
+
+def colormap_lut(name=CMAP, n=256):
+    """``(n, 4)`` uint8 RGBA lookup table for a matplotlib colormap."""
+    lut = _luts.get((name, n))
+    if lut is None:
+        import matplotlib
+        lut = matplotlib.colormaps[name].resampled(n)(np.linspace(0, 1, n), bytes=True)
+        lut.flags.writeable = False
+        _luts[(name, n)] = lut
+    return lut
+
+
+def _hex_rgb(color):
+    color = color.lstrip('#')
+    return np.array([int(color[i:i + 2], 16) for i in (0, 2, 4)], dtype=np.float32)
+
+
+def nodal_coverage(Z, width=NODE_WIDTH, antialias=True):
+    """Per-pixel coverage (0..1) of the nodal lines Z = 0 drawn ``width`` px wide.
+
+    With anti-aliasing the distance of each pixel centre to the zero set is
+    estimated to first order as ``|Z| / |grad Z|`` (in pixels), which places
+    the line with sub-pixel accuracy. Without it, pixels whose sign differs
+    from a neighbour's are marked and the mark is grown to ``width``.
+    """
+    Z = np.asarray(Z, dtype=np.float32)
+    if antialias:
+        gy, gx = np.gradient(Z)
+        grad = np.sqrt(gx * gx + gy * gy)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dist = np.abs(Z) / grad
+        coverage = np.clip(width / 2 + 0.5 - dist, 0.0, 1.0)
+        return np.nan_to_num(coverage, nan=0.0, copy=False)
+
+    positive = Z > 0
+    valid = ~np.isnan(Z)
+    edge = np.zeros(Z.shape, dtype=bool)
+    # Sign changes between horizontal and vertical neighbours
+    h = (positive[:, 1:] != positive[:, :-1]) & valid[:, 1:] & valid[:, :-1]
+    v = (positive[1:, :] != positive[:-1, :]) & valid[1:, :] & valid[:-1, :]
+    edge[:, 1:] |= h
+    edge[1:, :] |= v
+    # Thicken by shifting the mark (width - 1 px in total)
+    grown = edge.copy()
+    for d in range(1, int(round(width)) // 2 + 1):
+        grown[d:, :] |= edge[:-d, :]
+        grown[:-d, :] |= edge[d:, :]
+        grown[:, d:] |= edge[:, :-d]
+        grown[:, :-d] |= edge[:, d:]
+    return grown.astype(np.float32)
+
+
+def rasterize(Z, cmap=CMAP, node_color=NODE_COLOR, node_alpha=NODE_ALPHA, node_width=NODE_WIDTH, antialias=True,
+              limits=None):
+    """RGBA image (uint8, rows from top) of ``|Z|`` with the nodal lines overlaid.
+
+    Pixels outside the plate (NaN) are black, matching the annotated view.
+    ``limits`` fixes the ``(min, max)`` of ``|Z|`` used for the colour scale,
+    e.g. when ``Z`` is one band of a larger image.
+    """
+    Z = np.asarray(Z)
+    amp = np.abs(Z)
+    lo, hi = limits if limits is not None else (np.nanmin(amp), np.nanmax(amp))
+    scale = 255.0 / (hi - lo) if hi > lo else 0.0
+
+    # Normalise |Z| to 0..255 and look the colours up in one gather
+    index = np.nan_to_num((amp - lo) * scale, nan=0.0)
+    rgba = colormap_lut(cmap)[index.astype(np.uint8)]
+    rgba[np.isnan(Z)] = (0, 0, 0, 255)
+
+    # Blend the nodal colour on top by its coverage
+    if node_width > 0:
+        alpha = nodal_coverage(Z, node_width, antialias) * node_alpha
+        covered = alpha > 0
+        a = alpha[covered][:, None]
+        rgb = rgba[..., :3]
+        rgb[covered] = (rgb[covered] * (1 - a) + _hex_rgb(node_color) * a + 0.5).astype(np.uint8)
+
+    # Row 0 of Z is y = -1 (origin='lower')
+    return rgba[::-1]
+
+
+def _raster_key(shape, n, m, mode, res, node_width, antialias):
+    return chladni.pattern_key(shape, n, m, res, mode, np.float32) + (float(node_width), bool(antialias))
+
+
+def raster_image(shape, n, m, mode, res=RESOLUTION, node_width=NODE_WIDTH, antialias=True):
+    """Cached display raster of a mode.
+
+    ``node_width`` is in pixels at ``RESOLUTION`` and scaled to ``res``, so the
+    lines look the same at every resolution once the image is displayed.
+    """
+    def render():
+        Z = chladni.get_pattern(shape, n, m, res, mode, dtype=np.float32)[2]
+        return rasterize(Z, node_width=node_width * res / RESOLUTION, antialias=antialias)
+
+    return raster_cache.get_or_compute(_raster_key(shape, n, m, mode, res, node_width, antialias), render)
+
+
+def display_cached(shape, n, m, mode, res=RESOLUTION, renderer=FAST, node_width=NODE_WIDTH, antialias=True):
+    """Whether the full-resolution view of ``renderer`` is served from cache.
+
+    The annotated figure is drawn on every run, but from the cached field, so
+    the field decides whether progressive stages are worth showing.
+    """
+    if renderer == FAST:
+        return _raster_key(shape, n, m, mode, res, node_width, antialias) in raster_cache
+    return chladni.pattern_key(shape, n, m, res, mode, np.float32) in chladni.pattern_cache
+
+
+def progressive_resolutions(target, preview=PREVIEW_RESOLUTION):
+    """Resolutions to render in turn: ``preview``, doubling, then ``target``."""
+    stages = []
+    res = preview
+    while res < target:
+        stages.append(res)
+        res *= 2
+    stages.append(target)
+    return stages
+
+
+def annotated_figure(x, y, Z, lines=None, figsize=(8, 8), dpi=100):
+    """Amplitude image with nodal lines and colorbar as a bare Figure.
+
+    ``lines`` are precomputed nodal polylines (see ``nodal``); without them
+    the zero contour of ``Z`` is traced here.
+    """
+    # matplotlib is only imported by this renderer; the raster path needs
+    # nothing but the colormap
+    import matplotlib.style
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.collections import LineCollection
+    from matplotlib.figure import Figure
+
+    with matplotlib.style.context('dark_background'):
+        fig = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(fig)
+        fig.patch.set_facecolor('black')
+        ax = fig.add_subplot()
+        ax.set_facecolor('black')
+
+        # Plot the amplitude field (Magnitude)
+        # We use abs(Z) to visualize vibration intensity regardless of phase (up or down)
+        im = ax.imshow(np.abs(Z), extent=[-1, 1, -1, 1], cmap='magma', origin='lower', interpolation='bicubic')
+
+        # Overlay Nodal Lines (Amplitude = 0)
+        if lines is not None:
+            ax.add_collection(LineCollection(lines, colors=NODE_COLOR, linewidths=2, alpha=0.8))
+        else:
+            # We use a contour plot at level 0 on the original Z to find zero crossings accurately
+            ax.contour(x, y, Z, levels=[0], colors=NODE_COLOR, linewidths=2, alpha=0.8)
+
+        # Remove axes for clean art look
+        ax.axis('off')
+
+        # Add Colorbar
+        cbar = fig.colorbar(im, ax=ax, shrink=0.8, pad=0.05, aspect=30)
+        cbar.set_label('Vibration Amplitude', color='white', fontsize=12)
+        cbar.ax.yaxis.set_tick_params(color='white', labelcolor='white')
+        cbar.outline.set_edgecolor('white')
+    return fig
+
+
+def export_filename(shape, n, m, fmt):
+    shape_str = shape.replace(" ", "_").lower()
+    return f"chladni_{shape_str}_n{n}_m{m}.{EXPORT_FORMATS[fmt][0]}"
+
+
+def export_mime(fmt):
+    return EXPORT_FORMATS[fmt][1]
+
+
+def export_formats(renderer):
+    # The raster renderer produces bitmaps only
+    if renderer == FAST:
+        return [f for f, spec in EXPORT_FORMATS.items() if spec[2] is not None]
+    return list(EXPORT_FORMATS)
+
+
+def _export_raster(shape, n, m, mode, res, size, fmt, node_width, antialias):
+    # Upsampled from the cached display field instead of evaluating the field
+    # (Bessel functions for the circular plate) at the output size, and
+    # rasterized in bands so only the image itself is held at full size
+    from scipy.interpolate import RectBivariateSpline
+
+    x, y, Z = chladni.get_pattern(shape, n, m, res, mode, dtype=np.float32)
+    amp = np.abs(Z)
+    limits = (float(np.nanmin(amp)), float(np.nanmax(amp)))
+    # The clamped rim of the circular plate is a nodal circle: continue with 0
+    spline = RectBivariateSpline(y, x, np.nan_to_num(Z, nan=0.0))
+    del amp
+
+    axis = chladni.plate_axis(size)
+    width = node_width * size / RESOLUTION
+    # Halo rows so gradients and line widths at band edges match a full render
+    halo = int(np.ceil(width / 2)) + 2
+    image = np.empty((size, size, 4), dtype=np.uint8)
+    for start in range(0, size, EXPORT_BAND_ROWS):
+        stop = min(start + EXPORT_BAND_ROWS, size)
+        lo, hi = max(0, start - halo), min(size, stop + halo)
+        band = spline(axis[lo:hi], axis).astype(np.float32)
+        if shape != chladni.SQUARE:
+            band[np.add.outer(axis[lo:hi] ** 2, axis ** 2) > 1] = np.nan
+        rgba = rasterize(band, node_width=width, antialias=antialias, limits=limits)
+        # rasterize flips the band (image rows run from the top)
+        image[size - stop:size - start] = rgba[hi - stop:hi - start]
+    return encode_raster(image, fmt)
+
+
+def encode_raster(rgba, fmt="PNG"):
+    """Encode an RGBA raster in one of the bitmap export formats."""
+    image = Image.fromarray(rgba)
+    if fmt == "JPEG":
+        image = image.convert('RGB')
+    buf = io.BytesIO()
+    image.save(buf, format=EXPORT_FORMATS[fmt][2])
+    return buf.getvalue()
+
+
+def export_image(shape, n, m, mode, dpi=300, fmt="PNG", res=RESOLUTION, renderer=ANNOTATED,
+                 node_width=NODE_WIDTH, antialias=True):
+    """Encoded image of a mode; rendered once, then served from cache.
+
+    The raster renderer outputs a square image as wide as the 8-inch annotated
+    figure would be at ``dpi``, upsampled from the ``res`` px field.
+    """
+    key = chladni.pattern_key(shape, n, m, res, mode, np.float32) + (int(dpi), fmt, renderer)
+    if renderer == FAST:
+        key += (float(node_width), bool(antialias))
+        return export_cache.get_or_compute(
+            key, lambda: _export_raster(shape, n, m, mode, res, 8 * int(dpi), fmt, node_width, antialias))
+
+    def render():
+        x, y, Z = chladni.get_pattern(shape, n, m, res, mode, dtype=np.float32)
+        fig = annotated_figure(x, y, Z, nodal.nodal_lines(shape, n, m, mode))
+        buf = io.BytesIO()
+        fig.savefig(buf, format=EXPORT_FORMATS[fmt][0], bbox_inches='tight', facecolor='black', dpi=dpi)
+        return buf.getvalue()
+
+    return export_cache.get_or_compute(key, render)
@@ -0,0 +1,87 @@
+"""Shared simulation clock and frame pacing for the animated pages.
+
+``FrameClock`` runs a render loop at a target frame rate. Simulated time is
+derived from a monotonic clock (``time.monotonic``), so the physical speed of
+an animation does not depend on how fast frames are rendered. When the loop
+falls behind, whole frame slots are skipped (and counted as dropped) rather
+than slowing the simulation down, and when it is ahead it sleeps instead of
+spinning a core.
+
+    clock = FrameClock(target_fps=30, speed=0.5)
+    for t in clock:
+        ...render the frame for simulated time t...
+"""
+import time
+from collections import deque
+
+DEFAULT_FPS = 30
+
+
+class FrameClock:
+    def __init__(self, target_fps=DEFAULT_FPS, speed=1.0, window=60, clock=time.monotonic, sleep=time.sleep):
+        self.target_fps = float(target_fps)
+        self.frame_interval = 1.0 / self.target_fps
+        self.speed = speed
+        self._clock = clock
+        self._sleep = sleep
+        self._recent = deque(maxlen=window)
+        self.start = None
+        self.frames = 0
+        self.dropped_frames = 0
+        # Seconds the last tick spent waiting for its slot
+        self.last_sleep = 0.0
+        self._next_slot = 0
+
+    def elapsed(self):
+        """Wall-clock seconds since the first tick."""
+        if self.start is None:
+            return 0.0
+        return self._clock() - self.start
+
+    def sim_time(self):
+        """Simulated seconds (elapsed wall time scaled by ``speed``)."""
+        return self.elapsed() * self.speed
+
+    def tick(self):
+        """Wait for the next frame slot and return the simulated time for it."""
+        now = self._clock()
+        self.last_sleep = 0.0
+        if self.start is None:
+            self.start = now
+        else:
+            deadline = self.start + self._next_slot * self.frame_interval
+            if now < deadline:
+                self._sleep(deadline - now)
+                woke = self._clock()
+                self.last_sleep = woke - now
+                now = woke
+
+        # Skip any slots that have already passed instead of replaying them
+        slot = int((now - self.start) / self.frame_interval)
+        if self.frames and slot > self._next_slot:
+            self.dropped_frames += slot - self._next_slot
+        self._next_slot = slot + 1
+
+        self.frames += 1
+        self._recent.append(now)
+        return (now - self.start) * self.speed
+
+    def __iter__(self):
+        while True:
+            yield self.tick()
+
+    @property
+    def fps(self):
+        """Achieved frame rate over the recent window."""
+        if len(self._recent) < 2:
+            return 0.0
+        span = self._recent[-1] - self._recent[0]
+        return (len(self._recent) - 1) / span if span > 0 else 0.0
+
+    def stats(self):
+        return {
+            'target_fps': self.target_fps,
+            'fps': self.fps,
+            'frames': self.frames,
+            'dropped_frames': self.dropped_frames,
+        }
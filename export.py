@@ -0,0 +1,106 @@
+"""In-memory animation export (GIF, APNG, WebP, MP4).
+
+Frames for one period of a periodic animation are rendered in parallel on the
+shared render pool (``render_pool.render_frames``), come back as raw RGBA
+arrays and are encoded straight into memory: Pillow for the image formats,
+and ``ffmpeg`` over pipes for MP4 when it is installed. Nothing is written to
+disk. Finished exports are kept in a byte-bounded cache keyed by everything
+that changes the output, so asking for the same animation twice is free.
+"""
+import io
+import shutil
+import subprocess
+
+import numpy as np
+from PIL import Image, features
+
+import cache
+import render_pool
+
+GIF = "GIF"
+APNG = "APNG"
+WEBP = "WebP"
+MP4 = "MP4"
+
+# format name -> (Pillow format or None for ffmpeg, mime type, file extension)
+FORMATS = {
+    GIF: ('GIF', 'image/gif', 'gif'),
+    APNG: ('PNG', 'image/apng', 'png'),
+    WEBP: ('WEBP', 'image/webp', 'webp'),
+    MP4: (None, 'video/mp4', 'mp4'),
+}
+
+export_cache = cache.LRUCache(cache.default_budget('EXPORT_CACHE_MB', 128), name="exports")
+
+
+def available_formats():
+    """Formats that can be encoded in this environment (GIF and APNG always)."""
+    formats = [GIF, APNG]
+    if features.check('webp'):
+        formats.append(WEBP)
+    if shutil.which('ffmpeg'):
+        formats.append(MP4)
+    return formats
+
+
+def mime_type(fmt):
+    return FORMATS[fmt][1]
+
+
+def extension(fmt):
+    return FORMATS[fmt][2]
+
+
+def _encode_pillow(frames, fps, pil_format):
+    images = [Image.fromarray(rgba) for rgba in frames]
+    if pil_format == 'GIF':
+        # GIF has a 256-colour palette; quantize each frame explicitly
+        images = [im.convert('RGB').quantize(colors=256, method=Image.Quantize.MEDIANCUT) for im in images]
+    buf = io.BytesIO()
+    images[0].save(buf, format=pil_format, save_all=True, append_images=images[1:],
+                   duration=int(round(1000 / fps)), loop=0)
+    return buf.getvalue()
+
+
+def _encode_mp4(frames, fps):
+    # yuv420p needs even dimensions
+    h, w = (frames[0].shape[0] // 2) * 2, (frames[0].shape[1] // 2) * 2
+    cmd = [
+        shutil.which('ffmpeg'), '-loglevel', 'error', '-y',
+        '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{w}x{h}', '-r', str(fps), '-i', 'pipe:0',
+        '-c:v', 'libx264', '-pix_fmt', 'yuv420p',
+        # Fragmented MP4 can be written to a pipe (no seeking back for the index)
+        '-movflags', 'frag_keyframe+empty_moov',
+        '-f', 'mp4', 'pipe:1',
+    ]
+    raw = b''.join(np.ascontiguousarray(rgba[:h, :w, :3]).tobytes() for rgba in frames)
+    result = subprocess.run(cmd, input=raw, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.decode(errors='replace').strip()}")
+    return result.stdout
+
+
+def export_animation(kind, params, frames=50, fps=20, fmt=GIF, progress=None, session_id=None, local=False):
+    """Encoded animation of one period of ``(kind, params)`` as bytes.
+
+    ``frames`` evenly spaced phases are rendered (see ``frame_jobs``), so the
+    result loops seamlessly. ``progress(done, total)`` reports rendered frames;
+    ``session_id`` is the render pool session they are queued for, and
+    ``local=True`` renders them in the calling thread instead.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    key = (kind, params, int(frames), float(fps), fmt)
+    data = export_cache.get(key)
+    if data is not None:
+        if progress is not None:
+            progress(frames, frames)
+        return data
+
+    phases = [i / frames for i in range(frames)]
+    images = render_pool.render_frames(kind, params, phases, progress=progress, session_id=session_id, local=local)
+
+    pil_format = FORMATS[fmt][0]
+    data = _encode_mp4(images, fps) if pil_format is None else _encode_pillow(images, fps, pil_format)
+    export_cache.put(key, data)
+    return data
@@ -0,0 +1,59 @@
+"""Phase-indexed cache of rendered animation frames.
+
+With fixed parameters every animation repeats exactly once per period
+(``2*pi/omega``). The server loops therefore render ``samples`` evenly spaced
+phases per period once (about one per displayed frame, see ``samples_for``),
+keep the encoded PNGs in a byte-bounded LRU shared by all sessions, and
+afterwards serve each frame by looking up the nearest phase. Steady-state
+animation then costs a dictionary lookup and an image push instead of
+physics, matplotlib rendering and PNG encoding.
+"""
+import io
+
+import numpy as np
+from PIL import Image
+
+import cache
+
+# Phase samples per period: one per displayed frame, within these bounds
+MIN_SAMPLES = 60
+MAX_SAMPLES = 600
+DEFAULT_SAMPLES = MIN_SAMPLES
+
+frame_cache = cache.LRUCache(cache.default_budget('FRAME_CACHE_MB', 256), name="frames")
+
+
+def encode_png(rgba):
+    # Fast zlib level: the frame is encoded once and then served many times
+    buf = io.BytesIO()
+    Image.fromarray(np.asarray(rgba)).save(buf, format='PNG', compress_level=1)
+    return buf.getvalue()
+
+
+def phase_of(omega, t):
+    """Fraction of the period ``2*pi/omega`` elapsed at time ``t`` (0..1)."""
+    return (omega * t / (2 * np.pi)) % 1.0
+
+
+def samples_for(period, fps):
+    """Phase samples for a loop lasting ``period`` wall-clock seconds at ``fps``.
+
+    A slow loop (e.g. a 60 s period) would otherwise show each of 60 samples
+    for a whole second; the count is part of every cache key.
+    """
+    return int(np.clip(round(period * fps), MIN_SAMPLES, MAX_SAMPLES))
+
+
+def phase_index(phase, samples=DEFAULT_SAMPLES):
+    return int(round(phase * samples)) % samples
+
+
+def get_frame(key, phase, render, samples=DEFAULT_SAMPLES):
+    """Encoded PNG of the frame nearest to ``phase`` for parameters ``key``.
+
+    ``key`` must identify everything that changes the picture. On a miss,
+    ``render(sample_phase)`` is called with the quantized phase and must
+    return an RGBA array.
+    """
+    index = phase_index(phase, samples)
+    return frame_cache.get_or_compute((key, samples, index), lambda: encode_png(render(index / samples)))
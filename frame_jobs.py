@@ -0,0 +1,120 @@
+"""Picklable frame jobs for the periodic animations.
+
+A job is ``(kind, params, phase)``: ``kind`` names one of the animations,
+``params`` is a tuple of plain numbers that fully determines the picture and
+``phase`` is the position within one period (0..1). The same jobs are run
+in the page's own thread or in the render worker processes, which keep a few
+renderers per process so consecutive frames only blit.
+
+A renderer owns one matplotlib figure and is not thread-safe. Without worker
+processes (``RENDER_WORKERS=0``) the jobs run in the script threads of all
+sessions at once, so each renderer is only used under its own lock.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+import frame_cache
+import kernels
+import renderers
+
+# Renderers kept alive per process (each owns a matplotlib figure)
+MAX_SOURCES = 8
+
+
+class StandingWaveFrames:
+    def __init__(self, k, length, x_view, y_lim, n_points=200):
+        self.k = k
+        self.x = np.linspace(0, length, n_points)
+        self.profile = kernels.standing_wave_profile(k, self.x)
+        wavelength = 2 * np.pi / k
+        self.renderer = renderers.StringWaveRenderer(self.x, x_view, y_lim)
+        self.renderer.set_shape(self.profile[0], kernels.string_node_positions(wavelength, length), 2 * length / wavelength)
+
+    def __call__(self, phase):
+        # With time measured in periods, omega is 2*pi
+        y = kernels.standing_wave(self.k, 2 * np.pi, phase, self.x, profile=self.profile)[0, 0]
+        return self.renderer.frame(y)
+
+
+class CircularLoopFrames:
+    def __init__(self, n, amplitude, size=600, title=None, r0=1.0, n_points=1000):
+        self.n, self.amplitude = n, amplitude
+        self.theta = np.linspace(0, 2 * np.pi, n_points)
+        self.profile = kernels.circular_loop_profile(n, amplitude, self.theta, r0)
+        # Square figure of size x size pixels
+        self.renderer = renderers.CircularLoopRenderer(n, limit=r0 + amplitude + 0.1, title=title, dpi=size / 6)
+
+    def __call__(self, phase):
+        x, y = kernels.circular_loop(self.n, 2 * np.pi, self.amplitude, phase, self.theta, profile=self.profile)
+        return self.renderer.frame(x[0, 0], y[0, 0])
+
+
+class LongitudinalFrames:
+    def __init__(self, n_particles, mode_n, amplitude_factor, length=10.0):
+        self.x0, y0 = kernels.longitudinal_layout(n_particles, length)
+        self.k = mode_n * np.pi / length
+        self.amplitude = kernels.longitudinal_amplitude(n_particles, length, amplitude_factor)
+        self.profile = kernels.longitudinal_profile(self.k, self.amplitude, self.x0)
+        self.renderer = renderers.LongitudinalRenderer(self.x0, y0, length, mode_n)
+
+    def __call__(self, phase):
+        positions, colours = kernels.longitudinal_wave(self.k, 2 * np.pi, self.amplitude, phase, self.x0, profile=self.profile)
+        return self.renderer.frame(positions[0, 0], colours[0, 0], kernels.speaker_displacement(2 * np.pi, phase))
+
+
+FRAME_KINDS = {
+    'standing': StandingWaveFrames,
+    'circular': CircularLoopFrames,
+    'longitudinal': LongitudinalFrames,
+}
+
+# (kind, params) -> (renderer, lock held while it draws)
+_sources = OrderedDict()
+_sources_lock = threading.Lock()
+
+
+def frame_source(kind, params):
+    """Per-process renderer for ``(kind, params)`` and its lock, reused across frames."""
+    key = (kind, params)
+    with _sources_lock:
+        entry = _sources.get(key)
+        if entry is not None:
+            _sources.move_to_end(key)
+            return entry
+    # Built outside the list lock: a new figure takes a while. If two threads
+    # race, one of the two renderers is dropped.
+    source = FRAME_KINDS[kind](*params)
+    with _sources_lock:
+        entry = _sources.setdefault(key, (source, threading.Lock()))
+        while len(_sources) > MAX_SOURCES:
+            _sources.popitem(last=False)
+    return entry
+
+
+def render_rgba(kind, params, phase):
+    return render_timed(kind, params, phase, encode=False)[0]
+
+
+def render_png(kind, params, phase):
+    return render_timed(kind, params, phase)[0]
+
+
+def render_timed(kind, params, phase, encode=True):
+    """``(frame, timings)``: PNG bytes (or the RGBA array) and its stage times.
+
+    ``timings`` is a tuple of ``(scope, stage, seconds)``. Stage timings
+    recorded in a worker process stay in that process, so the render pool
+    records these in the server instead.
+    """
+    source, lock = frame_source(kind, params)
+    with lock:
+        frame = source(phase)
+        timings = source.renderer.last_timings
+    if encode:
+        start = time.perf_counter()
+        frame = frame_cache.encode_png(frame)
+        timings += (('frame_jobs', 'encode', time.perf_counter() - start),)
+    return frame, timings
@@ -0,0 +1,133 @@
+"""Thumbnail gallery of the Chladni mode space.
+
+Thumbnails for a range of ``(n, m)`` modes are rendered in parallel by a
+process pool and stored as small PNG files under ``GALLERY_DIR``, one
+directory per plate shape, superposition and thumbnail size. Later visits
+(and other sessions) only read the stored files, so a gallery is built once
+and afterwards loads instantly. Rendering is resumable: modes whose file
+already exists are skipped.
+"""
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from PIL import Image
+
+import cache
+import chladni
+import chladni_render
+
+GALLERY_DIR = os.environ.get('GALLERY_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'gallery'))
+
+THUMB_SIZES = [64, 96, 128, 192]
+DEFAULT_THUMB_SIZE = 96
+# Thumbnails are rendered at this multiple of their size and downsampled,
+# so high modes do not alias into moire
+SUPERSAMPLE = 2
+# Modes per pool task; amortizes the per-task overhead
+CHUNK = 16
+
+thumb_cache = cache.LRUCache(cache.default_budget('GALLERY_CACHE_MB', 64), name="gallery")
+
+
+def gallery_dir(shape, mode, size, root=None):
+    shape_str = shape.replace(" ", "_").lower()
+    mode_str = ('sum' if mode == chladni.SUM else 'diff') if shape == chladni.SQUARE else 'modes'
+    return os.path.join(root or GALLERY_DIR, f"{shape_str}_{mode_str}_{int(size)}px")
+
+
+def thumb_path(shape, mode, size, n, m, root=None):
+    return os.path.join(gallery_dir(shape, mode, size, root), f"n{int(n)}_m{int(m)}.png")
+
+
+def render_thumbnail(shape, n, m, mode, size=DEFAULT_THUMB_SIZE):
+    """PNG bytes of a ``size`` px thumbnail of one mode."""
+    res = size * SUPERSAMPLE
+    Z = chladni.calculate_pattern_rows(shape, n, m, res, mode, 0, res)
+    # Lines about one thumbnail pixel wide whatever the size
+    rgba = chladni_render.rasterize(Z, node_width=1.2 * SUPERSAMPLE)
+    image = Image.fromarray(rgba[..., :3]).resize((size, size), Image.Resampling.LANCZOS)
+    buf = io.BytesIO()
+    image.save(buf, format='PNG', optimize=True)
+    return buf.getvalue()
+
+
+def _write_atomic(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _render_chunk(job):
+    shape, mode, size, modes, root = job
+    for n, m in modes:
+        _write_atomic(thumb_path(shape, mode, size, n, m, root), render_thumbnail(shape, n, m, mode, size))
+    return len(modes)
+
+
+def missing_modes(shape, mode, size, modes, root=None):
+    return [(n, m) for n, m in modes if not os.path.exists(thumb_path(shape, mode, size, n, m, root))]
+
+
+def build(shape, mode, modes, size=DEFAULT_THUMB_SIZE, workers=None, progress=None, root=None):
+    """Render the thumbnails of ``modes`` that are not stored yet.
+
+    ``workers`` processes render chunks of modes (default: CPU count; ``0`` or
+    ``1`` renders in this process). ``progress(done, total)`` counts modes.
+    Returns the number of thumbnails rendered.
+    """
+    todo = missing_modes(shape, mode, size, modes, root)
+    if not todo:
+        return 0
+    os.makedirs(gallery_dir(shape, mode, size, root), exist_ok=True)
+    jobs = [(shape, mode, size, todo[i:i + CHUNK], root) for i in range(0, len(todo), CHUNK)]
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    done = 0
+    if workers <= 1:
+        for job in jobs:
+            done += _render_chunk(job)
+            if progress is not None:
+                progress(done, len(todo))
+        return done
+
+    # spawn: never fork a threaded server process
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        for future in as_completed([executor.submit(_render_chunk, job) for job in jobs]):
+            done += future.result()
+            if progress is not None:
+                progress(done, len(todo))
+    return done
+
+
+def thumbnail(shape, mode, size, n, m, root=None):
+    """Stored thumbnail PNG of a mode, or None if it has not been built."""
+    path = thumb_path(shape, mode, size, n, m, root)
+
+    def load():
+        with open(path, 'rb') as f:
+            return f.read()
+
+    if path in thumb_cache or os.path.exists(path):
+        return thumb_cache.get_or_compute(path, load)
+    return None
+
+
+def contact_sheet(shape, mode, size, n_values, m_values, gap=2, root=None):
+    """PNG contact sheet: one row per ``n``, one column per ``m`` (stored thumbnails only)."""
+    rows, cols = len(n_values), len(m_values)
+    sheet = np.zeros((rows * (size + gap) + gap, cols * (size + gap) + gap, 3), dtype=np.uint8)
+    for i, n in enumerate(n_values):
+        for j, m in enumerate(m_values):
+            png = thumbnail(shape, mode, size, n, m, root)
+            if png is None:
+                continue
+            y, x = gap + i * (size + gap), gap + j * (size + gap)
+            sheet[y:y + size, x:x + size] = np.asarray(Image.open(io.BytesIO(png)).convert('RGB'))
+    buf = io.BytesIO()
+    Image.fromarray(sheet).save(buf, format='PNG')
+    return buf.getvalue()
@@ -0,0 +1,186 @@
+"""Vectorized physics kernels shared by the simulation pages.
+
+Nothing in here imports Streamlit, so the same code can be used by the pages,
+the exporters and offline batch jobs.
+
+Every model is separable into a spatial factor and a temporal factor
+(``f(x) * cos(omega * t)``), so the kernels evaluate whole batches at once:
+
+    P parameter sets  x  T time samples  x  X spatial points  ->  (P, T, X)
+
+Parameters may be scalars or 1-D arrays of length P; times are a scalar or a
+1-D array of length T. The spatial factors can be precomputed once with the
+``*_profile`` helpers and passed back in, so a loop that only advances time
+never re-evaluates ``sin``/``cos`` over the spatial grid.
+"""
+import numpy as np
+
+# Display amplitude used by the Standing Waves page (0.1 * 2)
+STRING_AMPLITUDE = 0.2
+
+
+def _params(*values):
+    # Broadcast scalar / 1-D parameters to a common (P,) shape
+    arrays = [np.atleast_1d(np.asarray(v, dtype=float)) for v in values]
+    return np.broadcast_arrays(*arrays)
+
+
+def _times(t):
+    return np.atleast_1d(np.asarray(t, dtype=float))
+
+
+def _temporal(omega, t):
+    # cos(omega * t) for every parameter set and time sample -> (P, T)
+    return np.cos(np.multiply.outer(omega, _times(t)))
+
+
+def _combine(spatial, temporal, out=None):
+    # (P, X) spatial factor times (P, T) temporal factor -> (P, T, X);
+    # either P may be 1 and is broadcast against the other
+    return np.multiply(temporal[:, :, None], spatial[:, None, :], out=out)
+
+
+# --- String (Melde's experiment) ---
+
+def string_wave_speed(tension, density):
+    return np.sqrt(np.asarray(tension, dtype=float) / density)
+
+
+def string_harmonic_frequency(n, tension, density, length):
+    # f_n = n * v / (2L)
+    return n * string_wave_speed(tension, density) / (2 * length)
+
+
+def string_wave_numbers(frequency, tension, density, length):
+    """Return ``(k, omega, harmonic_number)`` for a driven string."""
+    wavelength = string_wave_speed(tension, density) / frequency
+    k = 2 * np.pi / wavelength
+    omega = 2 * np.pi * np.asarray(frequency, dtype=float)
+    harmonic_number = (2 * length) / wavelength
+    return k, omega, harmonic_number
+
+
+def string_node_positions(wavelength, length):
+    # Nodes every half wavelength, including both ends
+    max_m = int(2 * length / wavelength)
+    positions = np.arange(0, max_m + 1) * wavelength / 2
+    return positions[positions <= length + 1e-5]
+
+
+def standing_wave_profile(k, x, amplitude=STRING_AMPLITUDE):
+    """Spatial factor ``A * sin(k x)`` with shape (P, X)."""
+    k, amplitude = _params(k, amplitude)
+    return amplitude[:, None] * np.sin(np.multiply.outer(k, x))
+
+
+def standing_wave(k, omega, t, x, amplitude=STRING_AMPLITUDE, profile=None, out=None):
+    """Displacement ``A sin(k x) cos(omega t)`` with shape (P, T, X)."""
+    if profile is None:
+        profile = standing_wave_profile(k, x, amplitude)
+    (omega,) = _params(omega)
+    return _combine(profile, _temporal(omega, t), out=out)
+
+
+# --- Circular wire loop ---
+
+def circular_loop_profile(n, amplitude, theta, r0=1.0):
+    """Precomputed factors for the loop: ``(base_x, base_y, mod_x, mod_y)``.
+
+    ``base_*`` is the rest circle (X,), ``mod_*`` the radial mode shape
+    projected on each axis (P, X).
+    """
+    n, amplitude = _params(n, amplitude)
+    cos_t = np.cos(theta)
+    sin_t = np.sin(theta)
+    shape = amplitude[:, None] * np.sin(np.multiply.outer(n, theta))
+    return r0 * cos_t, r0 * sin_t, shape * cos_t, shape * sin_t
+
+
+def circular_loop(n, omega, amplitude, t, theta, r0=1.0, profile=None):
+    """Cartesian ``(x, y)`` of ``R = r0 + A sin(n theta) cos(omega t)``.
+
+    Both arrays have shape (P, T, X).
+    """
+    if profile is None:
+        profile = circular_loop_profile(n, amplitude, theta, r0)
+    base_x, base_y, mod_x, mod_y = profile
+    (omega,) = _params(omega)
+    temporal = _temporal(omega, t)
+    x = _combine(mod_x, temporal)
+    x += base_x
+    y = _combine(mod_y, temporal)
+    y += base_y
+    return x, y
+
+
+# --- Longitudinal wave ---
+
+# From this many particles on, the medium is a gas filling the tube instead of
+# one chain of particles along the axis
+GAS_PARTICLES = 1000
+# A gas has no chain order to keep; it moves like a chain of this many particles
+GAS_REFERENCE_PARTICLES = 50
+# Half height of the gas column (the speaker housing is 0.8 high)
+GAS_HALF_HEIGHT = 0.35
+
+
+def longitudinal_layout(n_particles, length, seed=0):
+    """Equilibrium positions ``(x0, y0)`` of the particles.
+
+    A chain is evenly spaced on the axis; a gas (``n_particles >=
+    GAS_PARTICLES``) is spread uniformly over the column, reproducibly for a
+    given ``seed``.
+    """
+    if n_particles < GAS_PARTICLES:
+        return np.linspace(0, length, n_particles), np.zeros(n_particles)
+    rng = np.random.default_rng(seed)
+    x0 = np.sort(rng.uniform(0, length, n_particles))
+    y0 = rng.uniform(-GAS_HALF_HEIGHT, GAS_HALF_HEIGHT, n_particles)
+    return x0, y0
+
+
+def longitudinal_amplitude(n_particles, length, amplitude_factor):
+    # Keep neighbouring particles from crossing for amplitude_factor <= 1
+    if n_particles >= GAS_PARTICLES:
+        n_particles = GAS_REFERENCE_PARTICLES
+    spacing = length / (n_particles - 1)
+    return spacing * 0.9 * amplitude_factor
+
+
+def longitudinal_profile(k, amplitude, x0):
+    """Precomputed factors ``(disp_shape, colour_shape)`` with shape (P, X).
+
+    ``disp_shape`` is ``A cos(k x0)``; ``colour_shape`` is the normalised
+    compression ``sin(k x0)`` scaled so that ``0.5 + 0.5 * colour_shape *
+    cos(omega t)`` lies in [0, 1].
+    """
+    k, amplitude = _params(k, amplitude)
+    kx = np.multiply.outer(k, x0)
+    disp_shape = amplitude[:, None] * np.cos(kx)
+    # strain = -A k sin(kx) cos(wt); compression = -strain / (A k)
+    limit = amplitude * k + 1e-9
+    colour_shape = (amplitude * k / limit)[:, None] * np.sin(kx)
+    return disp_shape, colour_shape
+
+
+def longitudinal_wave(k, omega, amplitude, t, x0, profile=None):
+    """Particle positions and colour values (0=rarefaction, 1=compression).
+
+    Both arrays have shape (P, T, X).
+    """
+    if profile is None:
+        profile = longitudinal_profile(k, amplitude, x0)
+    disp_shape, colour_shape = profile
+    (omega,) = _params(omega)
+    temporal = _temporal(omega, t)
+    positions = _combine(disp_shape, temporal)
+    positions += x0
+    colours = _combine(colour_shape, temporal)
+    colours *= 0.5
+    colours += 0.5
+    return positions, colours
+
+
+def speaker_displacement(omega, t, stroke=0.3):
+    # Speaker cone moves in phase with the boundary particle
+    return stroke * np.cos(omega * np.asarray(t, dtype=float))
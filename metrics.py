@@ -0,0 +1,210 @@
+"""Per-stage timing of the animation loops.
+
+Each animated page wraps the stages of its frame loop (physics, rendering,
+pushing the image, waiting for the next frame slot) in a ``FrameTimer``.
+Timings go into a process-wide registry that keeps, per ``(scope, stage)``,
+a rolling window of recent samples (for percentiles) and a cumulative
+histogram with fixed millisecond buckets, so a stutter can be pinned on one
+stage.
+
+    timer = metrics.FrameTimer('circular')
+    for t in frame_clock:
+        timer.frame_start(frame_clock)
+        with timer.stage('frame'):
+            png = ...
+        with timer.stage('push'):
+            placeholder.image(png)
+    caption = timer.overlay()
+
+Aggregated metrics can be read with ``snapshot()`` (shown on the Settings
+page) and exported for monitoring:
+
+* ``METRICS_LOG_INTERVAL=<seconds>`` logs a JSON snapshot periodically
+  (logger ``metrics``),
+* ``METRICS_PORT=<port>`` serves ``/metrics`` (Prometheus text format) and
+  ``/metrics.json`` on localhost.
+"""
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Samples kept per stage for percentiles
+WINDOW = 300
+# Upper bounds of the histogram buckets in milliseconds
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 1000, math.inf)
+
+
+class StageStats:
+    def __init__(self, window=WINDOW):
+        self.recent = deque(maxlen=window)
+        self.buckets = [0] * len(BUCKETS_MS)
+        self.count = 0
+        self.total_ms = 0.0
+
+    def add(self, ms):
+        self.recent.append(ms)
+        self.count += 1
+        self.total_ms += ms
+        for i, bound in enumerate(BUCKETS_MS):
+            if ms <= bound:
+                self.buckets[i] += 1
+                break
+
+    def summary(self):
+        recent = np.fromiter(self.recent, dtype=float)
+        p50, p90, p99 = np.percentile(recent, [50, 90, 99]) if len(recent) else (0.0, 0.0, 0.0)
+        return {
+            'count': self.count,
+            'mean_ms': self.total_ms / self.count if self.count else 0.0,
+            'p50_ms': float(p50),
+            'p90_ms': float(p90),
+            'p99_ms': float(p99),
+            'max_ms': float(recent.max()) if len(recent) else 0.0,
+            'buckets': dict(zip([str(b) for b in BUCKETS_MS], self.buckets)),
+        }
+
+
+class Registry:
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, scope, stage, seconds):
+        with self._lock:
+            stats = self._stats.get((scope, stage))
+            if stats is None:
+                stats = self._stats[(scope, stage)] = StageStats()
+            stats.add(seconds * 1000)
+
+    def snapshot(self):
+        """``{scope: {stage: summary}}`` of everything recorded so far."""
+        with self._lock:
+            items = [(key, stats.summary()) for key, stats in self._stats.items()]
+        result = {}
+        for (scope, stage), summary in sorted(items):
+            result.setdefault(scope, {})[stage] = summary
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._stats.clear()
+
+    def prometheus(self):
+        """Snapshot as Prometheus text exposition (a histogram per stage)."""
+        lines = ["# TYPE frame_stage_ms histogram"]
+        for scope, stages in self.snapshot().items():
+            for stage, s in stages.items():
+                labels = f'scope="{scope}",stage="{stage}"'
+                cumulative = 0
+                for bound, count in s['buckets'].items():
+                    cumulative += count
+                    le = "+Inf" if bound == "inf" else bound
+                    lines.append(f'frame_stage_ms_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f"frame_stage_ms_sum{{{labels}}} {s['mean_ms'] * s['count']:.6f}")
+                lines.append(f"frame_stage_ms_count{{{labels}}} {s['count']}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def record(scope, stage, seconds):
+    registry.record(scope, stage, seconds)
+
+
+def snapshot():
+    return registry.snapshot()
+
+
+class FrameTimer:
+    """Times the stages of one animation loop (one per page run)."""
+
+    def __init__(self, scope, window=60):
+        self.scope = scope
+        self._recent = {}
+        self._window = window
+        start_exporters()
+
+    def _add(self, stage, seconds):
+        registry.record(self.scope, stage, seconds)
+        recent = self._recent.get(stage)
+        if recent is None:
+            recent = self._recent[stage] = deque(maxlen=self._window)
+        recent.append(seconds * 1000)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add(name, time.perf_counter() - start)
+
+    def frame_start(self, frame_clock=None):
+        """Call at the top of each frame; records the clock's wait as 'wait'."""
+        if frame_clock is not None and frame_clock.frames > 1:
+            self._add('wait', frame_clock.last_sleep)
+
+    def overlay(self):
+        """One-line breakdown of this loop's recent stage times (median ms)."""
+        parts = [f"{stage} {np.median(recent):.2f} ms" for stage, recent in self._recent.items() if recent]
+        return " · ".join(parts)
+
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+def start_exporters():
+    """Start the log / HTTP exporters configured in the environment (once)."""
+    global _exporters_started
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+
+    interval = float(os.environ.get('METRICS_LOG_INTERVAL', 0) or 0)
+    if interval > 0:
+        def log_loop():
+            while True:
+                time.sleep(interval)
+                logger.info("frame metrics %s", json.dumps(snapshot(), separators=(',', ':')))
+        threading.Thread(target=log_loop, name="metrics-log", daemon=True).start()
+
+    port = int(os.environ.get('METRICS_PORT', 0) or 0)
+    if port:
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body, kind = registry.prometheus().encode(), 'text/plain; version=0.0.4'
+                elif self.path == '/metrics.json':
+                    body, kind = json.dumps(snapshot()).encode(), 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', kind)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        try:
+            server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        except OSError as e:
+            logger.warning("Metrics endpoint not started on port %s: %s", port, e)
+            return
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
@@ -0,0 +1,92 @@
+"""Vector nodal lines (Z = 0) of Chladni patterns.
+
+The zero set of a mode is extracted with marching squares (``contourpy``, the
+engine behind matplotlib's contours): each grid cell whose corners change sign
+contributes a segment whose end points are linearly interpolated along the
+cell edges, and the segments are joined into polylines. Interpolation places
+the lines with sub-pixel accuracy, so a modest grid gives smooth,
+resolution-independent curves. Polylines are cached per mode and can be
+written out as SVG (e.g. laser-cutting templates) or JSON.
+"""
+import json
+
+import numpy as np
+from contourpy import LineType, contour_generator
+
+import cache
+import chladni
+
+# Grid used for extraction; interpolation makes much finer rasters unnecessary
+NODAL_RES = 300
+
+polyline_cache = cache.LRUCache(cache.default_budget('CHLADNI_NODAL_MB', 32), name="chladni-nodal")
+
+
+def extract_polylines(x, y, Z, level=0.0):
+    """Polylines of ``Z == level`` as a list of ``(k, 2)`` float32 arrays of (x, y).
+
+    ``x`` and ``y`` are the 1-D axes; NaN cells (outside a circular plate) are
+    skipped.
+    """
+    Z = np.asarray(Z, dtype=np.float64)
+    finite = Z[np.isfinite(Z)]
+    if finite.size == 0 or not finite.any():
+        # Identically zero field (n == m in difference mode): no lines
+        return []
+    gen = contour_generator(x, y, np.ma.masked_invalid(Z), line_type=LineType.Separate)
+    return [line.astype(np.float32) for line in gen.lines(level) if len(line) > 1]
+
+
+def nodal_lines(shape, n, m, mode=chladni.DIFFERENCE, res=NODAL_RES):
+    """Cached nodal polylines of a plate mode (tuple of read-only arrays)."""
+    key = chladni.pattern_key(shape, n, m, res, mode, np.float64)
+
+    def compute():
+        x, y, Z = chladni.get_pattern(shape, n, m, res, mode, dtype=np.float64)
+        return tuple(extract_polylines(x, y, Z))
+
+    return polyline_cache.get_or_compute(key, compute)
+
+
+def to_svg(lines, shape=chladni.SQUARE, size_mm=200.0, stroke='#000000', stroke_mm=0.2, outline=True):
+    """SVG document of the polylines on a ``size_mm`` square (plate [-1, 1]^2).
+
+    Coordinates are in millimetres with y pointing up on the plate. With
+    ``outline`` the plate boundary is drawn as well.
+    """
+    half = size_mm / 2
+
+    def path(line):
+        px = (line[:, 0] + 1) * half
+        py = (1 - line[:, 1]) * half
+        points = " L".join(f"{a:.3f} {b:.3f}" for a, b in zip(px, py))
+        return f'<path d="M{points}"/>'
+
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{size_mm:g}mm" height="{size_mm:g}mm" '
+        f'viewBox="0 0 {size_mm:g} {size_mm:g}">',
+        f'<g fill="none" stroke="{stroke}" stroke-width="{stroke_mm:g}" stroke-linejoin="round" stroke-linecap="round">',
+    ]
+    if outline:
+        if shape == chladni.SQUARE:
+            parts.append(f'<rect x="0" y="0" width="{size_mm:g}" height="{size_mm:g}"/>')
+        else:
+            parts.append(f'<circle cx="{half:g}" cy="{half:g}" r="{half:g}"/>')
+    parts.extend(path(line) for line in lines)
+    parts.append('</g>')
+    parts.append('</svg>')
+    return "\n".join(parts)
+
+
+def to_json(lines, shape, n, m, mode=None, decimals=5):
+    """JSON document with the polylines in plate coordinates ([-1, 1] on both axes)."""
+    doc = {
+        'shape': shape,
+        'n': int(n),
+        'm': int(m),
+        'mode': mode if shape == chladni.SQUARE else None,
+        'extent': [-1, 1, -1, 1],
+        'lines': [np.round(line.astype(float), decimals).tolist() for line in lines],
+    }
+    return json.dumps(doc, separators=(',', ':'))
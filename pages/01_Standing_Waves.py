@@ -1,21 +1,31 @@
 import streamlit as st
 import numpy as np
-import matplotlib.pyplot as plt
 import time
 import sys
 import os
 
 # Add parent directory to path to allow importing utils
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import startup
+# Started before the other imports so that their cost on a cold process counts
+first_frame = startup.FirstFrame('standing_waves')
 import utils
+import kernels
+import driven_string
+import renderers
+import clock
+import player
+import frame_cache
+import render_pool
+import metrics
 
 # Page Config
 st.set_page_config(page_title="Standing Wave Simulation", layout="wide")
 
 utils.add_footer()
 
-# Apply dark background style for matplotlib
-plt.style.use('dark_background')
+# Dark matplotlib style, fonts and colormaps (once per process)
+startup.warm()
 
 # Title
 st.title("Standing Waves on a String (Melde's Experiment)")
@@ -37,6 +47,31 @@ l_val = max(s_length['min'], min(s_length['default'], s_length['max']))
 length = st.sidebar.slider("String Length (m)", min_value=s_length['min'], max_value=s_length['max'], value=l_val, step=s_length['step'])
 
 st.sidebar.markdown("---")
+# Analytic standing wave, or the string integrated in time from rest (driven_string.py)
+ANALYTIC = "Analytic Standing Wave"
+DRIVEN = "Driven String (finite difference)"
+model = st.sidebar.radio("Model", [ANALYTIC, DRIVEN], help="The driven string starts at rest: its amplitude builds up at a resonance and stays small between them.")
+driven = model == DRIVEN
+
+# Vibrator stroke of the driven string (m); at a resonance the string settles
+# near 2 c / (gamma L) times this
+DRIVE_AMPLITUDE = 0.01
+# Least damping (1/s) the view is scaled for: with less, the steady state near
+# a resonance grows without bound (and never forms at gamma = 0)
+VIEW_DAMPING = 0.5
+
+
+def driven_y_lim(length, wave_speed, omega, damping):
+    """Vertical view of the driven string (m): 20% above its steady-state peak.
+
+    The peak is far above the analytic model's slider range near a resonance
+    (about 2 m for gamma = 1), so the view follows it instead. Below
+    ``VIEW_DAMPING`` the view stays at that damping's peak.
+    """
+    amplitude = driven_string.steady_state_amplitude(length, wave_speed, omega, DRIVE_AMPLITUDE, max(damping, VIEW_DAMPING))
+    return 1.2 * amplitude
+
+
 # Control Mode Selection
 control_mode = st.sidebar.radio("Control Mode", ["Manual Frequency", "Set Harmonic Number (n)"])
 
@@ -47,8 +82,20 @@ else:
     target_n = st.sidebar.slider("Harmonic Number (n)", min_value=1, max_value=20, value=1, step=1, help="Number of Antinodes (Loops). Total Nodes = n + 1")
     frequency_input = 50.0 # Placeholder
 
+if driven:
+    st.sidebar.subheader("Driven String")
+    damping = st.sidebar.slider("Damping γ (1/s)", min_value=0.0, max_value=50.0, value=8.0, step=0.5, help="Air and internal friction. Less damping: higher and sharper resonances that take longer to build up.")
+    time_scale = st.sidebar.select_slider("Slow Motion", options=[0.01, 0.02, 0.05, 0.1], value=0.05, format_func=lambda v: f"1/{round(1 / v)}", help="Simulated seconds per real second.")
+
 st.sidebar.markdown("---")
 run_animation = st.sidebar.checkbox("Start Animation", value=False)
+target_fps = utils.target_fps_slider()
+if driven:
+    # No period to loop before the steady state is reached
+    playback_mode = utils.PLAYBACK_SERVER
+    st.sidebar.caption("Plays back from the server.")
+else:
+    playback_mode = utils.playback_radio()
 
 # Analysis Section (Moved Up)
 st.markdown("###  Analysis: Frequency vs. Tension")
@@ -58,7 +105,7 @@ with analysis_expander:
     col_analysis1, col_analysis2 = st.columns([1, 3])
     with col_analysis1:
         analysis_n = st.number_input("Select Harmonic Mode (n)", min_value=1, max_value=10, value=1, step=1)
-        sweep_tension = st.checkbox("Animate Tension Sweep", value=False, help="Automatically vary tension to see the point move along the curve.")
+        sweep_tension = st.checkbox("Animate Tension Sweep", value=False, disabled=driven, help="Automatically vary tension to see the point move along the curve.") and not driven
     
     analysis_plot_placeholder = st.empty()
 
@@ -68,47 +115,50 @@ st.markdown("### Visualization")
 with st.expander("Adjust Plot View (Zoom/Pan)"):
     col_view1, col_view2 = st.columns(2)
     with col_view1:
-        y_lim = st.slider("Vertical Scale (Amplitude)", 0.05, 1.0, 0.3, 0.05)
+        y_lim = st.slider("Vertical Scale (Amplitude)", 0.05, 1.0, 0.3, 0.05, disabled=driven,
+                          help="The driven string is scaled to its steady-state amplitude." if driven else None)
     with col_view2:
         x_view = st.slider("Horizontal View (Position)", 0.0, length, (0.0, length))
 
 plot_placeholder = st.empty()
 
 # Main Loop Logic
-start_time = time.time()
-
 # Determine if we are in a loop
 is_running = run_animation or sweep_tension
+# A fixed-tension animation is periodic, so the browser can loop it by itself;
+# the tension sweep still needs the server loop
+client_playback = run_animation and not sweep_tension and playback_mode == utils.PLAYBACK_BROWSER
 
-if not is_running:
+if not is_running or client_playback:
     # Single frame render
     current_tension = tension_input
     
     # Calculate Physics
-    wave_speed = np.sqrt(current_tension / linear_density)
+    wave_speed = kernels.string_wave_speed(current_tension, linear_density)
     
     if control_mode == "Manual Frequency":
         current_frequency = frequency_input
     else:
-        current_frequency = target_n * wave_speed / (2 * length)
+        current_frequency = kernels.string_harmonic_frequency(target_n, current_tension, linear_density, length)
         
     wavelength = wave_speed / current_frequency
-    k = 2 * np.pi / wavelength
-    harmonic_number = (2 * length) / wavelength
+    k, omega, harmonic_number = kernels.string_wave_numbers(current_frequency, current_tension, linear_density, length)
     
     # Render Analysis Plot
-    fig_analysis, ax_analysis = plt.subplots(figsize=(8, 4))
+    # Bare figures: nothing to close, and no pyplot import for the page
+    from matplotlib.figure import Figure
+    fig_analysis = Figure(figsize=(8, 4))
+    ax_analysis = fig_analysis.subplots()
     fig_analysis.patch.set_facecolor('#0E1117')
     ax_analysis.set_facecolor('#0E1117')
     
     t_values = np.linspace(0.1, 100.0, 200)
-    factor = analysis_n / (2 * length * np.sqrt(linear_density))
-    f_values = factor * np.sqrt(t_values)
+    f_values = kernels.string_harmonic_frequency(analysis_n, t_values, linear_density, length)
     
     ax_analysis.plot(t_values, f_values, color='#00FFFF', linewidth=2, label=f'Mode n={analysis_n}')
     
     # Current point
-    required_f_at_current_T = factor * np.sqrt(current_tension)
+    required_f_at_current_T = kernels.string_harmonic_frequency(analysis_n, current_tension, linear_density, length)
     
     ax_analysis.plot(current_tension, required_f_at_current_T, 'o', color='#FF0055', markersize=10)
     ax_analysis.annotate(f'T={current_tension:.1f}N\nReq f={required_f_at_current_T:.1f}Hz', 
@@ -126,152 +176,216 @@ if not is_running:
     
     with analysis_expander:
         analysis_plot_placeholder.pyplot(fig_analysis)
-    plt.close(fig_analysis)
 
     # Render Wave Plot
     x = np.linspace(0, length, 500)
-    y_envelope_upper = 0.1 * 2 * np.sin(k * x)
-    y_envelope_lower = -0.1 * 2 * np.sin(k * x)
-    
-    max_m = int(2 * length / wavelength)
-    node_indices = np.arange(0, max_m + 1)
-    node_positions = node_indices * wavelength / 2
-    node_positions = node_positions[node_positions <= length + 1e-5]
+    profile = kernels.standing_wave_profile(k, x)
+    y_envelope_upper = profile[0]
+    y_envelope_lower = -profile[0]
     
-    fig, ax = plt.subplots(figsize=(10, 5), dpi=80)
-    fig.patch.set_facecolor('#0E1117')
-    ax.set_facecolor('#0E1117')
+    node_positions = kernels.string_node_positions(wavelength, length)
+    if driven:
+        # String at rest; the dashed lines show the envelope it will settle into
+        y_envelope_upper = driven_string.steady_state_envelope(x, length, wave_speed, omega, DRIVE_AMPLITUDE, damping)
+        y_envelope_lower = -y_envelope_upper
+        node_positions = driven_string.steady_state_nodes(wavelength, length)
+        y_lim = driven_y_lim(length, wave_speed, omega, damping)
     
-    ax.plot(x, y_envelope_upper, '--', color='white', alpha=0.3)
-    ax.plot(x, y_envelope_lower, '--', color='white', alpha=0.3)
+    if client_playback:
+        # Ticks as matplotlib's auto locator would place them; no figure is built
+        from matplotlib.ticker import MaxNLocator
+        xticks = MaxNLocator(nbins=9, steps=[1, 2, 2.5, 5, 10]).tick_values(*x_view)
+        # One period of geometry: y(x, t) = profile(x) * cos(omega * visual_time)
+        x_ch = player.channel(x)
+        wave_scene = player.scene(
+            [
+                player.line(x_ch, player.channel(y_envelope_upper), 'white', width=1, dash=[6, 4], alpha=0.3),
+                player.line(x_ch, player.channel(y_envelope_lower), 'white', width=1, dash=[6, 4], alpha=0.3),
+                player.line(x_ch, player.channel(0.0, profile[0]), '#00FFFF', width=2),
+                player.points(player.channel(node_positions), player.channel(0.0), radius=5, color='#FF0055'),
+            ],
+            period=2 * np.pi / (omega * 0.5),  # visual_time runs at half speed
+            xlim=x_view, ylim=(-y_lim, y_lim),
+            title=f"Standing Wave (n ≈ {harmonic_number:.2f})",
+            xticks=xticks[(xticks >= x_view[0]) & (xticks <= x_view[1])],
+        )
+        with plot_placeholder.container():
+            player.show(wave_scene, height=400)
+    else:
+        fig = Figure(figsize=(10, 5), dpi=80)
+        ax = fig.subplots()
+        fig.patch.set_facecolor('#0E1117')
+        ax.set_facecolor('#0E1117')
     
-    omega = 2 * np.pi * current_frequency
-    y_instant = 0.1 * 2 * np.sin(k * x) * np.cos(0) # t=0
-    ax.plot(x, y_instant, '-', color='#00FFFF', linewidth=2)
-    ax.plot(node_positions, np.zeros_like(node_positions), 'o', color='#FF0055', markersize=8)
+        ax.plot(x, y_envelope_upper, '--', color='white', alpha=0.3)
+        ax.plot(x, y_envelope_lower, '--', color='white', alpha=0.3)
     
-    ax.set_xlim(x_view[0], x_view[1])
-    ax.set_ylim(-y_lim, y_lim)
-    ax.set_xlabel("Position (m)", color='white')
-    ax.set_ylabel("Displacement", color='white')
-    ax.set_title(f"Standing Wave (n ≈ {harmonic_number:.2f})", color='white')
+        y_instant = kernels.standing_wave(k, omega, 0.0, x, profile=profile)[0, 0] # t=0
+        if driven:
+            y_instant = np.zeros_like(x)
+        ax.plot(x, y_instant, '-', color='#00FFFF', linewidth=2)
+        ax.plot(node_positions, np.zeros_like(node_positions), 'o', color='#FF0055', markersize=8)
     
-    ax.tick_params(colors='white')
-    for spine in ax.spines.values():
-        spine.set_color('white')
-    ax.grid(True, alpha=0.1, color='white')
+        ax.set_xlim(x_view[0], x_view[1])
+        ax.set_ylim(-y_lim, y_lim)
+        ax.set_xlabel("Position (m)", color='white')
+        ax.set_ylabel("Displacement (m)" if driven else "Displacement", color='white')
+        ax.set_title(f"Standing Wave (n ≈ {harmonic_number:.2f})", color='white')
     
-    plot_placeholder.pyplot(fig)
-    plt.close(fig)
+        ax.tick_params(colors='white')
+        for spine in ax.spines.values():
+            spine.set_color('white')
+        ax.grid(True, alpha=0.1, color='white')
+
+        plot_placeholder.pyplot(fig)
+    first_frame.done()
+
+elif driven:
+    # The string is integrated from rest; the dashed envelope is its steady state
+    wave_speed = kernels.string_wave_speed(tension_input, linear_density)
+    if control_mode == "Manual Frequency":
+        current_frequency = frequency_input
+    else:
+        current_frequency = kernels.string_harmonic_frequency(target_n, tension_input, linear_density, length)
+    wavelength = wave_speed / current_frequency
+    k, omega, harmonic_number = kernels.string_wave_numbers(current_frequency, tension_input, linear_density, length)
+
+    sim = driven_string.DrivenString(length, wave_speed, current_frequency, DRIVE_AMPLITUDE, damping)
+    steady_amplitude = driven_string.steady_state_amplitude(length, wave_speed, omega, DRIVE_AMPLITUDE, damping)
+    y_lim = driven_y_lim(length, wave_speed, omega, damping)
+    wave_renderer = renderers.StringWaveRenderer(sim.x, x_view, y_lim, y_label="Displacement (m)")
+    wave_renderer.set_shape(driven_string.steady_state_envelope(sim.x, length, wave_speed, omega, DRIVE_AMPLITUDE, damping),
+                            driven_string.steady_state_nodes(wavelength, length), harmonic_number)
+
+    readout_placeholder = st.empty()
+    frame_time_placeholder = st.empty()
+    # Simulated time runs at time_scale seconds per wall-clock second
+    frame_clock = clock.FrameClock(target_fps, speed=time_scale)
+    frame_timer = metrics.FrameTimer('driven_string')
+    # Stepping may use half of each frame slot; a finer grid runs in (more) slow motion
+    step_budget = 0.5 / target_fps
+    max_steps = 1
+
+    for t in frame_clock:
+        frame_timer.frame_start(frame_clock)
+        with frame_timer.stage('physics'):
+            start = time.perf_counter()
+            steps = sim.advance_to(t, max_steps)
+            if steps:
+                step_cost = (time.perf_counter() - start) / steps
+                max_steps = max(1, int(step_budget / step_cost))
+        with frame_timer.stage('render'):
+            img_wave = wave_renderer.frame(sim.y)
+        with frame_timer.stage('push'):
+            plot_placeholder.image(img_wave, use_container_width=True)
+        first_frame.done()
+
+        if frame_clock.frames % 10 == 1:
+            amplitude = sim.amplitude()
+            if np.isfinite(steady_amplitude):
+                state = "steady state" if abs(amplitude / steady_amplitude - 1) < 0.02 else "building up"
+                target = (f"{steady_amplitude * 1000:.1f} mm steady state ({amplitude / steady_amplitude:.0%}, {state}), "
+                          f"gain {steady_amplitude / DRIVE_AMPLITUDE:.1f}×")
+            else:
+                # Undamped and exactly at a resonance: grows without bound
+                target = "no steady state (undamped resonance)"
+            readout_placeholder.markdown(f"**Amplitude:** {amplitude * 1000:.1f} mm of {target} · drive {DRIVE_AMPLITUDE * 1000:.0f} mm"
+                                         f" · view ±{y_lim * 1000:.0f} mm")
+        if frame_clock.frames % 50 == 1:
+            rate = sim.t / t if t > 0 else 1.0
+            frame_time_placeholder.caption(f"t = {sim.t * 1000:.0f} ms ({min(rate, 1.0):.0%} of the slow-motion rate, "
+                                           f"{len(sim.x)} points, {max_steps} steps/frame) | "
+                                           + utils.clock_caption(frame_clock, frame_timer))
 
 else:
-    # Animation Loop
-    while True:
-        elapsed = time.time() - start_time
-        
-        # Calculate dynamic tension if sweeping
-        if sweep_tension:
-            # Sweep from 0.1 to 100 and back
-            # Period of 10 seconds
-            sweep_phase = (elapsed % 10) / 10 * 2 * np.pi
-            # Map -1..1 to 0.1..100
-            # Let's use a smoother mapping
-            current_tension = 50 + 49.9 * np.sin(sweep_phase)
-        else:
-            current_tension = tension_input
-            
-        # Calculate Physics
-        wave_speed = np.sqrt(current_tension / linear_density)
+    # Figures are built once per parameter set; each frame only updates the
+    # moving artists and blits them over a cached background
+    x = np.linspace(0, length, 200) # Reduced points
+    
+    if sweep_tension:
+        # At a fixed frequency the tension sweep changes k (and the envelope) every frame
+        dynamic_shape = control_mode == "Manual Frequency"
+        wave_renderer = renderers.StringWaveRenderer(x, x_view, y_lim, dynamic_shape=dynamic_shape)
+        t_values = np.linspace(0.1, 100.0, 100)
+        f_values = kernels.string_harmonic_frequency(analysis_n, t_values, linear_density, length)
+        analysis_renderer = renderers.TensionAnalysisRenderer(t_values, f_values, analysis_n)
+    
+    frame_time_placeholder = st.empty()
+    current_k = None
+    last_img = None
+    session_id = utils.session_id()
+    frame_clock = clock.FrameClock(target_fps)
+    
+    frame_timer = metrics.FrameTimer('standing_waves')
+    
+    # Animation Loop (paced by the shared clock; elapsed is monotonic wall time)
+    for elapsed in frame_clock:
+        frame_timer.frame_start(frame_clock)
         
-        if control_mode == "Manual Frequency":
-            current_frequency = frequency_input
-        else:
-            current_frequency = target_n * wave_speed / (2 * length)
+        with frame_timer.stage('physics'):
+            # Calculate dynamic tension if sweeping
+            if sweep_tension:
+                # Sweep from 0.1 to 100 and back
+                # Period of 10 seconds
+                sweep_phase = (elapsed % 10) / 10 * 2 * np.pi
+                # Map -1..1 to 0.1..100
+                # Let's use a smoother mapping
+                current_tension = 50 + 49.9 * np.sin(sweep_phase)
+            else:
+                current_tension = tension_input
+                
+            # Calculate Physics
+            wave_speed = kernels.string_wave_speed(current_tension, linear_density)
             
-        wavelength = wave_speed / current_frequency
-        k = 2 * np.pi / wavelength
-        harmonic_number = (2 * length) / wavelength
+            if control_mode == "Manual Frequency":
+                current_frequency = frequency_input
+            else:
+                current_frequency = kernels.string_harmonic_frequency(target_n, current_tension, linear_density, length)
+                
+            wavelength = wave_speed / current_frequency
+            k, omega, harmonic_number = kernels.string_wave_numbers(current_frequency, current_tension, linear_density, length)
         
         # 1. Render Analysis Plot
         if sweep_tension:
-             # Only re-render analysis plot if tension is changing
-            fig_analysis, ax_analysis = plt.subplots(figsize=(8, 4), dpi=80) # Increased DPI for better quality
-            fig_analysis.patch.set_facecolor('#0E1117')
-            ax_analysis.set_facecolor('#0E1117')
-            
-            t_values = np.linspace(0.1, 100.0, 100)
-            factor = analysis_n / (2 * length * np.sqrt(linear_density))
-            f_values = factor * np.sqrt(t_values)
-            
-            ax_analysis.plot(t_values, f_values, color='#00FFFF', linewidth=2)
-            
-            required_f_at_current_T = factor * np.sqrt(current_tension)
-            ax_analysis.plot(current_tension, required_f_at_current_T, 'o', color='#FF0055', markersize=10)
-            
-            # Add annotation following the point
-            # Flip text to left if we are near the right edge to prevent clipping
-            xytext_offset = (10, -10) if current_tension < 70 else (-110, -10)
-            
-            ax_analysis.annotate(f'T={current_tension:.1f}N\nReq f={required_f_at_current_T:.1f}Hz', 
-                         xy=(current_tension, required_f_at_current_T), 
-                         xytext=xytext_offset, textcoords='offset points',
-                         color='white', fontsize=12,
-                         arrowprops=dict(arrowstyle='->', color='white'),
-                         bbox=dict(boxstyle="round,pad=0.3", fc="#0E1117", ec="none", alpha=0.7))
-
-            ax_analysis.set_title(f"Frequency vs Tension (Mode n={analysis_n})", color='white')
-            
-            # Minimal styling for speed
-            ax_analysis.tick_params(colors='white')
-            for spine in ax_analysis.spines.values(): spine.set_color('white')
-            ax_analysis.grid(True, alpha=0.1, color='white')
-            
-            # Convert to image for speed
-            fig_analysis.canvas.draw()
-            img_analysis = np.array(fig_analysis.canvas.renderer.buffer_rgba())
-            plt.close(fig_analysis)
-            
-            analysis_plot_placeholder.image(img_analysis, use_container_width=True)
+            # Only the operating point moves along the (cached) curve
+            with frame_timer.stage('analysis'):
+                required_f_at_current_T = kernels.string_harmonic_frequency(analysis_n, current_tension, linear_density, length)
+                img_analysis = analysis_renderer.frame(current_tension, required_f_at_current_T)
+                analysis_plot_placeholder.image(img_analysis, use_container_width=True)
 
         # 2. Render Wave Plot
-        if run_animation or sweep_tension:
-            visual_time = elapsed * 0.5
-            
-            x = np.linspace(0, length, 200) # Reduced points
-            y_envelope_upper = 0.1 * 2 * np.sin(k * x)
-            y_envelope_lower = -0.1 * 2 * np.sin(k * x)
-            
-            max_m = int(2 * length / wavelength)
-            node_indices = np.arange(0, max_m + 1)
-            node_positions = node_indices * wavelength / 2
-            node_positions = node_positions[node_positions <= length + 1e-5]
-            
-            fig, ax = plt.subplots(figsize=(10, 5), dpi=80)
-            fig.patch.set_facecolor('#0E1117')
-            ax.set_facecolor('#0E1117')
-            
-            ax.plot(x, y_envelope_upper, '--', color='white', alpha=0.3)
-            ax.plot(x, y_envelope_lower, '--', color='white', alpha=0.3)
-            
-            omega = 2 * np.pi * current_frequency
-            y_instant = 0.1 * 2 * np.sin(k * x) * np.cos(omega * visual_time)
-            ax.plot(x, y_instant, '-', color='#00FFFF', linewidth=2)
-            ax.plot(node_positions, np.zeros_like(node_positions), 'o', color='#FF0055', markersize=8)
-            
-            ax.set_xlim(x_view[0], x_view[1])
-            ax.set_ylim(-y_lim, y_lim)
-            ax.set_xlabel("Position (m)", color='white')
-            ax.set_ylabel("Displacement", color='white')
-            ax.set_title(f"Standing Wave (n ≈ {harmonic_number:.2f})", color='white')
-            
-            ax.tick_params(colors='white')
-            for spine in ax.spines.values(): spine.set_color('white')
-            ax.grid(True, alpha=0.1, color='white')
-            
-            fig.canvas.draw()
-            img_wave = np.array(fig.canvas.renderer.buffer_rgba())
-            plt.close(fig)
-            
-            plot_placeholder.image(img_wave, use_container_width=True)
+        visual_time = elapsed * 0.5
+        
+        with frame_timer.stage('render'):
+            if sweep_tension:
+                if k != current_k:
+                    current_k = k
+                    profile = kernels.standing_wave_profile(k, x)
+                    node_positions = kernels.string_node_positions(wavelength, length)
+                    wave_renderer.set_shape(profile[0], node_positions, harmonic_number)
+                
+                y_instant = kernels.standing_wave(k, omega, visual_time, x, profile=profile)[0, 0]
+                img_wave = wave_renderer.frame(y_instant)
+            else:
+                # Fixed parameters: the string repeats every period. Each phase sample is
+                # rendered once by the shared worker pool and then served from the cache
+                frame_params = (float(k), length, tuple(x_view), y_lim)
+                samples = frame_cache.samples_for(2 * np.pi / (omega * 0.5), target_fps)  # visual_time runs at half speed
+                try:
+                    img_wave = render_pool.get_frame(session_id, 'standing', frame_params, frame_cache.phase_of(omega, visual_time), samples)
+                except Exception as e:
+                    st.error(f"Error rendering animation: {e}")
+                    break
+        
+        if img_wave is not None and img_wave is not last_img:
+            with frame_timer.stage('push'):
+                plot_placeholder.image(img_wave, use_container_width=True)
+            first_frame.done()
+            last_img = img_wave
         
-        time.sleep(0.02)
+        # Measured render cost (moving average), refreshed about once a second
+        if frame_clock.frames % 50 == 1:
+            caption = utils.clock_caption(frame_clock, frame_timer)
+            if sweep_tension:
+                caption = f"Render time per frame: {wave_renderer.frame_ms + analysis_renderer.frame_ms:.1f} ms | {caption}"
+            frame_time_placeholder.caption(caption)
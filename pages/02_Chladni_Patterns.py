@@ -1,22 +1,27 @@
 import streamlit as st
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.special import jn, jn_zeros
-import io
 import sys
 import os
 
 # Add parent directory to path to allow importing utils
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import startup
+# Started before the other imports so that their cost on a cold process counts
+first_frame = startup.FirstFrame('chladni_patterns')
 import utils
+import chladni
+import chladni_render
+import nodal
+import plate_modes
+import poster
 
 # Page Config
 st.set_page_config(page_title="Chladni Resonance Patterns", layout="centered")
 
 utils.add_footer()
 
-# Apply dark background style for matplotlib
-plt.style.use('dark_background')
+# Fonts, colormaps, Bessel table and the dark matplotlib style (once per process)
+startup.warm()
 
 # Title & Description
 st.title("Chladni Resonance Patterns")
@@ -24,124 +29,231 @@ st.markdown("Generative visualization of acoustic resonance on 2D plates.")
 
 # Sidebar Controls
 st.sidebar.header("Configuration")
-shape = st.sidebar.radio("Plate Shape", ["Square Plate", "Circular Plate"])
 
-if shape == "Square Plate":
+# Links from the mode gallery open the page on a given mode
+query = st.query_params
+
+def query_index(name, options):
+    return options.index(query[name]) if query.get(name) in options else 0
+
+def query_int(name, default):
+    try:
+        return int(query.get(name, default))
+    except ValueError:
+        return default
+
+shape_options = ["Square Plate", "Circular Plate"]
+shape = st.sidebar.radio("Plate Shape", shape_options, index=query_index('shape', shape_options))
+
+# Closed-form patterns, or the free plate solved with the sparse eigensolver (plate_modes.py)
+CLASSIC = "Closed-form (classic)"
+KIRCHHOFF = "Kirchhoff Plate (eigensolver)"
+plate_model = st.sidebar.radio("Plate Model", [CLASSIC, KIRCHHOFF], help="The Kirchhoff plate solves the bending of a thin plate with free edges for its lowest modes, and can be driven at any frequency.")
+kirchhoff = plate_model == KIRCHHOFF
+
+if shape == "Square Plate" and not kirchhoff:
     st.sidebar.markdown("---")
     st.sidebar.subheader("Square Parameters")
-    superposition_mode = st.sidebar.radio("Superposition", ["Difference (A - B)", "Sum (A + B)"], index=0, help="Determines how the two orthogonal waves combine. 'Difference' is zero when n=m.")
+    mode_options = ["Difference (A - B)", "Sum (A + B)"]
+    superposition_mode = st.sidebar.radio("Superposition", mode_options, index=query_index('mode', mode_options), help="Determines how the two orthogonal waves combine. 'Difference' is zero when n=m.")
 else:
     superposition_mode = "Difference (A - B)" # Default/Ignored for Circle
 
 st.sidebar.markdown("---")
 st.sidebar.subheader("Vibrational Modes")
 
-s_n = utils.get_setting('ch_n')
-n_val = int(max(s_n['min'], min(s_n['default'], s_n['max'])))
-n = st.sidebar.slider("Parameter n", min_value=int(s_n['min']), max_value=int(s_n['max']), value=n_val, step=int(s_n['step']))
+SINGLE_MODE = "Single Mode"
+DRIVEN = "Driven at Frequency"
+if kirchhoff:
+    solver_grid = st.sidebar.select_slider("Solver Grid", options=plate_modes.GRID_SIZES, value=plate_modes.DEFAULT_GRID, help="Nodes per side. The modes are solved once per shape and grid (seconds) and then loaded from disk.")
+    if plate_modes.is_solved(shape, solver_grid):
+        basis = plate_modes.get_basis(shape, solver_grid)
+    else:
+        with st.spinner(f"Solving the lowest {plate_modes.N_MODES} plate modes (once per shape and grid)..."):
+            basis = plate_modes.get_basis(shape, solver_grid)
 
-s_m = utils.get_setting('ch_m')
-m_val = int(max(s_m['min'], min(s_m['default'], s_m['max'])))
-m = st.sidebar.slider("Parameter m", min_value=int(s_m['min']), max_value=int(s_m['max']), value=m_val, step=int(s_m['step']))
-
-# Resolution
-resolution = 500
-
-def calculate_square_pattern(n, m, res, mode):
-    x = np.linspace(-1, 1, res)
-    y = np.linspace(-1, 1, res)
-    X, Y = np.meshgrid(x, y)
-    
-    # Chladni formula for square plate (approx)
-    # Superposition of two orthogonal standing waves
-    term1 = np.cos(n * np.pi * X) * np.cos(m * np.pi * Y)
-    term2 = np.cos(m * np.pi * X) * np.cos(n * np.pi * Y)
-    
-    if mode == "Sum (A + B)":
-        Z = term1 + term2
+    excitation = st.sidebar.radio("Excitation", [SINGLE_MODE, DRIVEN], help="'Driven' superposes all modes as excited by a vibrator at the drive point.")
+    if excitation == SINGLE_MODE:
+        mode_index = st.sidebar.slider("Mode Number", min_value=1, max_value=basis.n_modes, value=1, step=1, help="Elastic modes in order of frequency (the rigid-body motions are left out).")
     else:
-        Z = term1 - term2
-    
-    return X, Y, Z
-
-def calculate_circular_pattern(n, m, res):
-    # Create Cartesian grid directly to ensure correct aspect ratio and shape
-    x = np.linspace(-1, 1, res)
-    y = np.linspace(-1, 1, res)
-    X, Y = np.meshgrid(x, y)
-    
-    # Convert to Polar coordinates for the math
-    R = np.sqrt(X**2 + Y**2)
-    THETA = np.arctan2(Y, X)
-    
-    # n = radial mode (number of nodal circles)
-    # m = angular mode (number of nodal diameters)
-    
-    # Find the n-th zero of the m-th order Bessel function
-    try:
-        k = jn_zeros(m, n)[n-1]
-    except:
-        k = n * np.pi
-        
-    Z = jn(m, k * R) * np.cos(m * THETA)
-    
-    # Mask values outside the unit circle
-    Z[R > 1] = np.nan
-    
-    return X, Y, Z
-
-# Generate Data
-if shape == "Square Plate":
-    X, Y, Z = calculate_square_pattern(n, m, resolution, superposition_mode)
+        f_min, f_max = float(np.floor(basis.frequencies[0] / 2)), float(np.ceil(basis.frequencies[-1]))
+        # Start at the lowest mode a vibrator at the centre excites (not one with a node there)
+        centre = np.abs(basis.point_values((0.0, 0.0)))
+        f_start = round(float(basis.frequencies[np.argmax(centre > 0.01 * centre.max())]), 1)
+        drive_frequency = st.sidebar.slider("Drive Frequency Ω", min_value=f_min, max_value=f_max, value=f_start, step=0.1, help="Nondimensional frequency ω a² √(ρh/D), a = side (square) or radius (disc).")
+        loss = st.sidebar.slider("Loss Factor η", min_value=0.002, max_value=0.1, value=0.02, step=0.002, format="%.3f", help="Damping: lower values give sharper resonances.")
+        col_px, col_py = st.sidebar.columns(2)
+        drive_point = (col_px.slider("Drive x", -1.0, 1.0, 0.0, 0.05), col_py.slider("Drive y", -1.0, 1.0, 0.0, 0.05))
+    # The closed-form mode numbers do not apply
+    n = m = None
+
+s_n = utils.get_setting('ch_n')
+n_val = int(max(s_n['min'], min(query_int('n', s_n['default']), s_n['max'])))
+s_m = utils.get_setting('ch_m')
+m_val = int(max(s_m['min'], min(query_int('m', s_m['default']), s_m['max'])))
+if not kirchhoff:
+    n = st.sidebar.slider("Parameter n", min_value=int(s_n['min']), max_value=int(s_n['max']), value=n_val, step=int(s_n['step']))
+    m = st.sidebar.slider("Parameter m", min_value=int(s_m['min']), max_value=int(s_m['max']), value=m_val, step=int(s_m['step']))
+
+st.sidebar.markdown("---")
+st.sidebar.subheader("Rendering")
+renderer = st.sidebar.radio("Renderer", chladni_render.RENDERERS, index=0, help="'Fast' draws the image directly with NumPy; 'Annotated' uses Matplotlib and adds a colorbar.")
+if renderer == chladni_render.FAST:
+    node_width = st.sidebar.slider("Nodal Line Width (px)", min_value=0.0, max_value=6.0, value=chladni_render.NODE_WIDTH, step=0.5)
+    antialias = st.sidebar.checkbox("Anti-aliased Lines", value=True)
 else:
-    X, Y, Z = calculate_circular_pattern(n, m, resolution)
+    node_width, antialias = chladni_render.NODE_WIDTH, True
 
-# Visualization
-fig, ax = plt.subplots(figsize=(8, 8))
-fig.patch.set_facecolor('black')
-ax.set_facecolor('black')
+# Resolution (ceiling set on the Settings page)
+s_res = utils.get_setting('ch_res')
+res_val = int(max(s_res['min'], min(s_res['default'], s_res['max'])))
+resolution = st.sidebar.slider("Resolution (px)", min_value=int(s_res['min']), max_value=int(s_res['max']), value=res_val, step=int(s_res['step']))
+progressive = st.sidebar.checkbox("Progressive Rendering", value=True, help=f"Show a {chladni_render.PREVIEW_RESOLUTION} px preview immediately and refine it to the full resolution.")
 
-# Plot the amplitude field (Magnitude)
-# We use abs(Z) to visualize vibration intensity regardless of phase (up or down)
-im = ax.imshow(np.abs(Z), extent=[-1, 1, -1, 1], cmap='magma', origin='lower', interpolation='bicubic')
+# Visualization & Display
+# Served from the shared caches when any session has already rendered this mode
+plot_placeholder = st.empty()
 
-# Overlay Nodal Lines (Amplitude = 0)
-# We use a contour plot at level 0 on the original Z to find zero crossings accurately
-ax.contour(X, Y, Z, levels=[0], colors='#00FFFF', linewidths=2, alpha=0.8)
+def kirchhoff_pattern(res):
+    # Served from the cached mode basis: a product with the basis and a resample
+    if excitation == SINGLE_MODE:
+        return plate_modes.mode_pattern(shape, mode_index, res, solver_grid)
+    return plate_modes.driven_pattern(shape, drive_frequency, res, solver_grid, loss, drive_point)
 
-# Remove axes for clean art look
-ax.axis('off')
+def kirchhoff_export(size, fmt):
+    # Resampled straight to the export size, bypassing the display caches
+    basis_field = basis.mode(mode_index) if excitation == SINGLE_MODE else basis.driven(drive_frequency, loss, drive_point)
+    Z = plate_modes.resample(shape, basis_field, size)[2]
+    return chladni_render.encode_raster(
+        chladni_render.rasterize(Z, node_width=node_width * size / chladni_render.RESOLUTION, antialias=antialias), fmt)
 
-# Add Colorbar
-cbar = fig.colorbar(im, ax=ax, shrink=0.8, pad=0.05, aspect=30)
-cbar.set_label('Vibration Amplitude', color='white', fontsize=12)
-cbar.ax.yaxis.set_tick_params(color='white')
-cbar.outline.set_edgecolor('white')
-plt.setp(plt.getp(cbar.ax.axes, 'yticklabels'), color='white')
+def show_pattern(res, final):
+    if kirchhoff:
+        x, y, Z = kirchhoff_pattern(res)
+        if renderer == chladni_render.FAST:
+            image = chladni_render.rasterize(Z, node_width=node_width * res / chladni_render.RESOLUTION, antialias=antialias)
+            plot_placeholder.image(image, use_container_width=True)
+        else:
+            plot_placeholder.pyplot(chladni_render.annotated_figure(x, y, Z), use_container_width=True)
+    elif renderer == chladni_render.FAST or not final:
+        image = chladni_render.raster_image(shape, n, m, superposition_mode, res, node_width, antialias)
+        plot_placeholder.image(image, use_container_width=True)
+    else:
+        x, y, Z = chladni.get_pattern(shape, n, m, res, superposition_mode, dtype=np.float32)
+        fig = chladni_render.annotated_figure(x, y, Z, nodal.nodal_lines(shape, n, m, superposition_mode))
+        plot_placeholder.pyplot(fig, use_container_width=True)
+    first_frame.done()
 
-# Display
-st.pyplot(fig, use_container_width=True)
+# Progressive rendering: a coarse preview first, then sharper stages in the
+# same placeholder. Streamlit stops a superseded run at its next Streamlit
+# call, so moving a slider cancels the remaining (stale) stages.
+if progressive and not kirchhoff and not chladni_render.display_cached(shape, n, m, superposition_mode, resolution, renderer,
+                                                                      node_width, antialias):
+    stages = chladni_render.progressive_resolutions(resolution)
+else:
+    stages = [resolution]
+for stage_res in stages:
+    show_pattern(stage_res, final=stage_res == resolution)
 
-# Save plot to buffer for download
-buf = io.BytesIO()
-fig.savefig(buf, format="png", bbox_inches='tight', facecolor='black', dpi=300)
-buf.seek(0)
+# Export
+# The high-resolution file is only rendered when the download is clicked, and
+# then cached for this mode, size and format
+col_size, col_format = st.columns(2)
+export_size = col_size.selectbox("Export Size", list(chladni_render.EXPORT_SIZES), index=list(chladni_render.EXPORT_SIZES).index(chladni_render.DEFAULT_EXPORT_SIZE))
+export_format = col_format.selectbox("Export Format", chladni_render.export_formats(chladni_render.FAST if kirchhoff else renderer))
+export_dpi = chladni_render.EXPORT_SIZES[export_size]
 
-# Construct filename based on parameters
 shape_str = shape.replace(" ", "_").lower()
-filename = f"chladni_{shape_str}_n{n}_m{m}.png"
+if kirchhoff:
+    kirchhoff_name = f"chladni_kirchhoff_{shape_str}_" + (f"mode{mode_index}" if excitation == SINGLE_MODE else f"omega{drive_frequency:g}")
+    st.download_button(
+        label="⬇️ Download Pattern Image",
+        data=lambda: kirchhoff_export(8 * export_dpi, export_format),
+        file_name=f"{kirchhoff_name}.{chladni_render.EXPORT_FORMATS[export_format][0]}",
+        mime=chladni_render.export_mime(export_format),
+        help="Save the current pattern as a high-resolution image."
+    )
+    st.download_button(
+        label="⬇️ Nodal Lines (SVG)",
+        data=lambda: nodal.to_svg(nodal.extract_polylines(*kirchhoff_pattern(nodal.NODAL_RES)), shape),
+        file_name=f"{kirchhoff_name}_nodes.svg",
+        mime="image/svg+xml",
+        help="Resolution-independent nodal lines (200 mm template with plate outline)."
+    )
+else:
+    # Download Button
+    st.download_button(
+        label="⬇️ Download Pattern Image",
+        data=lambda: chladni_render.export_image(shape, n, m, superposition_mode, export_dpi, export_format, resolution,
+                                                 renderer, node_width, antialias),
+        file_name=chladni_render.export_filename(shape, n, m, export_format),
+        mime=chladni_render.export_mime(export_format),
+        help="Save the current pattern as a high-resolution image."
+    )
+
+    # Vector nodal lines, e.g. as laser-cutting templates
+    col_svg, col_json = st.columns(2)
+    col_svg.download_button(
+        label="⬇️ Nodal Lines (SVG)",
+        data=lambda: nodal.to_svg(nodal.nodal_lines(shape, n, m, superposition_mode), shape),
+        file_name=f"chladni_{shape_str}_n{n}_m{m}_nodes.svg",
+        mime="image/svg+xml",
+        help="Resolution-independent nodal lines (200 mm template with plate outline)."
+    )
+    col_json.download_button(
+        label="⬇️ Nodal Lines (JSON)",
+        data=lambda: nodal.to_json(nodal.nodal_lines(shape, n, m, superposition_mode), shape, n, m, superposition_mode),
+        file_name=f"chladni_{shape_str}_n{n}_m{m}_nodes.json",
+        mime="application/json",
+        help="Nodal polylines in plate coordinates ([-1, 1] on both axes)."
+    )
+
+    # Poster export: rendered band by band in worker processes and written to
+    # disk, so memory stays bounded however large the poster is
+    with st.expander("🖼️ Poster Export (very large images)"):
+        col_psize, col_pformat = st.columns(2)
+        poster_size = col_psize.selectbox("Poster Size (px)", poster.SIZES, index=poster.SIZES.index(16384))
+        poster_format = col_pformat.selectbox("Poster Format", list(poster.FORMATS), help="PNG is compressed; TIFF and NPY are uncompressed (NPY is a NumPy array).")
+        poster_file = poster.poster_path(shape, n, m, superposition_mode, poster_size, poster_format)
 
-# Download Button
-st.download_button(
-    label="⬇️ Download Pattern Image",
-    data=buf,
-    file_name=filename,
-    mime="image/png",
-    help="Save the current pattern as a high-resolution PNG image."
-)
+        if st.button("Render Poster"):
+            poster_progress = st.progress(0.0, text="Rendering poster...")
+            try:
+                poster.export_poster(
+                    poster_file, shape, n, m, superposition_mode, poster_size, poster_format,
+                    node_width=node_width, antialias=antialias,
+                    progress=lambda done, total: poster_progress.progress(done / total, text=f"Band {done}/{total}"),
+                )
+            except Exception as e:
+                poster_progress.empty()
+                st.error(f"Poster export failed: {e}")
+            else:
+                poster_progress.empty()
+
+        if os.path.exists(poster_file):
+            poster_mb = os.path.getsize(poster_file) / 2**20
+            st.success(f"Poster saved to `{poster_file}` ({poster_mb:.0f} MB)")
+            if poster_mb <= poster.MAX_DOWNLOAD_MB:
+                # Read only when the download is clicked, not on every rerun
+                st.download_button(
+                    label="⬇️ Download Poster",
+                    data=lambda: poster.read_poster(poster_file),
+                    file_name=os.path.basename(poster_file),
+                    mime="application/octet-stream",
+                )
+            else:
+                st.caption(f"Too large to download through the browser (limit {poster.MAX_DOWNLOAD_MB:.0f} MB); copy it from the server.")
 
 # Info
-st.markdown(f"**Current Mode:** $n={n}, m={m}$ | **Shape:** {shape}")
+if not kirchhoff:
+    st.markdown(f"**Current Mode:** $n={n}, m={m}$ | **Shape:** {shape}")
+elif excitation == SINGLE_MODE:
+    st.markdown(f"**Current Mode:** {mode_index} of {basis.n_modes}, $\\Omega = {basis.frequencies[mode_index - 1]:.2f}$ | **Shape:** {shape} (free edges, $\\nu = {basis.poisson:g}$)")
+else:
+    # The modes closest to the drive dominate the pattern
+    nearest = np.argsort(np.abs(basis.frequencies - drive_frequency))[:3]
+    modes_str = ", ".join(f"{k + 1} ($\\Omega = {basis.frequencies[k]:.2f}$)" for k in sorted(nearest))
+    st.markdown(f"**Driven at:** $\\Omega = {drive_frequency:.1f}$ | **Nearest modes:** {modes_str} | **Shape:** {shape}")
 
 st.markdown("""
 ---
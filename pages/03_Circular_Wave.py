@@ -1,17 +1,21 @@
 import streamlit as st
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.animation as animation
-from matplotlib.animation import PillowWriter
-import time
-import io
-import tempfile
 import os
 import sys
 
 # Add parent directory to path to allow importing utils
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import startup
+# Started before the other imports so that their cost on a cold process counts
+first_frame = startup.FirstFrame('circular_wave')
 import utils
+import kernels
+import clock
+import player
+import frame_cache
+import render_pool
+import metrics
+import export
 
 # Page Config
 st.set_page_config(page_title="Circular Wire Loop Simulation", layout="centered")
@@ -37,33 +41,21 @@ s_amp = utils.get_setting('cw_amp')
 amp_val = max(s_amp['min'], min(s_amp['default'], s_amp['max']))
 amplitude = st.sidebar.slider("Amplitude", min_value=s_amp['min'], max_value=s_amp['max'], value=amp_val, step=s_amp['step'])
 
-# Style
-plt.style.use('dark_background')
+target_fps = utils.target_fps_slider()
 
-# Setup Plot
-fig, ax = plt.subplots(figsize=(6, 6))
-fig.patch.set_facecolor('#0E1117')
-ax.set_facecolor('#0E1117')
-ax.set_aspect('equal')
-limit = 1.0 + amplitude + 0.1
-ax.set_xlim(-limit, limit)
-ax.set_ylim(-limit, limit)
+# Dark style for in-thread renderers when the worker pool is disabled, plus
+# fonts and colormaps (once per process)
+startup.warm()
+
+# Plot extent
+R0 = 1.0
+limit = R0 + amplitude + 0.1
 
 # Initial Data
 theta = np.linspace(0, 2*np.pi, 1000)
-R0 = 1.0
-line, = ax.plot([], [], lw=4, color='#8A2BE2') # BlueViolet color
-title = ax.set_title(f"Mode n={n}")
-
-def get_wave_coords(t):
-    # R(theta, t) = R0 + A * sin(n * theta) * cos(omega * t)
-    omega = speed  # Frequency scaling
-    R = R0 + amplitude * np.sin(n * theta) * np.cos(omega * t)
-    
-    # Polar to Cartesian
-    x = R * np.cos(theta)
-    y = R * np.sin(theta)
-    return x, y
+
+# Mode shape is fixed for this run; only cos(omega * t) changes per frame
+loop_profile = kernels.circular_loop_profile(n, amplitude, theta, R0)
 
 # Layout
 col1, col2 = st.columns([3, 1])
@@ -74,79 +66,89 @@ with col1:
 with col2:
     st.write("### Controls")
     run_anim = st.checkbox("Run Real-time", value=True)
+    playback_mode = utils.playback_radio(st)
     st.markdown("---")
-    generate_gif = st.button("Generate GIF")
+    with st.expander("Export Options"):
+        export_format = st.selectbox("Format", export.available_formats())
+        export_frames = st.slider("Frames", min_value=10, max_value=200, value=50, step=10, help="Frames per oscillation period")
+        export_size = st.slider("Size (px)", min_value=200, max_value=1200, value=600, step=100)
+        export_fps = st.slider("Export FPS", min_value=5, max_value=60, value=20, step=1)
+    generate_gif = st.button("Generate Animation")
+
+# Browser playback: send one period of the loop shape and let the client animate it
+if run_anim and not generate_gif and playback_mode == utils.PLAYBACK_BROWSER:
+    base_x, base_y, mod_x, mod_y = loop_profile
+    loop_scene = player.scene(
+        [player.line(player.channel(base_x, mod_x[0]), player.channel(base_y, mod_y[0]), '#8A2BE2', width=4, closed=True)],
+        period=2 * np.pi / speed,
+        xlim=(-limit, limit), ylim=(-limit, limit),
+        title=f"Mode n={n} | Real-time",
+        equal_aspect=True,
+    )
+    with plot_placeholder.container():
+        player.show(loop_scene, height=500)
+    first_frame.done()
 
 # Real-time Animation Loop
-if run_anim and not generate_gif:
-    start_time = time.time()
-    while True:
-        # Check if user stopped it (Streamlit reruns script on interaction, so this breaks loop naturally)
-        # But inside the loop we need to be careful not to block too long
-        
-        t = time.time() - start_time
-        x, y = get_wave_coords(t)
-        
-        line.set_data(x, y)
-        ax.set_title(f"Mode n={n} | Real-time")
-        
-        plot_placeholder.pyplot(fig)
-        time.sleep(0.02)
-
-# GIF Generation using Matplotlib Animation
+elif run_anim and not generate_gif:
+    frame_clock = clock.FrameClock(target_fps)
+    fps_placeholder = st.empty()
+    # Check if user stopped it (Streamlit reruns script on interaction, so this breaks loop naturally)
+    # But inside the loop we need to be careful not to block too long
+    session_id = utils.session_id()
+    # One phase sample per displayed frame of a period
+    samples = frame_cache.samples_for(2 * np.pi / speed, target_fps)
+    last_png = None
+    frame_timer = metrics.FrameTimer('circular_wave')
+
+    for t in frame_clock:
+        frame_timer.frame_start(frame_clock)
+        # The loop repeats every 2*pi/speed: each phase sample is rendered once
+        # by the shared worker pool and then served from the frame cache
+        try:
+            with frame_timer.stage('frame'):
+                png = render_pool.get_frame(session_id, 'circular', (n, amplitude), frame_cache.phase_of(speed, t), samples)
+        except Exception as e:
+            st.error(f"Error rendering animation: {e}")
+            break
+        if png is not None and png is not last_png:
+            with frame_timer.stage('push'):
+                plot_placeholder.image(png)
+            first_frame.done()
+            last_png = png
+        if frame_clock.frames % 50 == 1:
+            fps_placeholder.caption(utils.clock_caption(frame_clock, frame_timer))
+
+# Animation export: frames rendered in parallel and encoded in memory
 if generate_gif:
     status_text = st.empty()
     progress_bar = st.progress(0)
-    status_text.info("Generating Animation Frames...")
-    
-    # Define update function for FuncAnimation
-    def update(frame):
-        # Create a loop of 2*pi / omega duration roughly, or just arbitrary frames
-        # Let's make one full oscillation cycle
-        # cos(omega * t) -> period T = 2*pi / omega
-        omega = speed
-        period = 2 * np.pi / omega
-        t = frame * period / 50 # 50 frames per cycle
-        
-        x, y = get_wave_coords(t)
-        line.set_data(x, y)
-        ax.set_title(f"Mode n={n}")
-        
-        # Update progress
-        prog = int((frame / 50) * 100)
-        if prog <= 100:
-            progress_bar.progress(prog)
-            
-        return line,
-
-    # Create Animation
-    ani = animation.FuncAnimation(fig, update, frames=50, blit=False)
-    
-    status_text.info("Saving GIF... (This might take a few seconds)")
-    
-    # Save to temporary file first (Matplotlib requires a file path)
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".gif") as tmp_file:
-        tmp_path = tmp_file.name
-
-    ani.save(tmp_path, writer=PillowWriter(fps=20))
-    
-    # Read into buffer
-    with open(tmp_path, "rb") as f:
-        gif_buffer = io.BytesIO(f.read())
-    
-    # Cleanup
-    os.remove(tmp_path)
-    
-    progress_bar.empty()
-    status_text.success("GIF Generated Successfully!")
-    
-    # Display GIF
-    st.image(gif_buffer, caption=f"Standing Wave Mode n={n}")
-    
-    # Download Button
-    st.download_button(
-        label="⬇️ Download GIF",
-        data=gif_buffer,
-        file_name=f"circular_wave_n{n}.gif",
-        mime="image/gif"
-    )
+    status_text.info("Rendering animation frames...")
+
+    def report(done, total):
+        progress_bar.progress(done / total, text=f"Frame {done}/{total}")
+
+    params = (n, amplitude, export_size, f"Mode n={n}")
+    try:
+        data = export.export_animation('circular', params, frames=export_frames, fps=export_fps, fmt=export_format,
+                                       progress=report, session_id=utils.session_id())
+    except Exception as e:
+        progress_bar.empty()
+        status_text.error(f"Export failed: {e}")
+    else:
+        progress_bar.empty()
+        status_text.success(f"{export_format} generated successfully! ({len(data) / 1024:.0f} KB)")
+
+        # Display the animation
+        if export_format == export.MP4:
+            st.video(data, format=export.mime_type(export_format), loop=True, autoplay=True, muted=True)
+        else:
+            st.image(data, caption=f"Standing Wave Mode n={n}")
+
+        # Download Button
+        st.download_button(
+            label=f"⬇️ Download {export_format}",
+            data=data,
+            file_name=f"circular_wave_n{n}.{export.extension(export_format)}",
+            mime=export.mime_type(export_format)
+        )
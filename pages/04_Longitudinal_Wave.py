@@ -1,10 +1,5 @@
 import streamlit as st
 import numpy as np
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import matplotlib.cm as cm
-import matplotlib.patches as patches
 import time
 import sys
 import os
@@ -14,7 +9,18 @@ st.set_page_config(page_title="Longitudinal Standing Wave", layout="wide")
 
 # Add parent directory to path to allow importing utils
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import startup
+# Started before the other imports so that their cost on a cold process counts
+first_frame = startup.FirstFrame('longitudinal_wave')
 import utils
+import kernels
+import clock
+import player
+import frame_cache
+import render_pool
+import metrics
+import renderers
+import chain
 
 utils.add_footer()
 
@@ -29,9 +35,26 @@ This simulation visualizes a **Longitudinal Standing Wave** (like sound waves in
 # --- Sidebar Controls ---
 st.sidebar.header("Wave Parameters")
 
-s_particles = utils.get_setting('lw_particles')
-p_val = int(max(s_particles['min'], min(s_particles['default'], s_particles['max'])))
-n_particles = st.sidebar.slider("Number of Particles (N)", min_value=int(s_particles['min']), max_value=int(s_particles['max']), value=p_val, step=int(s_particles['step']))
+# Particle counts of the gas layout (kernels.GAS_PARTICLES and up)
+GAS_COUNTS = [1000, 2000, 5000, 10000, 20000, 50000, 100000]
+CHAIN_COUNTS = [50, 100, 200, 500, 1000, 10000, 100000, 1000000]
+
+# Analytic playback of the standing wave, or the chain integrated in time (chain.py)
+ANALYTIC = "Analytic Standing Wave"
+MASS_SPRING = "Mass-Spring Chain (time-stepped)"
+model = st.sidebar.radio("Model", [ANALYTIC, MASS_SPRING], help="The time-stepped chain shows the build-up from rest, damping, off-resonance driving and non-uniform springs.")
+
+dense_gas = False
+if model == MASS_SPRING:
+    n_particles = st.sidebar.select_slider("Number of Masses (N)", options=CHAIN_COUNTS, value=200)
+else:
+    dense_gas = st.sidebar.checkbox("Dense Gas", value=False, help="Thousands of particles filling the tube, drawn by the raster particle renderer (server playback).")
+if dense_gas:
+    n_particles = st.sidebar.select_slider("Number of Particles (N)", options=GAS_COUNTS, value=10000)
+elif model == ANALYTIC:
+    s_particles = utils.get_setting('lw_particles')
+    p_val = int(max(s_particles['min'], min(s_particles['default'], s_particles['max'])))
+    n_particles = st.sidebar.slider("Number of Particles (N)", min_value=int(s_particles['min']), max_value=int(s_particles['max']), value=p_val, step=int(s_particles['step']))
 
 s_n = utils.get_setting('lw_n')
 n_val = int(max(s_n['min'], min(s_n['default'], s_n['max'])))
@@ -45,6 +68,21 @@ s_speed = utils.get_setting('lw_speed')
 speed_val = max(s_speed['min'], min(s_speed['default'], s_speed['max']))
 speed_factor = st.sidebar.slider("Animation Speed", min_value=s_speed['min'], max_value=s_speed['max'], value=speed_val, step=s_speed['step'])
 
+if model == MASS_SPRING:
+    st.sidebar.subheader("Chain")
+    drive_ratio = st.sidebar.slider("Drive Frequency (× resonance n)", min_value=0.5, max_value=1.5, value=1.0, step=0.01)
+    damping = st.sidebar.slider("Damping γ (1/s)", min_value=0.0, max_value=1.0, value=0.05, step=0.01)
+    right_end = st.sidebar.radio("Right End", chain.RIGHT_ENDS, horizontal=True)
+    graded = st.sidebar.checkbox("Graded Springs", value=False, help="Spring stiffness rises 4x along the chain, so the wave speeds up and shortens its wavelength towards the end.")
+
+target_fps = utils.target_fps_slider()
+if dense_gas or model == MASS_SPRING:
+    # Too many particles to ship to the browser every rerun, or no period to loop
+    playback_mode = utils.PLAYBACK_SERVER
+    st.sidebar.caption("Plays back from the server.")
+else:
+    playback_mode = utils.playback_radio()
+
 # --- Physics Setup ---
 L = 10.0  # Length of the domain
 x0 = np.linspace(0, L, n_particles)  # Equilibrium positions
@@ -56,124 +94,127 @@ k = mode_n * np.pi / L  # Wave number for standing wave (fixed ends-ish behavior
 
 omega = 2.0  # Angular frequency
 
-# Style
-plt.style.use('dark_background')
+# Mass-spring chain: wave speed (mode 3 resonates near omega) and drive stroke per unit amplitude
+CHAIN_WAVE_SPEED = 2.0
+CHAIN_DRIVE = 0.02
 
-# --- Plot Setup ---
-# We use a colormap where Red=Compression, Blue=Rarefaction
-cmap = plt.get_cmap('coolwarm')
+# Dark style, fonts and colormaps (once per process)
+startup.warm()
 
 # Animation Container
 anim_placeholder = st.empty()
 run_animation = st.checkbox("Run Animation", value=True)
 
-t = 0
-dt = 0.05 * speed_factor
+# Simulated time runs at speed_factor seconds per wall-clock second
+# (the old fixed step of 0.05 * speed_factor per frame at 20 FPS)
+frame_clock = clock.FrameClock(target_fps, speed=speed_factor)
 
 # Cone parameters
 cone_back_x = -3.3
 cone_front_x_base = -1.0
 
-if run_animation:
+if run_animation and playback_mode == utils.PLAYBACK_BROWSER:
+    st.caption("Animation is running in your browser...")
+
+    # One period of geometry; the browser evaluates base + mode * cos(omega * t)
+    A = kernels.longitudinal_amplitude(n_particles, L, amplitude_factor)
+    disp_shape, colour_shape = kernels.longitudinal_profile(k, A, x0)
+    stroke = kernels.speaker_displacement(omega, 0.0)
+    long_scene = player.scene(
+        [
+            player.vlines(player.channel(x0), -0.2, 0.2, 'gray', dash=[2, 3], alpha=0.2),
+            player.polygon(player.channel([-4.8, -3.3, -3.3, -4.8]), player.channel([-0.4, -0.4, 0.4, 0.4]), '#666666'),
+            player.polygon(
+                player.channel([cone_back_x, cone_back_x, cone_front_x_base, cone_front_x_base], [0, 0, stroke, stroke]),
+                player.channel([0.2, -0.2, -0.6, 0.6]),
+                '#888888', alpha=0.9,
+            ),
+            player.points(
+                player.channel(x0, disp_shape[0]), player.channel(0.0), radius=9,
+                value=player.channel(0.5, 0.5 * colour_shape[0]), lut=player.colormap_lut('coolwarm'),
+                edgecolor='white', alpha=0.9,
+            ),
+        ],
+        period=2 * np.pi / (omega * speed_factor),
+        xlim=(-5, L + 1), ylim=(-0.8, 0.8),
+        title=f"Longitudinal Standing Wave (Mode n={mode_n})",
+        xticks=np.arange(-4, L + 1, 2),
+    )
+    with anim_placeholder.container():
+        player.show(long_scene, height=360)
+    first_frame.done()
+
+elif run_animation and model == MASS_SPRING:
+    st.caption("Integrating the chain from rest...")
+
+    # The speaker drives the chain near its n-th resonance; the cone is drawn
+    # with the usual stroke, the chain feels CHAIN_DRIVE * amplitude
+    drive_omega = drive_ratio * chain.mode_frequency(mode_n, L, CHAIN_WAVE_SPEED, right_end)
+    drive_amplitude = CHAIN_DRIVE * amplitude_factor
+    sim = chain.MassSpringChain(
+        n_particles, L, CHAIN_WAVE_SPEED, drive_amplitude, drive_omega, damping, right_end,
+        stiffness_profile=chain.graded_profile(n_particles + 1, 4.0) if graded else None,
+    )
+    view = chain.ChainView(sim)
+    renderer = renderers.LongitudinalRenderer(view.x0, view.y0, L, mode_n)
+
+    fps_placeholder = st.empty()
+    frame_timer = metrics.FrameTimer('mass_spring_chain')
+    # Stepping may use half of each frame slot; a chain that needs more runs in slow motion
+    step_budget = 0.5 / target_fps
+    max_steps = 1
+
+    for t in frame_clock:
+        frame_timer.frame_start(frame_clock)
+        with frame_timer.stage('physics'):
+            start = time.perf_counter()
+            steps = sim.advance_to(t, max_steps)
+            if steps:
+                step_cost = (time.perf_counter() - start) / steps
+                max_steps = max(1, int(step_budget / step_cost))
+        with frame_timer.stage('render'):
+            positions, colours = view.frame()
+            # Cone stroke of kernels.speaker_displacement (0.3), in phase with the drive
+            img = renderer.frame(positions, colours, 0.3 * sim.drive(sim.t) / drive_amplitude)
+        with frame_timer.stage('push'):
+            anim_placeholder.image(img, use_container_width=True)
+        first_frame.done()
+
+        if frame_clock.frames % 50 == 1:
+            rate = sim.t / t if t > 0 else 1.0
+            fps_placeholder.caption(f"t = {sim.t:.1f} s ({min(rate, 1.0):.0%} of real time, {max_steps} steps/frame) | "
+                                    + utils.clock_caption(frame_clock, frame_timer))
+
+elif run_animation:
     st.caption("Animation is running...")
     
-    # --- INITIALIZE PLOT ONCE ---
-    # 3. Create Figure and Plot
-    # Lower DPI to improve FPS for large figure
-    fig, ax = plt.subplots(figsize=(12, 4), dpi=80)
-    fig.patch.set_facecolor('#0E1117')
-    ax.set_facecolor('#0E1117')
-    fig.subplots_adjust(bottom=0.2)  # Add more space at the bottom for the large label
-    ax.set_xlim(-5, L + 1)
-    ax.set_ylim(-0.8, 0.8)
-    ax.set_yticks([])  # Hide Y axis
-    ax.set_xlabel("Position (x)", fontsize=14)
-    ax.set_title(f"Longitudinal Standing Wave (Mode n={mode_n})", fontsize=16)
-    ax.tick_params(axis='x', labelsize=12, width=2, length=5)
-
-    # Remove spines for cleaner look
-    ax.spines['left'].set_visible(False)
-    ax.spines['right'].set_visible(False)
-    ax.spines['top'].set_visible(False)
-    ax.spines['bottom'].set_linewidth(2)
-
-    # --- Speaker Graphics ---
-    # Housing (Static)
-    housing = patches.Rectangle((-4.8, -0.4), 1.5, 0.8, color='#666666', zorder=5)
-    ax.add_patch(housing)
-
-    # Cone (Dynamic - Init)
-    initial_cone_verts = [
-        [cone_back_x, 0.2],
-        [cone_back_x, -0.2],
-        [cone_front_x_base, -0.6],
-        [cone_front_x_base, 0.6]
-    ]
-    speaker_cone = patches.Polygon(initial_cone_verts, closed=True, color='#888888', alpha=0.9, zorder=6)
-    ax.add_patch(speaker_cone)
-
-    # Scatter Plot (Dynamic - Init)
-    # Initialize with equilibrium positions and neutral color
-    scatter = ax.scatter(x0, np.zeros_like(x0), s=300, c=np.ones_like(x0)*0.5, cmap=cmap, vmin=0, vmax=1, edgecolors='white', alpha=0.9, zorder=10)
-
-    # Draw equilibrium lines (Static)
-    ax.vlines(x0, -0.2, 0.2, color='gray', alpha=0.2, linestyle=':', zorder=1)
-
-    while run_animation:
-        # 1. Calculate Physics
-        # x(t) = x0 + A * sin(kx) * cos(wt)
-        spacing = L / (n_particles - 1)
-        max_amp = spacing * 0.9 # Prevent crossing mostly
-        
-        A = max_amp * amplitude_factor
-        
-        displacement = A * np.cos(k * x0) * np.cos(omega * t)
-        x_current = x0 + displacement
-        
-        # 2. Calculate Strain/Density for Coloring
-        strain = -A * k * np.sin(k * x0) * np.cos(omega * t)
-        
-        # Normalize strain for color mapping
-        limit = A * k + 1e-9
-        norm_strain = -strain / limit 
-        color_values = 0.5 + 0.5 * norm_strain
-        
-        # 3. Update Plot Objects
-        # Update Scatter
-        scatter.set_offsets(np.c_[x_current, np.zeros_like(x_current)])
-        scatter.set_array(color_values)
-        
-        # Update Cone
-        speaker_disp = 0.3 * np.cos(omega * t)
-        current_front_x = cone_front_x_base + speaker_disp
-        cone_verts = [
-            [cone_back_x, 0.2],
-            [cone_back_x, -0.2],
-            [current_front_x, -0.6],
-            [current_front_x, 0.6]
-        ]
-        speaker_cone.set_xy(cone_verts)
-
-        # 4. Render Frame
+    # Frames are splatted in the shared render workers (renderers.LongitudinalRenderer);
+    # everything that changes the picture goes into the job parameters
+    frame_params = (n_particles, mode_n, amplitude_factor)
+    session_id = utils.session_id()
+    # One phase sample per displayed frame; simulated time runs at speed_factor
+    samples = frame_cache.samples_for(2 * np.pi / (omega * speed_factor), target_fps)
+    last_png = None
+    fps_placeholder = st.empty()
+    frame_timer = metrics.FrameTimer('longitudinal_wave')
+
+    for t in frame_clock:
+        frame_timer.frame_start(frame_clock)
+        # Frames repeat every 2*pi/omega: each phase sample is rendered once
         try:
-            # Use buffer_rgba for speed
-            fig.canvas.draw()
-            
-            # Get the RGBA buffer from the figure
-            buf = fig.canvas.buffer_rgba()
-                
-            # Convert to numpy array
-            X = np.asarray(buf)
-            
-            anim_placeholder.image(X, use_container_width=True)
+            with frame_timer.stage('frame'):
+                png = render_pool.get_frame(session_id, 'longitudinal', frame_params, frame_cache.phase_of(omega, t), samples)
         except Exception as e:
             st.error(f"Error rendering animation: {e}")
             break
+        if png is not None and png is not last_png:
+            with frame_timer.stage('push'):
+                anim_placeholder.image(png, use_container_width=True)
+            first_frame.done()
+            last_png = png
         
-        t += dt
-        # time.sleep(0.01) # Removed sleep for max performance
-    
-    plt.close(fig)
+        if frame_clock.frames % 50 == 1:
+            fps_placeholder.caption(utils.clock_caption(frame_clock, frame_timer))
 
 else:
     st.caption("Animation is paused.")
@@ -1,10 +1,15 @@
 import streamlit as st
 import sys
+import json
 import os
 
 # Add parent directory to path to allow importing utils
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import utils
+import chladni
+import render_pool
+import metrics
+import startup
 
 st.set_page_config(page_title="Settings", page_icon="⚙️", layout="wide")
 utils.add_footer()
@@ -49,6 +54,61 @@ st.markdown("---")
 render_setting_group("3. Circular Wave", "cw_")
 st.markdown("---")
 render_setting_group("4. Longitudinal Wave", "lw_")
+st.markdown("---")
+render_setting_group("5. Animation", "anim_")
+st.markdown("---")
+
+# Shared by all sessions on this server (size set by CHLADNI_CACHE_MB)
+st.subheader("6. Chladni Pattern Cache (圖案快取)")
+cache_stats = chladni.pattern_cache.stats()
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Entries", cache_stats['entries'])
+col2.metric("Memory", f"{cache_stats['bytes'] / 2**20:.1f} / {cache_stats['max_bytes'] / 2**20:.0f} MB")
+col3.metric("Hits / Misses", f"{cache_stats['hits']} / {cache_stats['misses']}")
+col4.metric("Evictions", cache_stats['evictions'])
+if st.button("Clear Pattern Cache"):
+    chladni.pattern_cache.clear()
+    st.rerun()
+st.markdown("---")
+
+# Process pool shared by all sessions (size set by RENDER_WORKERS)
+st.subheader("7. Render Workers (渲染程序)")
+pool_stats = render_pool.service_stats()
+if pool_stats is None:
+    st.caption("Not started yet; it starts with the first server-side animation.")
+else:
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Workers", pool_stats['workers'])
+    col2.metric("Sessions", pool_stats['sessions'])
+    col3.metric("Frames Rendered", pool_stats['completed'])
+    col4.metric("Frames Dropped", pool_stats['dropped'])
+st.markdown("---")
+
+# Per-stage frame timings of all animation loops on this server
+st.subheader("8. Performance (效能)")
+st.session_state['perf_overlay'] = st.checkbox(
+    "Show per-stage timings under animations",
+    value=st.session_state.get('perf_overlay', False),
+    help="Adds the median time of each frame stage (physics, render, push, wait) to the animation caption."
+)
+if startup.is_warm():
+    st.caption("Process warm-up: " + ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in startup.timings.items()))
+timings = metrics.snapshot()
+if not timings:
+    st.caption("No frames timed yet; run an animation first.")
+else:
+    rows = [
+        {'Scope': scope, 'Stage': stage, 'Frames': s['count'], 'Mean (ms)': round(s['mean_ms'], 2),
+         'p50 (ms)': round(s['p50_ms'], 2), 'p90 (ms)': round(s['p90_ms'], 2), 'p99 (ms)': round(s['p99_ms'], 2)}
+        for scope, stages in timings.items() for stage, s in stages.items()
+    ]
+    st.dataframe(rows, hide_index=True)
+    col1, col2 = st.columns(2)
+    col1.download_button("⬇️ Download Timings (JSON)", data=json.dumps(timings, indent=2),
+                         file_name="frame_timings.json", mime="application/json")
+    if col2.button("Clear Timings"):
+        metrics.registry.clear()
+        st.rerun()
 
 if st.button("Reset All to Defaults"):
     del st.session_state['settings']
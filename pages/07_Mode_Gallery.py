@@ -0,0 +1,78 @@
+import streamlit as st
+import sys
+import os
+
+# Add parent directory to path to allow importing utils
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import utils
+import chladni
+import gallery
+
+# Page Config
+st.set_page_config(page_title="Chladni Mode Gallery", layout="wide")
+
+utils.add_footer()
+
+# Title & Description
+st.title("Chladni Mode Gallery")
+st.markdown("Browse the whole $(n, m)$ mode space at a glance. Click a mode to open it in the full view.")
+
+# Sidebar Controls
+st.sidebar.header("Gallery")
+shape = st.sidebar.radio("Plate Shape", [chladni.SQUARE, chladni.CIRCULAR])
+if shape == chladni.SQUARE:
+    superposition_mode = st.sidebar.radio("Superposition", [chladni.DIFFERENCE, chladni.SUM], index=0)
+else:
+    superposition_mode = chladni.DIFFERENCE # Default/Ignored for Circle
+
+s_n = utils.get_setting('ch_n')
+s_m = utils.get_setting('ch_m')
+n_range = st.sidebar.slider("Range of n", min_value=int(s_n['min']), max_value=int(s_n['max']), value=(int(s_n['min']), min(int(s_n['min']) + 7, int(s_n['max']))))
+m_range = st.sidebar.slider("Range of m", min_value=int(s_m['min']), max_value=int(s_m['max']), value=(int(s_m['min']), min(int(s_m['min']) + 7, int(s_m['max']))))
+thumb_size = st.sidebar.selectbox("Thumbnail Size (px)", gallery.THUMB_SIZES, index=gallery.THUMB_SIZES.index(gallery.DEFAULT_THUMB_SIZE))
+cols_per_row = st.sidebar.slider("Columns", min_value=4, max_value=12, value=8)
+
+n_values = list(range(n_range[0], n_range[1] + 1))
+m_values = list(range(m_range[0], m_range[1] + 1))
+modes = [(n, m) for n in n_values for m in m_values]
+
+# Build: only modes without a stored thumbnail are rendered (in parallel)
+missing = gallery.missing_modes(shape, superposition_mode, thumb_size, modes)
+col1, col2 = st.columns([3, 1])
+col1.markdown(f"**{len(modes) - len(missing)} / {len(modes)}** thumbnails built for this range.")
+if missing and col2.button(f"Build {len(missing)} Thumbnails", type="primary"):
+    progress_bar = st.progress(0.0, text="Rendering thumbnails...")
+    gallery.build(shape, superposition_mode, modes, thumb_size,
+                  progress=lambda done, total: progress_bar.progress(done / total, text=f"Rendered {done}/{total}"))
+    progress_bar.empty()
+    st.rerun()
+
+# Grid (paged, so large ranges stay responsive)
+per_page = cols_per_row * 6
+pages = max(1, (len(modes) + per_page - 1) // per_page)
+page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1) if pages > 1 else 1
+page_modes = modes[(page - 1) * per_page:page * per_page]
+
+for row_start in range(0, len(page_modes), cols_per_row):
+    columns = st.columns(cols_per_row)
+    for col, (n, m) in zip(columns, page_modes[row_start:row_start + cols_per_row]):
+        png = gallery.thumbnail(shape, superposition_mode, thumb_size, n, m)
+        if png is not None:
+            col.image(png, use_container_width=True)
+        else:
+            col.caption("not built")
+        # Click-through to the full view of this mode
+        col.page_link("pages/02_Chladni_Patterns.py", label=f"n={n}, m={m}",
+                      query_params={'shape': shape, 'mode': superposition_mode, 'n': n, 'm': m})
+
+# Contact sheet of the whole range
+if not missing:
+    st.markdown("---")
+    shape_str = shape.replace(" ", "_").lower()
+    st.download_button(
+        label="⬇️ Download Contact Sheet",
+        data=lambda: gallery.contact_sheet(shape, superposition_mode, thumb_size, n_values, m_values),
+        file_name=f"chladni_{shape_str}_gallery_n{n_range[0]}-{n_range[1]}_m{m_range[0]}-{m_range[1]}.png",
+        mime="image/png",
+        help="One row per n, one column per m."
+    )
@@ -0,0 +1,326 @@
+"""Kirchhoff plate modes of free square and circular plates.
+
+The closed-form fields in ``chladni`` are approximations (sums of cosines for
+the square, clamped-style Bessel modes for the disc). This module solves the
+free plate itself. The bending energy of a thin plate
+
+    U = D/2 * integral of w_xx^2 + w_yy^2 + 2 nu w_xx w_yy + 2 (1 - nu) w_xy^2
+
+is discretised with second differences on the nodes of a grid over
+``[-1, 1] x [-1, 1]`` (inside the unit disc for the circular plate), giving a
+sparse stiffness matrix K (``scipy.sparse``). No boundary condition is
+imposed: the free-edge conditions (no bending moment, no shear) are the
+natural conditions of the energy. With a lumped mass M the lowest modes of
+``K v = lambda M v`` are found by ``eigsh`` in shift-invert mode, and the three
+rigid-body modes (lambda = 0) are dropped. Within degenerate pairs the modes
+are rotated to be symmetric or antisymmetric about the x axis, so the basis
+does not depend on the solver's start vector.
+
+Frequencies are Leissa's nondimensional ``Omega = omega a^2 sqrt(rho h / D)``
+with ``a`` the side of the square or the radius of the disc. The square
+reproduces the published free-plate values (13.47, 19.60, 24.27, ...) to 0.1 %
+at the default grid; the disc boundary is a staircase, so its frequencies
+are a few per cent high and converge with the grid.
+
+A solve takes a few seconds, so each basis is saved under ``PLATE_MODES_DIR``
+per (shape, grid, number of modes, Poisson ratio) and kept in memory. A mode
+or a driven superposition is then a small product with the basis plus a
+resample to the display resolution. ``python plate_modes.py`` precomputes the
+default bases.
+"""
+import logging
+import os
+import threading
+
+import numpy as np
+
+import cache
+import chladni
+
+logger = logging.getLogger(__name__)
+
+PLATE_MODES_DIR = os.environ.get('PLATE_MODES_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'plate_modes'))
+
+# Solver grids (nodes per side); the cost grows about with grid^3
+GRID_SIZES = [61, 121, 181]
+DEFAULT_GRID = 121
+# Elastic modes kept per basis
+N_MODES = 60
+POISSON = 0.3
+# Relative eigenvalue spread treated as one degenerate cluster
+DEGENERATE_TOL = 1e-6
+
+basis_cache = cache.LRUCache(cache.default_budget('PLATE_MODES_MB', 128), name="plate-modes")
+# One solve at a time per process; other sessions wait for its result
+_solve_lock = threading.Lock()
+
+
+def plate_mask(shape, grid):
+    """Nodes of the plate on the ``grid x grid`` lattice over [-1, 1]^2.
+
+    Only nodes that are a corner of at least one whole cell are kept, so that
+    every node carries mass.
+    """
+    if shape == chladni.SQUARE:
+        return np.ones((grid, grid), dtype=bool)
+    x = chladni.plate_axis(grid)
+    X, Y = np.meshgrid(x, x)
+    mask = X**2 + Y**2 <= 1 + 1e-9
+    cell = _cells(mask)
+    corner = np.zeros_like(mask)
+    corner[1:, 1:] |= cell
+    corner[:-1, 1:] |= cell
+    corner[1:, :-1] |= cell
+    corner[:-1, :-1] |= cell
+    return mask & corner
+
+
+def _cells(mask):
+    # Cells (between four nodes) lying entirely on the plate
+    return mask[1:, 1:] & mask[:-1, 1:] & mask[1:, :-1] & mask[:-1, :-1]
+
+
+def assemble(mask, h, poisson=POISSON):
+    """Stiffness matrix K (CSR, over the nodes of ``mask``) and lumped masses.
+
+    Every whole cell gives a quarter of its area to each corner. Each energy
+    term is a weighted sum of squared difference stencils, and only stencils
+    whose nodes all lie on the plate are included.
+    """
+    import scipy.sparse as sp
+
+    rows, cols = mask.shape
+    index = np.full(mask.shape, -1, dtype=np.int64)
+    index[mask] = np.arange(np.count_nonzero(mask))
+    n_nodes = int(np.count_nonzero(mask))
+
+    cell = _cells(mask)
+    mass = np.zeros(mask.shape)
+    for dy in (0, 1):
+        for dx in (0, 1):
+            mass[dy:rows - 1 + dy, dx:cols - 1 + dx] += cell * (h * h / 4)
+
+    def stencil(centres, offsets, coeffs):
+        # One row per centre node: sum of coeff * w[centre + offset]
+        count = len(centres[0])
+        data = np.concatenate([np.full(count, c / (h * h)) for c in coeffs])
+        row = np.tile(np.arange(count), len(offsets))
+        col = np.concatenate([index[centres[0] + dy, centres[1] + dx] for dy, dx in offsets])
+        return sp.csr_matrix((data, (row, col)), shape=(count, n_nodes))
+
+    has_xx = np.zeros_like(mask)
+    has_xx[:, 1:-1] = mask[:, 1:-1] & mask[:, 2:] & mask[:, :-2]
+    has_yy = np.zeros_like(mask)
+    has_yy[1:-1, :] = mask[1:-1, :] & mask[2:, :] & mask[:-2, :]
+    at_xx, at_yy, at_both = np.nonzero(has_xx), np.nonzero(has_yy), np.nonzero(has_xx & has_yy)
+    at_cell = np.nonzero(cell)
+
+    second = [1.0, -2.0, 1.0]
+    d_xx = stencil(at_xx, [(0, -1), (0, 0), (0, 1)], second)
+    d_yy = stencil(at_yy, [(-1, 0), (0, 0), (1, 0)], second)
+    # w_xy at cell centres
+    d_xy = stencil(at_cell, [(0, 0), (0, 1), (1, 0), (1, 1)], [1.0, -1.0, -1.0, 1.0])
+    # nu w_xx w_yy where both are defined
+    coupling = stencil(at_both, [(0, -1), (0, 0), (0, 1)], second).T @ sp.diags(mass[at_both]) \
+        @ stencil(at_both, [(-1, 0), (0, 0), (1, 0)], second)
+
+    stiffness = (d_xx.T @ sp.diags(mass[at_xx]) @ d_xx
+                 + d_yy.T @ sp.diags(mass[at_yy]) @ d_yy
+                 + poisson * (coupling + coupling.T)
+                 + 2 * (1 - poisson) * (h * h) * (d_xy.T @ d_xy))
+    return stiffness.tocsr(), mass[mask]
+
+
+class ModeBasis:
+    """The lowest elastic modes of one plate on one grid.
+
+    ``vectors[k]`` is mode k on the full ``grid x grid`` lattice, mass
+    normalised; off-plate nodes (disc) hold the value of the nearest plate
+    node so the field can be resampled smoothly up to the edge.
+    """
+
+    def __init__(self, shape, grid, poisson, frequencies, vectors, mask):
+        self.shape = shape
+        self.grid = grid
+        self.poisson = poisson
+        self.frequencies = frequencies
+        self.vectors = vectors
+        self.mask = mask
+
+    @property
+    def n_modes(self):
+        return len(self.frequencies)
+
+    @property
+    def nbytes(self):
+        return self.frequencies.nbytes + self.vectors.nbytes + self.mask.nbytes
+
+    def mode(self, index):
+        """Mode ``index`` (1 = lowest elastic mode) on the solver grid."""
+        return self.vectors[index - 1]
+
+    def point_values(self, point):
+        """Every mode's value at the grid node nearest to ``point`` = (x, y)."""
+        col, row = (int(round((c + 1) / 2 * (self.grid - 1))) for c in point)
+        return self.vectors[:, min(max(row, 0), self.grid - 1), min(max(col, 0), self.grid - 1)]
+
+    def driven(self, frequency, loss=0.02, point=(0.0, 0.0)):
+        """Steady response to a harmonic point force at ``point``, on the solver grid.
+
+        Modal superposition with a structural loss factor ``loss``:
+        ``w = sum_k phi_k(p) phi_k / (Omega_k^2 (1 + i loss) - Omega^2)``. The
+        complex field is turned to the phase of its largest real projection,
+        whose zero set is where sand collects.
+        """
+        omega_k2 = self.frequencies ** 2
+        weights = self.point_values(point) / (omega_k2 * (1 + 1j * loss) - frequency ** 2)
+        field = np.tensordot(weights, self.vectors, axes=1)
+        phase = 0.5 * np.angle(np.sum(field * field))
+        return (field * np.exp(-1j * phase)).real.astype(np.float32)
+
+    def save(self, path):
+        # Written to a temporary file first so a concurrent reader never sees half a basis
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, shape=self.shape, grid=self.grid, poisson=self.poisson,
+                     frequencies=self.frequencies, vectors=self.vectors, mask=self.mask)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(str(data['shape']), int(data['grid']), float(data['poisson']),
+                       data['frequencies'], data['vectors'], data['mask'])
+
+
+def _split_degenerate(values, vectors, mask):
+    # Rotate each degenerate cluster to eigenvectors of the mirror y -> -y
+    mirror = np.full(mask.shape, -1, dtype=np.int64)
+    mirror[mask] = np.arange(np.count_nonzero(mask))
+    mirror = mirror[::-1][mask]
+    start = 0
+    while start < len(values):
+        stop = start + 1
+        while stop < len(values) and values[stop] - values[start] <= DEGENERATE_TOL * abs(values[stop]):
+            stop += 1
+        if stop - start > 1:
+            V = vectors[:, start:stop]
+            _, rotation = np.linalg.eigh(V.T @ V[mirror])
+            vectors[:, start:stop] = V @ rotation
+        start = stop
+
+
+def solve_modes(shape, grid=DEFAULT_GRID, n_modes=N_MODES, poisson=POISSON):
+    """Solve for the lowest ``n_modes`` elastic modes (seconds; see ``get_basis``)."""
+    import scipy.sparse as sp
+    from scipy.ndimage import distance_transform_edt
+    from scipy.sparse.linalg import eigsh
+
+    mask = plate_mask(shape, grid)
+    h = 2.0 / (grid - 1)
+    stiffness, mass = assemble(mask, h, poisson)
+
+    # Symmetric standard form M^-1/2 K M^-1/2; the shift just below zero keeps
+    # the factorisation regular despite the rigid-body null space
+    scale = sp.diags(1 / np.sqrt(mass))
+    values, vectors = eigsh((scale @ stiffness @ scale).tocsc(), k=n_modes + 3, sigma=-1.0, which='LM')
+    order = np.argsort(values)[3:]
+    values, vectors = values[order], vectors[:, order]
+    _split_degenerate(values, vectors, mask)
+    vectors /= np.sqrt(mass)[:, None]
+
+    # Back onto the full lattice, off-plate nodes copying their nearest plate node
+    nearest = distance_transform_edt(~mask, return_distances=False, return_indices=True)
+    full = np.zeros((n_modes, grid, grid), dtype=np.float32)
+    full[:, mask] = vectors.T
+    full = full[:, nearest[0], nearest[1]]
+
+    # Nondimensional frequencies: lambda = omega^2 for D / (rho h) = 1 on this
+    # domain, scaled to a side of 2 (square) or a radius of 1 (disc)
+    size = 2.0 if shape == chladni.SQUARE else 1.0
+    frequencies = np.sqrt(np.maximum(values, 0.0)) * size**2
+    return ModeBasis(shape, grid, poisson, frequencies, full, mask)
+
+
+def basis_path(shape, grid, n_modes=N_MODES, poisson=POISSON, root=None):
+    shape_str = shape.replace(" ", "_").lower()
+    return os.path.join(root or PLATE_MODES_DIR, f"{shape_str}_g{int(grid)}_k{int(n_modes)}_nu{poisson:g}.npz")
+
+
+def get_basis(shape, grid=DEFAULT_GRID, n_modes=N_MODES, poisson=POISSON):
+    """Mode basis from memory, else from disk, else solved once and saved."""
+    key = (shape, int(grid), int(n_modes), float(poisson))
+    basis = basis_cache.get(key)
+    if basis is not None:
+        return basis
+
+    with _solve_lock:
+        basis = basis_cache.get(key)
+        if basis is not None:
+            return basis
+        path = basis_path(shape, grid, n_modes, poisson)
+        try:
+            basis = ModeBasis.load(path)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Plate mode basis %s unreadable (%s), solving again", path, e)
+
+        if basis is None:
+            logger.info("Solving %d plate modes for %s on a %d grid", n_modes, shape, grid)
+            basis = solve_modes(shape, grid, n_modes, poisson)
+            try:
+                basis.save(path)
+            except OSError as e:
+                # Read-only deployments still work, just without persistence
+                logger.warning("Could not save plate mode basis to %s (%s)", path, e)
+        return basis_cache.put(key, basis)
+
+
+def is_solved(shape, grid=DEFAULT_GRID, n_modes=N_MODES, poisson=POISSON):
+    """Whether ``get_basis`` can answer without solving."""
+    return (shape, int(grid), int(n_modes), float(poisson)) in basis_cache \
+        or os.path.exists(basis_path(shape, grid, n_modes, poisson))
+
+
+def resample(shape, field, res):
+    """``(x, y, Z)`` of a solver-grid field at ``res`` px, NaN outside the disc.
+
+    Bicubic spline interpolation, so the nodal lines stay smooth at display
+    resolutions much finer than the solver grid.
+    """
+    from scipy.interpolate import RectBivariateSpline
+
+    axis = chladni.plate_axis(field.shape[0])
+    x = chladni.plate_axis(res)
+    # Rows of the field run along y
+    Z = RectBivariateSpline(axis, axis, field)(x, x).astype(np.float32)
+    if shape != chladni.SQUARE:
+        Z[np.add.outer(x**2, x**2) > 1] = np.nan
+    return x, x, Z
+
+
+def mode_pattern(shape, index, res, grid=DEFAULT_GRID):
+    """Cached ``(x, y, Z)`` of elastic mode ``index`` (1-based), like ``chladni.get_pattern``."""
+    key = ('kirchhoff', shape, int(grid), 'mode', int(index), int(res))
+    return chladni.pattern_cache.get_or_compute(
+        key, lambda: resample(shape, get_basis(shape, grid).mode(index), res))
+
+
+def driven_pattern(shape, frequency, res, grid=DEFAULT_GRID, loss=0.02, point=(0.0, 0.0)):
+    """Cached ``(x, y, Z)`` of the plate driven at ``frequency`` (see ``ModeBasis.driven``)."""
+    key = ('kirchhoff', shape, int(grid), 'driven', round(float(frequency), 4), float(loss),
+           tuple(float(p) for p in point), int(res))
+    return chladni.pattern_cache.get_or_compute(
+        key, lambda: resample(shape, get_basis(shape, grid).driven(frequency, loss, point), res))
+
+
+if __name__ == '__main__':
+    import time
+    for shape in (chladni.SQUARE, chladni.CIRCULAR):
+        start = time.perf_counter()
+        basis = get_basis(shape)
+        print(f"{shape}: {basis.n_modes} modes on a {basis.grid} grid in {time.perf_counter() - start:.1f} s, "
+              f"Omega = {', '.join(f'{f:.2f}' for f in basis.frequencies[:8])}, ...")
+        print(f"  saved to {basis_path(shape, basis.grid)}")
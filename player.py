@@ -0,0 +1,206 @@
+"""Browser-side playback of periodic animations.
+
+Every animation in this app is periodic in ``cos(omega * t)``: each moving
+coordinate is ``base + mode * cos(omega * t)``. Instead of streaming frames
+from a server-side loop, a page can describe one period as a *scene* (the
+``base`` and ``mode`` arrays of every layer, computed once per slider change
+with the kernels) and hand it to a small canvas player that loops it in the
+browser. The server then does one computation per parameter change, no
+matter how long the viewer watches.
+
+    scene = player.scene([player.line(x_ch, y_ch, color='#00FFFF')],
+                         period=2.0, xlim=(0, 1), ylim=(-0.3, 0.3))
+    player.show(scene, height=400)
+"""
+import json
+
+import numpy as np
+
+BG_COLOR = '#0E1117'
+
+# Coordinates are sent with this many decimals to keep the payload small
+DECIMALS = 4
+
+
+def _encode(value, decimals=DECIMALS):
+    arr = np.asarray(value, dtype=float)
+    if arr.ndim == 0:
+        return round(float(arr), decimals)
+    return np.round(arr.ravel(), decimals).tolist()
+
+
+def channel(base, mode=None):
+    """One coordinate: ``base + mode * cos(phase)``; scalars or 1-D arrays."""
+    ch = {'base': _encode(base)}
+    if mode is not None:
+        ch['mode'] = _encode(mode)
+    return ch
+
+
+def line(x, y, color, width=2, dash=None, alpha=1.0, closed=False):
+    return {'kind': 'line', 'x': x, 'y': y, 'color': color, 'width': width,
+            'dash': list(dash or []), 'alpha': alpha, 'closed': closed}
+
+
+def points(x, y, radius, color='#FFFFFF', value=None, lut=None, edgecolor=None, alpha=1.0):
+    """Filled circles; with ``value`` (0..1) and ``lut`` they are colour-mapped."""
+    layer = {'kind': 'points', 'x': x, 'y': y, 'radius': radius, 'color': color,
+             'edgecolor': edgecolor, 'alpha': alpha}
+    if value is not None:
+        layer['value'] = value
+        layer['lut'] = lut
+    return layer
+
+
+def polygon(x, y, color, alpha=1.0):
+    return {'kind': 'polygon', 'x': x, 'y': y, 'color': color, 'alpha': alpha}
+
+
+def vlines(x, y0, y1, color, width=1, dash=None, alpha=1.0):
+    return {'kind': 'vlines', 'x': x, 'y0': y0, 'y1': y1, 'color': color,
+            'width': width, 'dash': list(dash or []), 'alpha': alpha}
+
+
+def colormap_lut(name, n=256):
+    """Colormap as a list of ``n`` hex colours for colour-mapped layers."""
+    import matplotlib
+    from matplotlib.colors import to_hex
+    cmap = matplotlib.colormaps[name].resampled(n)
+    return [to_hex(c) for c in cmap(np.linspace(0, 1, n))]
+
+
+def scene(layers, period, xlim, ylim, title='', equal_aspect=False, xticks=None, background=BG_COLOR):
+    """Everything the player needs for one period of an animation."""
+    return {
+        'layers': layers,
+        'period': float(period),
+        'xlim': [float(v) for v in xlim],
+        'ylim': [float(v) for v in ylim],
+        'title': title,
+        'equal': bool(equal_aspect),
+        'xticks': [float(v) for v in xticks] if xticks is not None else [],
+        'background': background,
+    }
+
+
+_PLAYER_HTML = """
+<style>body { margin: 0; background: transparent; }</style>
+<div id="player" style="width:100%;"><canvas id="c"></canvas></div>
+<script>
+const S = __SCENE__;
+const HEIGHT = __HEIGHT__;
+const canvas = document.getElementById('c');
+const ctx = canvas.getContext('2d');
+const dpr = window.devicePixelRatio || 1;
+const TOP = S.title ? 30 : 8, BOTTOM = S.xticks.length ? 28 : 8, SIDE = 12;
+let W = 0, H = 0, sx = null, sy = null;
+
+function resize() {
+  W = document.getElementById('player').clientWidth;
+  H = HEIGHT;
+  canvas.width = W * dpr; canvas.height = H * dpr;
+  canvas.style.width = W + 'px'; canvas.style.height = H + 'px';
+  ctx.setTransform(dpr, 0, 0, dpr, 0, 0);
+  const pw = W - 2 * SIDE, ph = H - TOP - BOTTOM;
+  let kx = pw / (S.xlim[1] - S.xlim[0]), ky = ph / (S.ylim[1] - S.ylim[0]);
+  let ox = SIDE, oy = TOP;
+  if (S.equal) {
+    const k = Math.min(kx, ky);
+    ox += (pw - k * (S.xlim[1] - S.xlim[0])) / 2;
+    oy += (ph - k * (S.ylim[1] - S.ylim[0])) / 2;
+    kx = ky = k;
+  }
+  sx = x => ox + (x - S.xlim[0]) * kx;
+  sy = y => oy + (S.ylim[1] - y) * ky;
+}
+
+function size(ch) {
+  if (Array.isArray(ch.base)) return ch.base.length;
+  if (ch.mode !== undefined && Array.isArray(ch.mode)) return ch.mode.length;
+  return 1;
+}
+function val(ch, i, c) {
+  const b = Array.isArray(ch.base) ? ch.base[i] : ch.base;
+  if (ch.mode === undefined) return b;
+  return b + (Array.isArray(ch.mode) ? ch.mode[i] : ch.mode) * c;
+}
+
+function drawLayer(L, c) {
+  ctx.globalAlpha = L.alpha;
+  if (L.kind === 'line' || L.kind === 'polygon') {
+    const n = Math.max(size(L.x), size(L.y));
+    ctx.beginPath();
+    for (let i = 0; i < n; i++) {
+      const px = sx(val(L.x, i, c)), py = sy(val(L.y, i, c));
+      if (i === 0) ctx.moveTo(px, py); else ctx.lineTo(px, py);
+    }
+    if (L.kind === 'polygon' || L.closed) ctx.closePath();
+    if (L.kind === 'polygon') { ctx.fillStyle = L.color; ctx.fill(); }
+    else { ctx.strokeStyle = L.color; ctx.lineWidth = L.width; ctx.setLineDash(L.dash); ctx.stroke(); }
+  } else if (L.kind === 'points') {
+    const n = Math.max(size(L.x), size(L.y));
+    for (let i = 0; i < n; i++) {
+      ctx.beginPath();
+      ctx.arc(sx(val(L.x, i, c)), sy(val(L.y, i, c)), L.radius, 0, 2 * Math.PI);
+      if (L.value !== undefined) {
+        const v = Math.min(1, Math.max(0, val(L.value, i, c)));
+        ctx.fillStyle = L.lut[Math.round(v * (L.lut.length - 1))];
+      } else {
+        ctx.fillStyle = L.color;
+      }
+      ctx.fill();
+      if (L.edgecolor) { ctx.strokeStyle = L.edgecolor; ctx.lineWidth = 1; ctx.setLineDash([]); ctx.stroke(); }
+    }
+  } else if (L.kind === 'vlines') {
+    ctx.strokeStyle = L.color; ctx.lineWidth = L.width; ctx.setLineDash(L.dash);
+    ctx.beginPath();
+    for (let i = 0; i < size(L.x); i++) {
+      const px = sx(val(L.x, i, 0));
+      ctx.moveTo(px, sy(L.y0)); ctx.lineTo(px, sy(L.y1));
+    }
+    ctx.stroke();
+  }
+  ctx.globalAlpha = 1; ctx.setLineDash([]);
+}
+
+function drawFrame(now) {
+  const phase = ((now / 1000) % S.period) / S.period;
+  const c = Math.cos(2 * Math.PI * phase);
+  ctx.fillStyle = S.background;
+  ctx.fillRect(0, 0, W, H);
+  for (const L of S.layers) drawLayer(L, c);
+  ctx.fillStyle = 'white';
+  if (S.title) {
+    ctx.font = '16px sans-serif'; ctx.textAlign = 'center';
+    ctx.fillText(S.title, W / 2, 20);
+  }
+  if (S.xticks.length) {
+    const y = H - BOTTOM + 4;
+    ctx.strokeStyle = 'white'; ctx.lineWidth = 1;
+    ctx.beginPath(); ctx.moveTo(sx(S.xlim[0]), y); ctx.lineTo(sx(S.xlim[1]), y); ctx.stroke();
+    ctx.font = '12px sans-serif'; ctx.textAlign = 'center';
+    for (const t of S.xticks) {
+      ctx.beginPath(); ctx.moveTo(sx(t), y); ctx.lineTo(sx(t), y + 4); ctx.stroke();
+      ctx.fillText(String(+t.toFixed(2)), sx(t), y + 16);
+    }
+  }
+  requestAnimationFrame(drawFrame);
+}
+
+window.addEventListener('resize', resize);
+resize();
+requestAnimationFrame(drawFrame);
+</script>
+"""
+
+
+def render_html(scene, height):
+    return (_PLAYER_HTML
+            .replace('__SCENE__', json.dumps(scene, separators=(',', ':')))
+            .replace('__HEIGHT__', str(int(height))))
+
+
+def show(scene, height=400):
+    """Embed the looping player in the current Streamlit page."""
+    import streamlit.components.v1 as components
+    components.html(render_html(scene, height), height=int(height) + 8)
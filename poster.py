@@ -0,0 +1,307 @@
+"""Tiled, out-of-core poster export of Chladni patterns.
+
+A 16k x 16k image needs about 1 GB for the float32 field alone, several times
+that for the intermediates of a full-image render. Posters are therefore
+produced in horizontal bands: each band of the field is computed on its own
+(``chladni.calculate_pattern_rows``), rasterized with ``chladni_render`` and
+written out straight away, so peak memory depends on the band size and the
+number of workers, not on the poster size.
+
+Output formats:
+
+* PNG - streamed: every band is deflate-compressed by the worker that
+  rendered it and appended as IDAT chunks (the per-band Adler-32 checksums
+  are combined by the writer), so compression runs in parallel too,
+* TIFF - uncompressed baseline TIFF written row by row (up to 4 GB),
+* NPY - an ``(H, W, 3)`` uint8 NumPy array written through a memory map.
+
+Bands are rendered by a process pool with a bounded window of jobs in flight
+and written in order. The file is written under a temporary name and only
+moved to its final path once complete, so an interrupted or failed export
+never leaves a truncated poster behind. At most ``MAX_CONCURRENT`` posters
+are rendered at a time per process (others wait their turn), each with at
+most ``MAX_WORKERS`` processes.
+"""
+import multiprocessing
+import os
+import struct
+import tempfile
+import threading
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import chladni
+import chladni_render
+
+PNG = "PNG"
+TIFF = "TIFF"
+NPY = "NPY"
+FORMATS = {PNG: '.png', TIFF: '.tif', NPY: '.npy'}
+
+# Poster sizes offered in the UI (pixels per side)
+SIZES = [4096, 8192, 16384, 32768]
+
+# Field memory per band; the rasterizer needs a few times this on top
+BAND_BYTES = 16 * 2**20
+
+# Where the app writes posters, and the largest one it offers as a download
+POSTER_DIR = os.environ.get('POSTER_DIR', os.path.join(tempfile.gettempdir(), 'chladni_posters'))
+MAX_DOWNLOAD_MB = float(os.environ.get('POSTER_DOWNLOAD_MB', 256))
+# Renders running at once (across all sessions) and worker processes for each
+MAX_CONCURRENT = max(1, int(os.environ.get('POSTER_CONCURRENCY', 1)))
+MAX_WORKERS = int(os.environ.get('POSTER_WORKERS', min(os.cpu_count() or 1, 4)))
+
+_slots = threading.BoundedSemaphore(MAX_CONCURRENT)
+
+_ADLER_BASE = 65521
+
+
+def format_for_path(path):
+    ext = os.path.splitext(path)[1].lower()
+    for fmt, fmt_ext in FORMATS.items():
+        if ext == fmt_ext or (fmt == TIFF and ext == '.tiff'):
+            return fmt
+    raise ValueError(f"Unsupported poster format: {ext or path}")
+
+
+def poster_path(shape, n, m, mode, size, fmt, directory=None):
+    directory = directory or POSTER_DIR
+    shape_str = shape.replace(" ", "_").lower()
+    mode_str = f"_{'sum' if mode == chladni.SUM else 'diff'}" if shape == chladni.SQUARE else ""
+    return os.path.join(directory, f"chladni_{shape_str}_n{n}_m{m}{mode_str}_{size}px{FORMATS[fmt]}")
+
+
+def read_poster(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def adler32_combine(adler1, adler2, len2):
+    """Adler-32 of ``a + b`` from the checksums of ``a`` and ``b`` (``len(b) == len2``)."""
+    s1a, s2a = adler1 & 0xffff, adler1 >> 16
+    s1b, s2b = adler2 & 0xffff, adler2 >> 16
+    s1 = (s1a + s1b - 1) % _ADLER_BASE
+    s2 = (s2a + s2b + (len2 % _ADLER_BASE) * (s1a - 1)) % _ADLER_BASE
+    return (s2 << 16) | s1
+
+
+class PNGWriter:
+    """Streaming PNG writer for 8-bit RGB images fed with pre-deflated bands."""
+
+    def __init__(self, path, width, height):
+        self._file = open(path, 'wb')
+        self._adler = 1
+        self._file.write(b'\x89PNG\r\n\x1a\n')
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+        # zlib header (deflate, 32K window); the raw deflate blocks follow
+        self._chunk(b'IDAT', b'\x78\x01')
+
+    def _chunk(self, kind, data):
+        self._file.write(struct.pack('>I', len(data)))
+        self._file.write(kind)
+        self._file.write(data)
+        self._file.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(kind))))
+
+    def write(self, band):
+        deflated, adler, length = band
+        self._chunk(b'IDAT', deflated)
+        self._adler = adler32_combine(self._adler, adler, length)
+
+    def close(self):
+        # Empty final deflate block, then the Adler-32 of all scanlines
+        final = zlib.compressobj(wbits=-15).flush(zlib.Z_FINISH)
+        self._chunk(b'IDAT', final + struct.pack('>I', self._adler))
+        self._chunk(b'IEND', b'')
+        self._file.close()
+
+
+class TIFFWriter:
+    """Uncompressed baseline RGB TIFF written in row order (single strip)."""
+
+    def __init__(self, path, width, height):
+        data_bytes = width * height * 3
+        # Header (8) + IFD (2 + 10 * 12 + 4) + BitsPerSample values (6)
+        data_offset = 8 + 126 + 6
+        if data_offset + data_bytes >= 2**32:
+            raise ValueError("Image too large for a classic TIFF; use PNG or NPY")
+        bits_offset = 8 + 126
+
+        entries = [
+            (256, 4, 1, width),           # ImageWidth
+            (257, 4, 1, height),          # ImageLength
+            (258, 3, 3, bits_offset),     # BitsPerSample -> 8, 8, 8
+            (259, 3, 1, 1),               # Compression: none
+            (262, 3, 1, 2),               # Photometric: RGB
+            (273, 4, 1, data_offset),     # StripOffsets
+            (277, 3, 1, 3),               # SamplesPerPixel
+            (278, 4, 1, height),          # RowsPerStrip
+            (279, 4, 1, data_bytes),      # StripByteCounts
+            (284, 3, 1, 1),               # PlanarConfiguration: chunky
+        ]
+        self._file = open(path, 'wb')
+        self._file.write(b'II*\x00' + struct.pack('<I', 8))
+        self._file.write(struct.pack('<H', len(entries)))
+        for tag, kind, count, value in entries:
+            packed = struct.pack('<HH', value, 0) if kind == 3 and count == 1 else struct.pack('<I', value)
+            self._file.write(struct.pack('<HHI', tag, kind, count) + packed)
+        self._file.write(struct.pack('<I', 0))
+        self._file.write(struct.pack('<HHH', 8, 8, 8))
+
+    def write(self, band):
+        self._file.write(band)
+
+    def close(self):
+        self._file.close()
+
+
+class NPYWriter:
+    """``(H, W, 3)`` uint8 ``.npy`` file filled through a memory map."""
+
+    def __init__(self, path, width, height):
+        self._array = np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8, shape=(height, width, 3))
+        self._row = 0
+
+    def write(self, band):
+        rows = np.frombuffer(band, dtype=np.uint8).reshape(-1, self._array.shape[1], 3)
+        self._array[self._row:self._row + len(rows)] = rows
+        self._row += len(rows)
+
+    def close(self):
+        self._array.flush()
+        del self._array
+
+
+WRITERS = {PNG: PNGWriter, TIFF: TIFFWriter, NPY: NPYWriter}
+
+
+def band_rows(size, band_bytes=BAND_BYTES):
+    return max(8, min(size, band_bytes // (4 * size)))
+
+
+def _field_rows(shape, n, m, mode, size, img_start, img_stop):
+    # Image rows run from the top (y = +1); field rows from the bottom
+    return chladni.calculate_pattern_rows(shape, n, m, size, mode, size - img_stop, size - img_start)
+
+
+def _band_limits(job):
+    shape, n, m, mode, size, img_start, img_stop = job
+    amp = np.abs(_field_rows(shape, n, m, mode, size, img_start, img_stop))
+    if np.isnan(amp).all():
+        return np.inf, -np.inf
+    return float(np.nanmin(amp)), float(np.nanmax(amp))
+
+
+def _render_band(job):
+    (shape, n, m, mode, size, img_start, img_stop, limits, node_width, antialias, fmt, level) = job
+
+    # A few halo rows on each side so gradients and line thickening at the
+    # band edges match a full-image render
+    halo = int(np.ceil(node_width / 2)) + 2
+    start, stop = max(0, img_start - halo), min(size, img_stop + halo)
+    Z = _field_rows(shape, n, m, mode, size, start, stop)
+    rgba = chladni_render.rasterize(Z, node_width=node_width, antialias=antialias, limits=limits)
+    del Z
+    rgb = np.ascontiguousarray(rgba[img_start - start:img_stop - start, :, :3])
+    del rgba
+
+    if fmt != PNG:
+        return rgb.tobytes()
+
+    # PNG scanlines with the Sub filter (difference to the pixel on the left)
+    lines = np.empty((len(rgb), 1 + size * 3), dtype=np.uint8)
+    lines[:, 0] = 1
+    flat = rgb.reshape(len(rgb), -1)
+    lines[:, 1:4] = flat[:, :3]
+    np.subtract(flat[:, 3:], flat[:, :-3], out=lines[:, 4:])
+    raw = lines.tobytes()
+    compressor = zlib.compressobj(level, wbits=-15)
+    deflated = compressor.compress(raw) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    return deflated, zlib.adler32(raw), len(raw)
+
+
+def _map_ordered(fn, jobs, executor, window):
+    """Results of ``fn`` over ``jobs`` in order, at most ``window`` in flight."""
+    if executor is None:
+        for job in jobs:
+            yield fn(job)
+        return
+    pending = []
+    jobs = iter(jobs)
+    for job in jobs:
+        pending.append(executor.submit(fn, job))
+        if len(pending) >= window:
+            break
+    while pending:
+        result = pending.pop(0).result()
+        next_job = next(jobs, None)
+        if next_job is not None:
+            pending.append(executor.submit(fn, next_job))
+        yield result
+
+
+def export_poster(path, shape, n, m, mode=chladni.DIFFERENCE, size=16384, fmt=None,
+                  node_width=chladni_render.NODE_WIDTH, antialias=True, workers=None,
+                  rows_per_band=None, level=6, progress=None):
+    """Write a ``size x size`` RGB poster of a mode to ``path``; returns ``path``.
+
+    ``node_width`` is in pixels at ``chladni_render.RESOLUTION`` and scaled to
+    the poster. ``workers`` processes render bands (default ``MAX_WORKERS``;
+    ``0`` or ``1`` renders in this process). ``progress(done, total)`` is
+    called per written band. Waits while ``MAX_CONCURRENT`` other posters are
+    being rendered.
+    """
+    fmt = fmt or format_for_path(path)
+    if fmt not in WRITERS:
+        raise ValueError(f"Unsupported poster format: {fmt}")
+    size = int(size)
+    rows = rows_per_band or band_rows(size)
+    bands = [(start, min(start + rows, size)) for start in range(0, size, rows)]
+    if workers is None:
+        workers = MAX_WORKERS
+
+    with _slots:
+        _export(path, shape, n, m, mode, size, fmt, node_width, antialias, workers, bands, level, progress)
+    return path
+
+
+def _export(path, shape, n, m, mode, size, fmt, node_width, antialias, workers, bands, level, progress):
+    executor = None
+    if workers > 1:
+        # spawn: never fork a threaded server process
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    try:
+        window = 2 * max(workers, 1)
+        # Pass 1: the colour scale needs the global range of |Z|
+        lo, hi = np.inf, -np.inf
+        for band_lo, band_hi in _map_ordered(
+                _band_limits, [(shape, n, m, mode, size, a, b) for a, b in bands], executor, window):
+            lo, hi = min(lo, band_lo), max(hi, band_hi)
+
+        # Pass 2: render and write the bands in order
+        width = node_width * size / chladni_render.RESOLUTION
+        jobs = [(shape, n, m, mode, size, a, b, (lo, hi), width, antialias, fmt, level) for a, b in bands]
+        # Written under a private name and moved into place only when complete;
+        # BaseException also covers a Streamlit rerun stopping the script
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        writer = WRITERS[fmt](tmp_path, size, size)
+        try:
+            try:
+                for done, band in enumerate(_map_ordered(_render_band, jobs, executor, window), 1):
+                    writer.write(band)
+                    if progress is not None:
+                        progress(done, len(jobs))
+            finally:
+                writer.close()
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
@@ -0,0 +1,417 @@
+"""Shared render worker pool with per-session backpressure.
+
+Matplotlib rendering is largely GIL-bound, so sessions that each render in
+their own script thread serialize on one core. ``RenderService`` runs frame
+jobs (see ``frame_jobs``) in a process pool shared by every session:
+
+* each session has a small bounded queue; when it is full the oldest job is
+  dropped, so a session that falls behind always gets its latest frame next
+  (latest-frame-wins),
+* sessions are served round-robin, so one busy tab cannot starve the others,
+* at most ``max_inflight`` jobs run at once across all sessions,
+* identical jobs requested by several sessions are rendered once,
+* exports (``render_frames``) go through the same queue as batches; a
+  session's live frames come before its export frames, and at most
+  ``export_quota`` frames of each session's exports run at once.
+
+Finished frames go into the shared phase cache (``frame_cache``), so the pool
+only ever renders each phase sample of a parameter set once. Each result
+carries the worker's draw/copy/encode times, which are recorded in the
+server's ``metrics`` registry.
+
+``RENDER_WORKERS`` sets the pool size (default: CPU count); ``0`` disables the
+pool and frames are rendered in the calling thread instead.
+
+A failed job is reported to the sessions waiting for it: ``latest`` raises
+``RuntimeError`` until a newer frame arrives, so a broken pool shows up as an
+error on the page instead of a blank animation.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import frame_cache
+import frame_jobs
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Sessions that have not asked for a frame for this long are forgotten
+SESSION_TIMEOUT = 60.0
+
+
+def _init_worker():
+    # Dark style, fonts and colormaps before the first frame is requested
+    import startup
+    startup.warm()
+
+
+def _record_timings(timings):
+    # Stage times measured in the worker (see frame_jobs.render_timed)
+    for scope, stage, seconds in timings:
+        metrics.record(scope, stage, seconds)
+
+
+class _Batch:
+    """Export frames of one ``render_frames`` call, returned as RGBA arrays."""
+
+    def __init__(self, kind, params, phases):
+        self.kind, self.params = kind, params
+        self.jobs = deque(enumerate(phases))
+        self.results = [None] * len(phases)
+        self.done = 0
+        self.inflight = 0
+        self.error = None
+
+
+class _Session:
+    def __init__(self, queue_size):
+        self.queue = deque(maxlen=queue_size)
+        self.batches = deque()
+        self.latest = None
+        self.latest_seq = -1
+        # Message of a failed job newer than ``latest``
+        self.error = None
+        self.error_seq = -1
+        self.last_seen = time.monotonic()
+        self.submitted = 0
+        self.dropped = 0
+
+
+class RenderService:
+    def __init__(self, max_workers=None, queue_size=2, max_inflight=None, export_quota=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_inflight = max_inflight or self.max_workers
+        # Export frames in flight per session: leave room for the other sessions
+        self.export_quota = export_quota or max(1, self.max_inflight // 2)
+        self.queue_size = queue_size
+        # spawn: never fork the Streamlit server with its threads and sockets
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+        )
+        self._lock = threading.Condition()
+        self._sessions = OrderedDict()
+        self._pending = {}
+        self._inflight = 0
+        self._seq = 0
+        self.completed = 0
+        self.failed = 0
+        self._closed = False
+        self._dispatcher = threading.Thread(target=self._dispatch, name="render-dispatcher", daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, session_id, cache_key, kind, params, phase):
+        """Queue a frame job for a session; returns immediately."""
+        with self._lock:
+            session = self._session(session_id)
+            if len(session.queue) == session.queue.maxlen:
+                session.dropped += 1
+            self._seq += 1
+            session.queue.append((self._seq, cache_key, kind, params, phase))
+            session.submitted += 1
+            self._lock.notify_all()
+
+    def latest(self, session_id):
+        """Most recent finished frame (PNG bytes) for a session, or None.
+
+        Raises ``RuntimeError`` if the session's newest job failed.
+        """
+        with self._lock:
+            session = self._session(session_id)
+            if session.error is not None and session.error_seq > session.latest_seq:
+                raise RuntimeError(session.error)
+            return session.latest
+
+    def render_batch(self, session_id, kind, params, phases, progress=None):
+        """RGBA arrays for every phase, queued like any other session work.
+
+        Blocks until all frames are done; ``progress(done, total)`` is called
+        from the calling thread as they finish. Raises the first failure.
+        """
+        batch = _Batch(kind, params, phases)
+        total = len(phases)
+        reported = 0
+        with self._lock:
+            self._session(session_id).batches.append(batch)
+            self._lock.notify_all()
+        try:
+            while reported < total:
+                with self._lock:
+                    while batch.done == reported and batch.error is None and not self._closed:
+                        self._lock.wait(timeout=1.0)
+                        # Keep the session alive while it waits
+                        self._session(session_id)
+                    if batch.error is not None:
+                        raise batch.error
+                    if self._closed:
+                        raise RuntimeError("Render service was shut down")
+                    reported = batch.done
+                if progress is not None:
+                    progress(reported, total)
+        finally:
+            with self._lock:
+                # Finished, failed or abandoned (e.g. a Streamlit rerun): queue no more
+                batch.jobs.clear()
+                session = self._sessions.get(session_id)
+                if session is not None and batch in session.batches:
+                    session.batches.remove(batch)
+        return batch.results
+
+    def close_session(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            self._lock.notify_all()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'max_inflight': self.max_inflight,
+                'inflight': self._inflight,
+                'sessions': len(self._sessions),
+                'queued': sum(len(s.queue) for s in self._sessions.values()),
+                'export_queued': sum(len(b.jobs) for s in self._sessions.values() for b in s.batches),
+                'dropped': sum(s.dropped for s in self._sessions.values()),
+                'completed': self.completed,
+                'failed': self.failed,
+            }
+
+    def _session(self, session_id):
+        # Caller holds the lock
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = _Session(self.queue_size)
+        session.last_seen = time.monotonic()
+        return session
+
+    def _next_job(self):
+        # Round-robin: take one job from the first session with work, then
+        # move that session to the back. A session's live frames come before
+        # its export frames. Caller holds the lock.
+        now = time.monotonic()
+        for session_id in list(self._sessions):
+            session = self._sessions[session_id]
+            if now - session.last_seen > SESSION_TIMEOUT and not session.batches:
+                del self._sessions[session_id]
+                continue
+            while session.queue:
+                seq, cache_key, kind, params, phase = session.queue.popleft()
+                self._sessions.move_to_end(session_id)
+                if cache_key in frame_cache.frame_cache:
+                    # Rendered meanwhile (possibly for another session)
+                    self._deliver(session, seq, frame_cache.frame_cache.get(cache_key))
+                    continue
+                return session_id, seq, cache_key, kind, params, phase
+            if sum(b.inflight for b in session.batches) < self.export_quota:
+                for batch in session.batches:
+                    if batch.jobs:
+                        index, phase = batch.jobs.popleft()
+                        batch.inflight += 1
+                        self._sessions.move_to_end(session_id)
+                        return session_id, None, (batch, index), batch.kind, batch.params, phase
+        return None
+
+    def _dispatch(self):
+        while True:
+            with self._lock:
+                job = None
+                while not self._closed:
+                    if self._inflight < self.max_inflight:
+                        job = self._next_job()
+                        if job is not None:
+                            break
+                    self._lock.wait(timeout=1.0)
+                if self._closed:
+                    return
+                session_id, seq, cache_key, kind, params, phase = job
+                if seq is not None:
+                    waiters = self._pending_waiters(cache_key, session_id, seq)
+                    if waiters is None:
+                        continue
+                self._inflight += 1
+
+            if seq is None:
+                # Export frame: raw RGBA for the encoder, not cached
+                batch, index = cache_key
+                try:
+                    future = self._executor.submit(frame_jobs.render_timed, kind, params, phase, False)
+                except Exception as e:
+                    logger.warning("Could not submit export frame %d: %s", index, e)
+                    with self._lock:
+                        self._inflight -= 1
+                        self._fail_batch(batch, e)
+                    continue
+                submitted = time.perf_counter()
+                future.add_done_callback(lambda f, b=batch, i=index, s=submitted: self._batch_finished(b, i, f, s))
+                continue
+
+            try:
+                future = self._executor.submit(frame_jobs.render_timed, kind, params, phase)
+            except Exception as e:
+                # Broken or shut-down pool: fail this job, keep dispatching
+                logger.warning("Could not submit frame job %s: %s", cache_key, e)
+                with self._lock:
+                    self._inflight -= 1
+                    self._fail(cache_key, e)
+                continue
+            submitted = time.perf_counter()
+            future.add_done_callback(lambda f, k=cache_key, s=submitted: self._finished(k, f, s))
+
+    def _pending_waiters(self, cache_key, session_id, seq):
+        # Identical job already running: just add this session as a recipient.
+        # Caller holds the lock.
+        if cache_key in self._pending:
+            self._pending[cache_key].append((session_id, seq))
+            return None
+        waiters = self._pending[cache_key] = [(session_id, seq)]
+        return waiters
+
+    def _finished(self, cache_key, future, submitted):
+        error = None
+        try:
+            png, timings = future.result()
+            _record_timings(timings)
+        except Exception as e:
+            png, error = None, e
+            logger.warning("Frame job %s failed: %s", cache_key, e)
+        # Queueing in the pool + render + PNG encode in the worker + transfer
+        metrics.record('render_pool', 'job', time.perf_counter() - submitted)
+
+        if png is not None:
+            frame_cache.frame_cache.put(cache_key, png)
+
+        with self._lock:
+            self._inflight -= 1
+            if png is None:
+                self._fail(cache_key, error)
+            else:
+                self.completed += 1
+                for session_id, seq in self._pending.pop(cache_key, []):
+                    session = self._sessions.get(session_id)
+                    if session is not None:
+                        self._deliver(session, seq, png)
+            self._lock.notify_all()
+
+    def _batch_finished(self, batch, index, future, submitted):
+        try:
+            (rgba, timings), error = future.result(), None
+            _record_timings(timings)
+        except Exception as e:
+            rgba, error = None, e
+            logger.warning("Export frame %d failed: %s", index, e)
+        metrics.record('render_pool', 'export_job', time.perf_counter() - submitted)
+
+        with self._lock:
+            self._inflight -= 1
+            batch.inflight -= 1
+            if error is not None:
+                self._fail_batch(batch, error)
+            else:
+                self.completed += 1
+                batch.results[index] = rgba
+                batch.done += 1
+            self._lock.notify_all()
+
+    def _fail_batch(self, batch, error):
+        # Caller holds the lock
+        self.failed += 1
+        if batch.error is None:
+            batch.error = error
+        batch.jobs.clear()
+        self._lock.notify_all()
+
+    def _fail(self, cache_key, error):
+        # Tell every session waiting for this job. Caller holds the lock.
+        self.failed += 1
+        for session_id, seq in self._pending.pop(cache_key, []):
+            session = self._sessions.get(session_id)
+            if session is not None and seq > session.error_seq:
+                session.error = f"{type(error).__name__}: {error}"
+                session.error_seq = seq
+
+    @staticmethod
+    def _deliver(session, seq, png):
+        # Older results never replace a newer frame (latest-frame-wins)
+        if seq > session.latest_seq:
+            session.latest = png
+            session.latest_seq = seq
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_service():
+    """The process-wide render service, or None when ``RENDER_WORKERS=0``."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            workers = int(os.environ.get('RENDER_WORKERS', os.cpu_count() or 1))
+            if workers <= 0:
+                return None
+            max_inflight = int(os.environ.get('RENDER_MAX_INFLIGHT', workers))
+            export_quota = int(os.environ.get('RENDER_EXPORT_QUOTA', 0)) or None
+            _service = RenderService(max_workers=workers, max_inflight=max_inflight, export_quota=export_quota)
+        return _service
+
+
+def render_frames(kind, params, phases, progress=None, session_id=None, local=False):
+    """RGBA arrays for every phase, rendered in parallel on the shared pool.
+
+    The frames are queued for ``session_id`` (default: one per calling
+    thread) and share the pool with live animations under the session's
+    export quota. ``progress(done, total)`` is called as frames finish. Unlike
+    ``get_frame`` this blocks until all frames are done; it is meant for
+    exports. ``local=True`` renders in the calling thread, as without a pool.
+    """
+    service = None if local else get_service()
+    if service is None:
+        total = len(phases)
+        results = []
+        for phase in phases:
+            results.append(frame_jobs.render_rgba(kind, params, phase))
+            if progress is not None:
+                progress(len(results), total)
+        return results
+
+    if session_id is None:
+        session_id = f"export-{threading.get_ident()}"
+    return service.render_batch(session_id, kind, params, phases, progress)
+
+
+def service_stats():
+    # Without starting the pool just to report on it
+    return _service.stats() if _service is not None else None
+
+
+def get_frame(session_id, kind, params, phase, samples=frame_cache.DEFAULT_SAMPLES):
+    """PNG for the phase sample nearest ``phase``; may be an older frame or None.
+
+    Cached frames are returned immediately. Otherwise the job is queued on the
+    shared pool and the session's most recent finished frame is returned, so
+    the caller never blocks on rendering. Raises if the session's newest job
+    failed (see ``RenderService.latest``).
+    """
+    index = frame_cache.phase_index(phase, samples)
+    cache_key = ((kind, params), samples, index)
+    png = frame_cache.frame_cache.get(cache_key)
+    if png is not None:
+        return png
+
+    service = get_service()
+    if service is None:
+        return frame_cache.get_frame((kind, params), phase, lambda p: frame_jobs.render_rgba(kind, params, p), samples)
+
+    service.submit(session_id, cache_key, kind, params, index / samples)
+    return service.latest(session_id)
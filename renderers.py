@@ -0,0 +1,461 @@
+"""Persistent matplotlib figures with blitted frame updates.
+
+Animated pages used to build, style, draw and close a new figure for every
+frame. The renderers here build their figure once per parameter set, draw the
+static parts (axes, grid, labels, fixed curves) a single time and cache that
+bitmap. Each frame then only restores the cached background, redraws the
+moving artists and copies out the RGBA buffer. The Longitudinal Wave
+renderer keeps only its background in matplotlib and splats the particles
+into the image with NumPy, so it scales to 10^5 particles.
+"""
+import time
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.patches import Rectangle
+
+import metrics
+
+BG_COLOR = '#0E1117'
+WAVE_COLOR = '#00FFFF'
+NODE_COLOR = '#FF0055'
+
+
+def style_axes(ax):
+    ax.set_facecolor(BG_COLOR)
+    ax.tick_params(colors='white')
+    for spine in ax.spines.values():
+        spine.set_color('white')
+    ax.grid(True, alpha=0.1, color='white')
+
+
+def _record_stages(renderer, draw, copy):
+    # Also kept on the renderer: in a render worker the registry is the
+    # worker's own, so frame_jobs sends these back to the server with the frame
+    scope = type(renderer).__name__
+    renderer.last_timings = ((scope, 'draw', draw), (scope, 'copy', copy))
+    metrics.record(scope, 'draw', draw)
+    metrics.record(scope, 'copy', copy)
+
+
+class BlitRenderer:
+    """Agg figure whose static content is cached as a background bitmap.
+
+    Artists registered with ``animate`` are skipped by the full draw and
+    redrawn on top of the cached background on every ``render``. Call
+    ``invalidate`` after changing anything that is part of the background.
+    """
+
+    def __init__(self, figsize, dpi=80):
+        # A bare Figure (no pyplot) is private to this renderer and safe to
+        # use from several Streamlit sessions at once
+        self.fig = Figure(figsize=figsize, dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.fig.patch.set_facecolor(BG_COLOR)
+        self._animated = []
+        self._background = None
+        self.frames = 0
+        self.frame_ms = 0.0
+        self.background_draws = 0
+        # (scope, stage, seconds) of the last frame
+        self.last_timings = ()
+
+    def animate(self, *artists):
+        for artist in artists:
+            artist.set_animated(True)
+            self._animated.append(artist)
+        self.invalidate()
+
+    def invalidate(self):
+        self._background = None
+
+    def render(self):
+        """Return the current frame as an (H, W, 4) uint8 array."""
+        start = time.perf_counter()
+
+        if self._background is None:
+            self.canvas.draw()
+            self._background = self.canvas.copy_from_bbox(self.fig.bbox)
+            self.background_draws += 1
+        else:
+            self.canvas.restore_region(self._background)
+
+        for artist in self._animated:
+            self.fig.draw_artist(artist)
+        drawn = time.perf_counter()
+
+        # Copy out: the Agg buffer is overwritten by the next frame
+        img = np.array(self.canvas.buffer_rgba())
+        done = time.perf_counter()
+
+        _record_stages(self, drawn - start, done - drawn)
+
+        # Exponential moving average of the frame time
+        elapsed_ms = (done - start) * 1000
+        self.frame_ms = elapsed_ms if self.frames == 0 else 0.9 * self.frame_ms + 0.1 * elapsed_ms
+        self.frames += 1
+        return img
+
+
+class StringWaveRenderer(BlitRenderer):
+    """Standing Waves plot: instantaneous string over envelopes and nodes.
+
+    With ``dynamic_shape=False`` the envelopes and title are part of the
+    cached background and ``set_shape`` redraws it only when the shape
+    actually changes. Use ``dynamic_shape=True`` when the shape changes every
+    frame (tension sweep at a fixed frequency) so they are blitted instead.
+    ``y_label`` carries the unit where there is one (the driven string, in m).
+    """
+
+    def __init__(self, x, x_view, y_lim, dynamic_shape=False, figsize=(10, 5), dpi=80, y_label="Displacement"):
+        super().__init__(figsize, dpi)
+        self.x = x
+        self.dynamic_shape = dynamic_shape
+        self._shape_key = None
+
+        ax = self.ax = self.fig.add_subplot()
+        style_axes(ax)
+        ax.set_xlim(x_view[0], x_view[1])
+        ax.set_ylim(-y_lim, y_lim)
+        ax.set_xlabel("Position (m)", color='white')
+        ax.set_ylabel(y_label, color='white')
+
+        zeros = np.zeros_like(x)
+        self.upper, = ax.plot(x, zeros, '--', color='white', alpha=0.3)
+        self.lower, = ax.plot(x, zeros, '--', color='white', alpha=0.3)
+        self.wave, = ax.plot(x, zeros, '-', color=WAVE_COLOR, linewidth=2)
+        self.nodes, = ax.plot([], [], 'o', color=NODE_COLOR, markersize=8)
+        self.title = ax.set_title("", color='white')
+
+        # Node markers stay on top of the moving string, as in the static plot
+        if dynamic_shape:
+            self.animate(self.upper, self.lower, self.wave, self.nodes, self.title)
+        else:
+            self.animate(self.wave, self.nodes)
+
+    def set_shape(self, envelope, node_positions, harmonic_number):
+        key = (envelope.tobytes(), node_positions.tobytes(), round(float(harmonic_number), 2))
+        if key == self._shape_key:
+            return
+        self._shape_key = key
+
+        self.upper.set_ydata(envelope)
+        self.lower.set_ydata(-envelope)
+        self.nodes.set_data(node_positions, np.zeros_like(node_positions))
+        self.title.set_text(f"Standing Wave (n ≈ {harmonic_number:.2f})")
+        if not self.dynamic_shape:
+            self.invalidate()
+
+    def frame(self, y):
+        self.wave.set_ydata(y)
+        return self.render()
+
+
+class TensionAnalysisRenderer(BlitRenderer):
+    """Frequency-vs-tension curve with a moving operating point."""
+
+    def __init__(self, t_values, f_values, analysis_n, figsize=(8, 4), dpi=80):
+        super().__init__(figsize, dpi)
+
+        ax = self.ax = self.fig.add_subplot()
+        style_axes(ax)
+        ax.plot(t_values, f_values, color=WAVE_COLOR, linewidth=2)
+        ax.set_title(f"Frequency vs Tension (Mode n={analysis_n})", color='white')
+
+        self.point, = ax.plot([], [], 'o', color=NODE_COLOR, markersize=10)
+        self.label = ax.annotate('',
+                                 xy=(t_values[0], f_values[0]),
+                                 xytext=(10, -10), textcoords='offset points',
+                                 color='white', fontsize=12,
+                                 arrowprops=dict(arrowstyle='->', color='white'),
+                                 bbox=dict(boxstyle="round,pad=0.3", fc=BG_COLOR, ec="none", alpha=0.7))
+        # Keep the moving label from changing the autoscaled limits
+        ax.set_xlim(ax.get_xlim())
+        ax.set_ylim(ax.get_ylim())
+        self.animate(self.point, self.label)
+
+    def frame(self, tension, frequency):
+        self.point.set_data([tension], [frequency])
+        self.label.xy = (tension, frequency)
+        # Flip text to left if we are near the right edge to prevent clipping
+        self.label.xyann = (10, -10) if tension < 70 else (-110, -10)
+        self.label.set_text(f'T={tension:.1f}N\nReq f={frequency:.1f}Hz')
+        return self.render()
+
+
+class CircularLoopRenderer(BlitRenderer):
+    """Circular Wave plot: the deformed loop in an equal-aspect square."""
+
+    def __init__(self, n, limit, title=None, figsize=(6, 6), dpi=100):
+        super().__init__(figsize, dpi)
+
+        ax = self.ax = self.fig.add_subplot()
+        ax.set_facecolor(BG_COLOR)
+        ax.set_aspect('equal')
+        ax.set_xlim(-limit, limit)
+        ax.set_ylim(-limit, limit)
+        ax.set_title(title if title is not None else f"Mode n={n} | Real-time")
+
+        self.line, = ax.plot([], [], lw=4, color='#8A2BE2') # BlueViolet color
+        self.animate(self.line)
+
+    def frame(self, x, y):
+        self.line.set_data(x, y)
+        return self.render()
+
+
+def particle_sprites(radius, edge_width=0.0, subpixel=4, supersample=8):
+    """Anti-aliased disc sprites for ``subpixel`` x ``subpixel`` centre offsets.
+
+    Returns ``(dy, dx, fill, edge)``: the footprint as pixel offsets from the
+    pixel holding the disc centre, and the coverage (0..1) of the disc's fill
+    and of its ``edge_width`` wide rim on every footprint pixel, each with
+    shape ``(subpixel**2, K)`` (row-major over the centre offsets).
+    """
+    reach = int(np.ceil(radius))
+    offsets = np.arange(-reach, reach + 1)
+    dy, dx = [a.ravel() for a in np.meshgrid(offsets, offsets, indexing='ij')]
+    samples = (np.arange(supersample) + 0.5) / supersample
+    # Sample points of every footprint pixel: (K, supersample, supersample)
+    sy = dy[:, None, None] + samples[None, :, None]
+    sx = dx[:, None, None] + samples[None, None, :]
+
+    centres = (np.arange(subpixel) + 0.5) / subpixel
+    fill = np.empty((subpixel * subpixel, len(dy)), dtype=np.float32)
+    edge = np.empty_like(fill)
+    for i, cy in enumerate(centres):
+        for j, cx in enumerate(centres):
+            dist = np.hypot(sy - cy, sx - cx)
+            inside = dist <= radius
+            rim = inside & (dist > radius - edge_width)
+            fill[i * subpixel + j] = (inside & ~rim).mean(axis=(1, 2))
+            edge[i * subpixel + j] = rim.mean(axis=(1, 2))
+
+    # Drop footprint pixels that no centre offset ever reaches
+    keep = (fill + edge).max(axis=0) > 0
+    return dy[keep], dx[keep], fill[:, keep], edge[:, keep]
+
+
+def _hex_rgb(color):
+    return np.array([int(color[i:i + 2], 16) for i in (1, 3, 5)], dtype=np.float32)
+
+
+class LongitudinalRenderer:
+    """Longitudinal Wave plot with the particles splatted in NumPy.
+
+    matplotlib draws the axes, labels, speaker housing and (for a chain) the
+    equilibrium marks once; that bitmap is the cached background. Each frame
+    restores it into a preallocated buffer and composites the speaker cone
+    and the particles with NumPy. A particle is a precomputed anti-aliased
+    sprite; all sprites are accumulated with ``np.bincount`` (coverage, colour
+    value and ``log(1 - alpha)`` per pixel), so overlapping particles blend
+    without a per-particle loop and 10^5 particles cost a few bincounts
+    instead of a marker draw each. The colour value goes through a colormap
+    lookup table after accumulation.
+    """
+
+    CONE_BACK_X = -3.3
+    CONE_FRONT_X = -1.0
+    CONE_COLOR = '#888888'
+    ALPHA = 0.9
+    # Markers of the former scatter plot: s=300 pt^2 with a 1.5 pt white edge
+    CHAIN_RADIUS_PT = 300 ** 0.5 / 2 + 0.75
+    CHAIN_EDGE_PT = 1.5
+    # Centre positions are quantized to 1/SUBPIXEL of a pixel
+    SUBPIXEL = 4
+    GAS_LAYERS = 1.5
+
+    def __init__(self, x0, y0, length, mode_n, cmap='coolwarm', figsize=(12, 4), dpi=80):
+        self.x0, self.y0 = x0, y0
+        self.length, self.mode_n = length, mode_n
+        self.gas = not np.all(y0 == 0)
+        self.fig = Figure(figsize=figsize, dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.fig.patch.set_facecolor(BG_COLOR)
+        self._build_axes()
+        self._background = None
+        self.frames = 0
+        self.frame_ms = 0.0
+        self.background_draws = 0
+        # (scope, stage, seconds) of the last frame
+        self.last_timings = ()
+
+        import matplotlib
+        lut = matplotlib.colormaps[cmap].resampled(256)(np.linspace(0, 1, 256), bytes=True)
+        self._lut = lut[:, :3].astype(np.float32)
+        self._cone_rgb = _hex_rgb(self.CONE_COLOR)
+
+        # Sprites: a chain keeps the look of the old markers, a gas gets
+        # small dots that shrink with the particle count
+        if self.gas:
+            radius, edge_width = float(np.clip(3.0 * np.sqrt(2000 / len(x0)), 1.0, 3.0)), 0.0
+        else:
+            radius, edge_width = self.CHAIN_RADIUS_PT * dpi / 72, self.CHAIN_EDGE_PT * dpi / 72
+        dy, dx, fill, edge = particle_sprites(radius, edge_width, self.SUBPIXEL)
+        self._reach = int(np.ceil(radius))
+        self._dy, self._dx = dy, dx
+
+        width, height = self.canvas.get_width_height()
+        self.width, self.height = width, height
+        self._image = np.empty((height, width, 4), dtype=np.uint8)
+        area = self._layout()
+
+        # A dense gas would be an opaque block: keep about GAS_LAYERS sprites'
+        # worth of opacity per pixel so compressions still read as denser
+        alpha = self.ALPHA
+        if self.gas:
+            layers = len(x0) * np.pi * radius ** 2 / max(area, 1.0)
+            alpha = min(alpha, self.GAS_LAYERS / layers)
+        self._fill = alpha * fill
+        self._edge = alpha * edge if edge_width else None
+        self._log_t = np.log1p(-alpha * (fill + edge))
+
+        # Per-frame index and weight buffers
+        n, k = len(x0), len(dy)
+        self._idx = np.empty((n, k), dtype=np.intp)
+        self._weights = np.empty((n, k), dtype=np.float32)
+
+    def _build_axes(self):
+        ax = self.ax = self.fig.add_subplot()
+        ax.set_facecolor(BG_COLOR)
+        self.fig.subplots_adjust(bottom=0.2)  # Add more space at the bottom for the large label
+        ax.set_xlim(-5, self.length + 1)
+        ax.set_ylim(-0.8, 0.8)
+        ax.set_yticks([])  # Hide Y axis
+        ax.set_xlabel("Position (x)", fontsize=14)
+        ax.set_title(f"Longitudinal Standing Wave (Mode n={self.mode_n})", fontsize=16)
+        ax.tick_params(axis='x', labelsize=12, width=2, length=5)
+
+        # Remove spines for cleaner look
+        ax.spines['left'].set_visible(False)
+        ax.spines['right'].set_visible(False)
+        ax.spines['top'].set_visible(False)
+        ax.spines['bottom'].set_linewidth(2)
+
+        # Speaker housing and equilibrium lines never move
+        ax.add_patch(Rectangle((-4.8, -0.4), 1.5, 0.8, color='#666666', zorder=5))
+        if not self.gas:
+            ax.vlines(self.x0, -0.2, 0.2, color='gray', alpha=0.2, linestyle=':', zorder=1)
+
+    def _to_pixels(self, x, y):
+        # Data to image coordinates (column, row), pixel (r, c) spanning [c, c+1) x [r, r+1)
+        disp = self.ax.transData.transform(np.column_stack([np.ravel(x), np.ravel(y)]))
+        return disp[:, 0], self.height - disp[:, 1]
+
+    def _layout(self):
+        # The axes limits are fixed, so data -> pixel is one affine map per axis
+        (c0, c1), (r0, r1) = self._to_pixels([0, 1], [0, 1])
+        self._sx, self._ox = c1 - c0, c0
+
+        # Particles only move along x: their rows and row sub-offsets are fixed
+        cols, rows = self._to_pixels(self.x0, self.y0)
+        iy = np.floor(rows).astype(np.intp)
+        self._sub_y = np.minimum((rows - iy) * self.SUBPIXEL, self.SUBPIXEL - 1).astype(np.intp) * self.SUBPIXEL
+
+        # Accumulation band: the rows the sprites can reach, padded columns so
+        # a sprite near an edge never wraps into the next row
+        pad = self._reach + 1
+        self._band = (max(int(iy.min()) - pad, 0), min(int(iy.max()) + pad + 1, self.height))
+        self._pad = pad
+        self._stride = self.width + 2 * pad
+        self._row_base = (iy - self._band[0]) * self._stride + pad
+        self._offsets = self._dy * self._stride + self._dx
+
+        # Speaker cone: pixel box that holds it for any stroke up to 0.35
+        c_lo, r_lo = self._to_pixels([self.CONE_BACK_X - 0.05], [0.65])
+        c_hi, r_hi = self._to_pixels([self.CONE_FRONT_X + 0.35], [-0.65])
+        self._cone_box = (int(r_lo[0]), int(np.ceil(r_hi[0])), int(c_lo[0]), int(np.ceil(c_hi[0])))
+        rb, re, cb, ce = self._cone_box
+        self._cone_px = np.arange(cb, ce) + 0.5
+        self._cone_py = np.arange(rb, re)[:, None] + 0.5
+
+        # Pixel area covered by the particles at rest
+        return np.ptp(cols) * max(np.ptp(rows), 1.0)
+
+    def invalidate(self):
+        self._background = None
+
+    def _cone_coverage(self, speaker_disp):
+        # Anti-aliased coverage of the convex cone polygon over its pixel box:
+        # signed distance (in pixels) to each edge, clipped to one pixel
+        front = self.CONE_FRONT_X + speaker_disp
+        xs = [self.CONE_BACK_X, self.CONE_BACK_X, front, front]
+        ys = [0.2, -0.2, -0.6, 0.6]
+        cols, rows = self._to_pixels(xs, ys)
+        distance = None
+        for i in range(4):
+            x1, y1, x2, y2 = cols[i], rows[i], cols[(i + 1) % 4], rows[(i + 1) % 4]
+            ex, ey = x2 - x1, y2 - y1
+            d = ((self._cone_px - x1) * ey - (self._cone_py - y1) * ex) / np.hypot(ex, ey)
+            distance = d if distance is None else np.minimum(distance, d)
+        return np.clip(distance + 0.5, 0.0, 1.0)
+
+    def _draw_cone(self, speaker_disp):
+        rb, re, cb, ce = self._cone_box
+        alpha = (self.ALPHA * self._cone_coverage(speaker_disp))[..., None]
+        region = self._image[rb:re, cb:ce, :3]
+        region[...] = region * (1 - alpha) + self._cone_rgb * alpha + 0.5
+
+    def _splat(self, positions, colour_values):
+        cols = positions * self._sx + self._ox
+        ix = np.floor(cols).astype(np.intp)
+        sub = self._sub_y + np.minimum((cols - ix) * self.SUBPIXEL, self.SUBPIXEL - 1).astype(np.intp)
+
+        idx = self._idx
+        np.add((self._row_base + ix)[:, None], self._offsets, out=idx)
+        flat = idx.ravel()
+        size = (self._band[1] - self._band[0]) * self._stride
+        weights = self._weights
+
+        def accumulate(bank, scale=None):
+            np.take(bank, sub, axis=0, out=weights)
+            if scale is not None:
+                np.multiply(weights, scale[:, None], out=weights)
+            return np.bincount(flat, weights=weights.ravel(), minlength=size)
+
+        log_t = accumulate(self._log_t)
+        touched = np.flatnonzero(log_t)
+        fill = accumulate(self._fill)[touched]
+        fill_value = accumulate(self._fill, colour_values)[touched]
+        edge = accumulate(self._edge)[touched] if self._edge is not None else 0.0
+
+        # Coverage of all sprites together, and the coverage-weighted colour
+        # (colormapped fill, white rim)
+        alpha = -np.expm1(log_t[touched])
+        value = fill_value / np.maximum(fill, 1e-12)
+        rgb = self._lut[np.clip(value * 255 + 0.5, 0, 255).astype(np.intp)]
+        share = (fill / np.maximum(fill + edge, 1e-12))[:, None]
+        rgb = rgb * share + 255.0 * (1 - share)
+
+        # Band pixels back to image pixels (padding columns are never drawn)
+        row, col = np.divmod(touched, self._stride)
+        col -= self._pad
+        inside = (col >= 0) & (col < self.width)
+        row, col = row[inside] + self._band[0], col[inside]
+        a = alpha[inside, None]
+        under = self._image[row, col, :3]
+        self._image[row, col, :3] = under * (1 - a) + rgb[inside] * a + 0.5
+
+    def frame(self, positions, colour_values, speaker_disp):
+        """Return the frame as an (H, W, 4) uint8 array."""
+        start = time.perf_counter()
+        if self._background is None:
+            self.canvas.draw()
+            self._background = np.array(self.canvas.buffer_rgba())
+            self.background_draws += 1
+        np.copyto(self._image, self._background)
+        self._draw_cone(speaker_disp)
+        self._splat(positions, colour_values)
+        drawn = time.perf_counter()
+
+        # Copy out: the buffer is reused by the next frame
+        img = self._image.copy()
+        done = time.perf_counter()
+
+        _record_stages(self, drawn - start, done - drawn)
+
+        elapsed_ms = (done - start) * 1000
+        self.frame_ms = elapsed_ms if self.frames == 0 else 0.9 * self.frame_ms + 0.1 * elapsed_ms
+        self.frames += 1
+        return img
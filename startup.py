@@ -0,0 +1,165 @@
+"""One-time warm-up of the rendering state and time-to-first-frame reporting.
+
+The first view of a page in a fresh server process used to pay for importing
+matplotlib and SciPy, loading matplotlib's font list (building it on a fresh
+machine), the first Agg draw (font files, glyph cache), colormap lookup tables
+and the Bessel zero table. ``warm()`` does all of that once per process and
+applies the app-wide dark style; pages call it instead of ``plt.style.use``
+(it returns at once after the first time). The Home page starts it on a
+background thread with ``warm_in_background()``, so it usually runs while the
+visitor is still reading and the first simulation page finds it done. Render
+worker processes run it in their initializer.
+
+``python startup.py`` runs the warm-up and prints the step times; the Docker
+image runs it at build time so the font cache ships inside the image.
+
+``FirstFrame`` measures each page run from its start to the first frame on
+screen. The times are recorded under the scope ``first_frame`` (Settings
+page, metrics exporters) and the first one per page and process is logged,
+marked cold when the warm-up had not finished yet.
+"""
+import logging
+import threading
+import time
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+STYLE = 'dark_background'
+# Colormaps used by the pages (Chladni rasters, longitudinal particles)
+COLORMAPS = ('magma', 'coolwarm')
+
+_lock = threading.Lock()
+_done = threading.Event()
+_started = False
+# step -> seconds of the warm-up in this process
+timings = {}
+
+
+def _matplotlib():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.style
+    matplotlib.style.use(STYLE)
+
+
+def _fonts():
+    from matplotlib import font_manager
+    # Loads the cached font list, or builds it (seconds) on a fresh machine
+    font_manager.findfont(font_manager.FontProperties())
+
+
+def _canvas():
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    # A throwaway styled figure with text and math: the first draw opens the
+    # font files and fills the text and mathtext caches
+    fig = Figure(figsize=(2, 2), dpi=72)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.plot([0, 1], [0, 1])
+    ax.set_title("$y = A \\sin(kx)$")
+    ax.set_xlabel("Position (m)")
+    fig.canvas.draw()
+
+
+def _colormaps():
+    import chladni_render
+    for name in COLORMAPS:
+        chladni_render.colormap_lut(name)
+
+
+def _bessel():
+    import scipy.special  # noqa: F401  (J_m of the circular plate)
+    import bessel
+    bessel.load_table()
+
+
+STEPS = [
+    ('matplotlib', _matplotlib),
+    ('fonts', _fonts),
+    ('canvas', _canvas),
+    ('colormaps', _colormaps),
+    ('bessel', _bessel),
+]
+
+
+def _run():
+    try:
+        for name, step in STEPS:
+            start = time.perf_counter()
+            try:
+                step()
+            except Exception:
+                # A failed step only costs its work on first use later
+                logger.exception("Warm-up step %s failed", name)
+            timings[name] = time.perf_counter() - start
+            metrics.record('startup', name, timings[name])
+        logger.info("Warm-up done in %.0f ms (%s)", sum(timings.values()) * 1000,
+                    ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in timings.items()))
+    finally:
+        _done.set()
+
+
+def _claim():
+    global _started
+    with _lock:
+        if _started:
+            return False
+        _started = True
+        return True
+
+
+def warm():
+    """Warm this process up (once); waits if another thread is already at it."""
+    if _done.is_set():
+        return
+    if _claim():
+        _run()
+    else:
+        _done.wait()
+
+
+def warm_in_background():
+    """Start the warm-up on a daemon thread (once) and return immediately."""
+    if _claim():
+        threading.Thread(target=_run, name="warm-up", daemon=True).start()
+
+
+def is_warm():
+    return _done.is_set()
+
+
+_reported_pages = set()
+
+
+class FirstFrame:
+    """Time from the start of a page run to its first frame on screen.
+
+    Create it at the top of the page script (before the heavy imports run)
+    and call ``done()`` after every frame push; only the first call counts.
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self.start = time.perf_counter()
+        self.cold = not _done.is_set()
+        self.seconds = None
+
+    def done(self):
+        if self.seconds is not None:
+            return
+        self.seconds = time.perf_counter() - self.start
+        metrics.record('first_frame', self.page, self.seconds)
+        if self.page not in _reported_pages:
+            _reported_pages.add(self.page)
+            logger.info("Time to first frame on %s: %.0f ms (%s process)",
+                        self.page, self.seconds * 1000, "cold" if self.cold else "warm")
+
+
+if __name__ == '__main__':
+    warm()
+    for name, seconds in timings.items():
+        print(f"{name:<12} {seconds * 1000:8.1f} ms")
+    print(f"{'total':<12} {sum(timings.values()) * 1000:8.1f} ms")
@@ -37,6 +37,7 @@ def init_settings():
             # Page 2: Chladni
             'ch_n': {'min': 1, 'max': 50, 'default': 3, 'step': 1},
             'ch_m': {'min': 1, 'max': 50, 'default': 5, 'step': 1},
+            'ch_res': {'min': 100, 'max': 1000, 'default': 500, 'step': 50},
             
             # Page 3: Circular
             'cw_n': {'min': 2, 'max': 20, 'default': 3, 'step': 1},
@@ -48,9 +49,39 @@ def init_settings():
             'lw_n': {'min': 1, 'max': 20, 'default': 3, 'step': 1},
             'lw_amp': {'min': 0.1, 'max': 3.0, 'default': 0.8, 'step': 0.1},
             'lw_speed': {'min': 0.1, 'max': 5.0, 'default': 1.0, 'step': 0.1},
+            
+            # Animation pacing (all animated pages)
+            'anim_fps': {'min': 5, 'max': 60, 'default': 30, 'step': 1},
         }
 
 def get_setting(key):
     init_settings()
     return st.session_state['settings'][key]
 
+def target_fps_slider():
+    s_fps = get_setting('anim_fps')
+    fps_val = int(max(s_fps['min'], min(s_fps['default'], s_fps['max'])))
+    return st.sidebar.slider("Target FPS", min_value=int(s_fps['min']), max_value=int(s_fps['max']), value=fps_val, step=int(s_fps['step']), help="Frames are skipped, not slowed down, when the server cannot keep up.")
+
+PLAYBACK_BROWSER = "Browser (loops locally)"
+PLAYBACK_SERVER = "Server (streamed frames)"
+
+def playback_radio(container=None):
+    container = container or st.sidebar
+    return container.radio("Playback", [PLAYBACK_BROWSER, PLAYBACK_SERVER], index=0, help="Browser playback computes one period once and loops it in your browser; server playback streams every frame.")
+
+def session_id():
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else 'local'
+
+def clock_caption(frame_clock, frame_timer=None):
+    caption = f"{frame_clock.fps:.0f}/{frame_clock.target_fps:.0f} FPS | {frame_clock.dropped_frames} dropped frames"
+    # Stage breakdown, when the overlay is switched on in Settings
+    if frame_timer is not None and perf_overlay_enabled():
+        caption += f" | {frame_timer.overlay()}"
+    return caption
+
+def perf_overlay_enabled():
+    return st.session_state.get('perf_overlay', False)
+